@@ -0,0 +1,210 @@
+"""
+Seeded synthetic markdown for the benchmarks.
+
+The same parameters and seed always give the same document and extensions. Sentence and
+block extensions are made in the shapes of sentence_extensions.json/block_extensions.json:
+a "line" extension is a single marker line, as Line, and a "fenced" one is a run of text
+between two marker lines, as Equation.
+
+    python -m benchmarks.corpus [--size-mb 1] [--seed 0] [... see --help] -o doc.md [--sent-ext s.json --blk-ext b.json]
+"""
+import argparse
+import json
+import random
+import sys
+
+SHAPES = ['line', 'fenced', 'mixed']
+
+
+class Corpus:
+    markdown: str
+    sent_ext: list
+    blk_ext: list
+    parameters: dict
+
+    def __init__(self, markdown: str, sent_ext: list, blk_ext: list, parameters: dict):
+        self.markdown = markdown
+        self.sent_ext = sent_ext
+        self.blk_ext = blk_ext
+        self.parameters = parameters
+
+
+def _extensions(sentence_extensions: int, block_extensions: int, shape: str,
+                rng: random.Random) -> tuple[list, list, list[tuple[str, int]]]:
+    """
+    The sentence and block extension definitions, and the (shape, number) of each block
+    extension, as only sentences starting a block can be used in a document.
+    """
+    sent_ext, blk_ext, used = [], [], []
+    for _ in range(sentence_extensions):
+        sentence_shape = shape if shape != 'mixed' else rng.choice(['line', 'fenced'])
+        if sentence_shape == 'line':
+            sent_ext.append({f'Rule{_}': f'==={_}==='})
+        else:
+            sent_ext.append({f'Fence{_}': f'\\$\\${_}\\$\\$'})
+
+        if _ >= block_extensions:
+            continue
+        used.append((sentence_shape, _))
+        if sentence_shape == 'line':
+            blk_ext.append({
+                'name': f'Single{_}',
+                'identification': [{'sentence': f'Rule{_}', 'occurrence': '1'}],
+                'toLaTeX': [f'\\noindent\\rule{{\\textwidth}}{{{_ % 4 + 1}pt}}'],
+            })
+        else:
+            blk_ext.append({
+                'name': f'Fenced{_}',
+                'identification': [
+                    {'sentence': f'Fence{_}', 'occurrence': '1'},
+                    {'sentence': 'Text', 'occurrence': '*'},
+                    {'sentence': f'Fence{_}', 'occurrence': '1'},
+                ],
+                'toLaTeX': [
+                    f'\\begin{{env{_}}}', '\n',
+                    {'method': 'ref', 'ref_id': 1,
+                     'toLaTeX': [{'method': 'foreach', 'toLaTeX': ['\t', {'method': 'literal'}, '\n']}]},
+                    f'\\end{{env{_}}}',
+                ],
+            })
+    return sent_ext, blk_ext, used
+
+
+class _Writer:
+    def __init__(self, rng: random.Random, marker_density: float):
+        self._rng = rng
+        self._marker_density = marker_density
+        self._words = [''.join(rng.choice('etaoinshrdlucmfwypvbgk') for _ in range(rng.randint(2, 9)))
+                       for _ in range(2000)]
+
+    def words(self, count: int) -> str:
+        rng, ret = self._rng, []
+        for _ in range(count):
+            word = rng.choice(self._words)
+            if rng.random() < self._marker_density:
+                marker = rng.randrange(5)
+                if marker == 0:
+                    word = f'**{word}**'
+                elif marker == 1 and _ != count - 1:
+                    # texify fails on a line ending with '__'
+                    word = f'__{word}__'
+                elif marker == 2:
+                    word = f'_{word}_'
+                elif marker == 3:
+                    word = f'`{word}`'
+                else:
+                    word = f'[{word}](https://example.org/{word})'
+            ret.append(word)
+        return ' '.join(ret)
+
+
+def generate(
+        size_mb: float = 1.0,
+        seed: int = 0,
+        paragraph_lines: int = 4,
+        marker_density: float = 0.05,
+        list_depth: int = 2,
+        picture_frequency: float = 0.02,
+        sentence_extensions: int = 2,
+        block_extensions: int = 2,
+        extension_shape: str = 'mixed',
+        extension_frequency: float = 0.05
+) -> Corpus:
+    """
+    A document of about `size_mb` megabytes, made of titles, paragraphs of
+    `paragraph_lines` lines, lists nested up to `list_depth` levels, pictures (a
+    `picture_frequency` of the blocks) and uses of the block extensions (an
+    `extension_frequency` of the blocks). A `marker_density` of the words are bold,
+    italic, inline code or links.
+    """
+    assert block_extensions <= sentence_extensions, \
+        f'every block extension starts with its own sentence extension, reading {block_extensions} blocks ' \
+        f'for {sentence_extensions} sentences'
+    assert extension_shape in SHAPES, f'extension shape should be one of {SHAPES}, reading {extension_shape}'
+    parameters = dict(locals())
+
+    rng = random.Random(seed)
+    writer = _Writer(rng, marker_density)
+    sent_ext, blk_ext, used = _extensions(sentence_extensions, block_extensions, extension_shape, rng)
+
+    lines: list[str] = [f'# {writer.words(4)}', '']
+    size, target = 0, int(size_mb * 1024 * 1024)
+    while size < target:
+        block: list[str]
+        roll = rng.random()
+        if roll < picture_frequency:
+            block = [f'![{writer.words(3)}](figures/{rng.randrange(1000)}.png)']
+        elif roll < picture_frequency + extension_frequency and used:
+            shape, number = rng.choice(used)
+            if shape == 'line':
+                block = [f'==={number}===']
+            else:
+                block = [f'$${number}$$', *[writer.words(8) for _ in range(rng.randint(1, 4))], f'$${number}$$']
+        elif roll < 0.15:
+            block = [f'{"#" * rng.randint(2, 4)} {writer.words(rng.randint(2, 6))}']
+        elif roll < 0.35:
+            ordered, depth, block = rng.random() < 0.5, 0, []
+            for _ in range(rng.randint(2, 8)):
+                depth = max(0, min(list_depth - 1, depth + rng.choice([-1, 0, 0, 1])))
+                marker = f'{_ + 1}.' if ordered else rng.choice('*-')
+                block.append(f'{"  " * depth}{marker} {writer.words(rng.randint(3, 12))}')
+        else:
+            block = [writer.words(rng.randint(8, 16)) for _ in range(paragraph_lines)]
+
+        lines.extend(block)
+        lines.append('')
+        size += sum([len(_) + 1 for _ in block]) + 1
+
+    return Corpus('\n'.join(lines) + '\n', sent_ext, blk_ext, parameters)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--size-mb', type=float, default=1.0, help='size of the document')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--paragraph-lines', type=int, default=4, help='lines of each paragraph')
+    parser.add_argument('--marker-density', type=float, default=0.05,
+                        help='share of the words that are bold, italic, inline code or links')
+    parser.add_argument('--list-depth', type=int, default=2, help='deepest nesting of lists')
+    parser.add_argument('--picture-frequency', type=float, default=0.02, help='share of the blocks that are pictures')
+    parser.add_argument('--sentence-extensions', type=int, default=2, help='number of sentence extensions')
+    parser.add_argument('--block-extensions', type=int, default=2, help='number of block extensions')
+    parser.add_argument('--extension-shape', choices=SHAPES, default='mixed')
+    parser.add_argument('--extension-frequency', type=float, default=0.05,
+                        help='share of the blocks that are block extensions')
+
+
+def from_arguments(options: argparse.Namespace) -> Corpus:
+    return generate(
+        size_mb=options.size_mb,
+        seed=options.seed,
+        paragraph_lines=options.paragraph_lines,
+        marker_density=options.marker_density,
+        list_depth=options.list_depth,
+        picture_frequency=options.picture_frequency,
+        sentence_extensions=options.sentence_extensions,
+        block_extensions=options.block_extensions,
+        extension_shape=options.extension_shape,
+        extension_frequency=options.extension_frequency
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Seeded synthetic markdown for the benchmarks.')
+    add_arguments(parser)
+    parser.add_argument('-o', '--output', required=True, help='markdown file to write')
+    parser.add_argument('--sent-ext', default=None, help='sentence extension file to write')
+    parser.add_argument('--blk-ext', default=None, help='block extension file to write')
+    options = parser.parse_args(argv)
+
+    corpus = from_arguments(options)
+    with open(options.output, 'w', encoding='utf-8') as f:
+        f.write(corpus.markdown)
+    for filename, definitions in [(options.sent_ext, corpus.sent_ext), (options.blk_ext, corpus.blk_ext)]:
+        if filename is not None:
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(definitions, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
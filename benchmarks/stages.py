@@ -0,0 +1,145 @@
+"""
+Throughput of each stage of a conversion, on a synthetic document (see benchmarks.corpus).
+
+The stages are timed separately, each on the output of the previous one: lexing, building
+the tokenizer, parsing, rendering, joining the lines and writing the file. Each stage is
+run a few times, keeping the fastest. Throughput is given in source lines and megabytes
+per second.
+
+A result saved with --json can be used as the baseline of a later run: the run fails if a
+stage is slower than in the baseline by more than the threshold.
+
+    python -m benchmarks.stages [corpus options] [--runs 5] [--json result.json]
+                                [--baseline baseline.json] [--threshold 0.15]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks import corpus as _corpus
+
+STAGES = ['lex', 'tokenizer', 'parse', 'to_latex', 'join', 'write']
+
+# slowdowns below this are taken as noise, whatever the threshold, e.g. for building the tokenizer
+MIN_SLOWDOWN_SECONDS = 0.001
+
+
+def run_once(markdown: str, output_filename: str) -> dict[str, float]:
+    from md2latex_converter.core import inline, sentence_parser
+    from md2latex_converter.core.tokenizer import Tokenizer
+    from md2latex_converter.core.workflow import EOF_SENTINEL, join_lines
+    from md2latex_converter.data_structures.blocks import Document
+
+    seconds = dict()
+    # every run renders the inline strings again, as the first one did
+    inline.clear_memo()
+    gc.collect()
+
+    start = time.perf_counter()
+    sentences = sentence_parser.lex(markdown + EOF_SENTINEL)
+    seconds['lex'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tokenizer = Tokenizer(sentences)
+    seconds['tokenizer'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    document = Document.parse(tokenizer)
+    seconds['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    latex = document.toLaTeX()
+    seconds['to_latex'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    text = join_lines(latex)
+    seconds['join'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        f.write(text)
+    seconds['write'] = time.perf_counter() - start
+
+    return seconds
+
+
+def measure(corpus: _corpus.Corpus, runs: int) -> dict:
+    from md2latex_converter.data_structures import sent_ext, blk_ext
+
+    sent_ext.register(corpus.sent_ext)
+    blk_ext.register(corpus.blk_ext)
+
+    with tempfile.TemporaryDirectory() as directory:
+        output_filename = os.path.join(directory, 'doc.tex')
+        samples = [run_once(corpus.markdown, output_filename) for _ in range(runs)]
+
+    lines = corpus.markdown.count('\n')
+    megabytes = len(corpus.markdown.encode('utf-8')) / (1024 * 1024)
+    stages = dict()
+    for stage in [*STAGES, 'total']:
+        seconds = min([_[stage] if stage != 'total' else sum(_.values()) for _ in samples])
+        stages[stage] = {
+            'seconds': seconds,
+            'lines_per_second': lines / seconds if seconds else float('inf'),
+            'mb_per_second': megabytes / seconds if seconds else float('inf'),
+        }
+    return {'corpus': corpus.parameters, 'lines': lines, 'megabytes': megabytes, 'runs': runs, 'stages': stages}
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    The stages slower than in `baseline` by more than `threshold`, e.g. 0.1 for 10%, and
+    by more than `MIN_SLOWDOWN_SECONDS`.
+    """
+    assert result['corpus'] == baseline['corpus'], \
+        f'the baseline was measured on another corpus, {baseline["corpus"]}'
+    failures = []
+    for stage, timing in result['stages'].items():
+        if stage not in baseline['stages']:
+            continue
+        before = baseline['stages'][stage]['seconds']
+        if timing['seconds'] > before * (1 + threshold) and timing['seconds'] - before > MIN_SLOWDOWN_SECONDS:
+            failures.append(f'{stage}: {timing["seconds"] * 1000:.1f} ms, '
+                            f'{(timing["seconds"] / before - 1) * 100:.0f}% slower than the baseline '
+                            f'{before * 1000:.1f} ms')
+    return failures
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Throughput of each stage of a conversion.')
+    _corpus.add_arguments(parser)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', default=None, help='save the results to this file')
+    parser.add_argument('--baseline', default=None, help='results saved by an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='slowdown of a stage over the baseline that fails the run, 0.15 for 15%%')
+    options = parser.parse_args(argv)
+
+    result = measure(_corpus.from_arguments(options), options.runs)
+
+    print(f'{result["lines"]} lines, {result["megabytes"]:.2f} MB, fastest of {result["runs"]} runs')
+    print(f'{"stage":<12}{"ms":>10}{"lines/s":>14}{"MB/s":>10}')
+    for stage, timing in result['stages'].items():
+        print(f'{stage:<12}{timing["seconds"] * 1000:>10.1f}{timing["lines_per_second"]:>14.0f}'
+              f'{timing["mb_per_second"]:>10.2f}')
+
+    failures = []
+    if options.baseline is not None:
+        with open(options.baseline, 'r', encoding='utf-8') as f:
+            failures = compare(result, json.loads(f.read()), options.threshold)
+    for _ in failures:
+        print(f'FAILED {_}')
+
+    if options.json is not None:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(result, indent=2))
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
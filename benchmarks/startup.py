@@ -0,0 +1,132 @@
+"""
+Startup-time budget of each m2l command.
+
+Every command is run in a fresh interpreter under `python -X importtime`, a few times,
+recording the fastest wall time and import time. The run fails if a command exceeds
+its budget, or imports a module its path should not need, e.g. the converter for
+"m2l help", or the clipboard for file mode.
+
+    python -m benchmarks.startup [--budget benchmarks/startup_budget.json] [--runs 5] [--json result.json]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_HERE)
+
+_CONVERTER = 'md2latex_converter.core.workflow'
+_CLIPBOARD = ['pyperclip', 'tkinter']
+
+# name: (arguments, modules that must not be imported)
+COMMANDS: dict[str, tuple[list[str], list[str]]] = {
+    'help': (['help'], [_CONVERTER, *_CLIPBOARD]),
+    'file': (['{md}', '-o', '{tex}'], [*_CLIPBOARD, 'sqlite3', 'http.client']),
+    'file-extensions': (['{md}', '-o', '{tex}', '-eS', '{sent_ext}', '-eB', '{blk_ext}'],
+                        [*_CLIPBOARD, 'sqlite3', 'http.client']),
+    'batch': (['{md}', '{md}', '-j', '1'], _CLIPBOARD),
+    'client': (['{md}', '-o', '{tex}', '--client', '--socket', '{socket}'], [_CONVERTER, *_CLIPBOARD]),
+}
+
+
+def _parse_importtime(stderr: str) -> tuple[float, list[str]]:
+    total_us, modules = 0, []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        total_us += int(self_us)
+        modules.append(name.strip())
+    return total_us / 1000, modules
+
+
+def measure(args: list[str], cwd: str, runs: int) -> dict:
+    wall_ms, import_ms, modules = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'md2latex_converter', *args],
+                                 cwd=cwd, capture_output=True, text=True,
+                                 env={**os.environ, 'PYTHONPATH': _ROOT})
+        wall_ms.append((time.perf_counter() - start) * 1000)
+        assert process.returncode == 0, f'm2l {" ".join(args)} failed:\n{process.stderr}'
+        total, modules = _parse_importtime(process.stderr)
+        import_ms.append(total)
+    return {'wall_ms': min(wall_ms), 'import_ms': min(import_ms), 'modules': modules}
+
+
+def _start_daemon(socket_filename: str, cwd: str) -> subprocess.Popen:
+    daemon = subprocess.Popen([sys.executable, '-m', 'md2latex_converter', 'serve', '--socket', socket_filename],
+                              cwd=cwd, stderr=subprocess.DEVNULL, env={**os.environ, 'PYTHONPATH': _ROOT})
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_filename)
+            return daemon
+        except OSError:
+            time.sleep(0.05)
+        finally:
+            probe.close()
+    daemon.kill()
+    assert False, 'the daemon did not start'
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Startup-time budget of each m2l command.')
+    parser.add_argument('--budget', default=os.path.join(_HERE, 'startup_budget.json'),
+                        help='JSON file of {command: {"wall_ms": ..., "import_ms": ...}}')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', default=None, help='save the results to this file')
+    options = parser.parse_args(argv)
+
+    with open(options.budget, 'r', encoding='utf-8') as f:
+        budget = json.loads(f.read())
+
+    results, failures = dict(), []
+    with tempfile.TemporaryDirectory() as cwd:
+        values = {
+            'md': os.path.join(cwd, 'doc.md'),
+            'tex': os.path.join(cwd, 'doc.tex'),
+            'sent_ext': os.path.join(_ROOT, 'sentence_extensions.json'),
+            'blk_ext': os.path.join(_ROOT, 'block_extensions.json'),
+            'socket': os.path.join(cwd, 'm2l.sock'),
+        }
+        with open(values['md'], 'w', encoding='utf-8') as f:
+            f.write('# Title\n\nSome **bold** text.\n\n* an item\n* another item\n')
+
+        daemon = _start_daemon(values['socket'], cwd)
+        try:
+            for name, (args, forbidden) in COMMANDS.items():
+                result = measure([_.format(**values) for _ in args], cwd, options.runs)
+                results[name] = result
+
+                for module in forbidden:
+                    if module in result['modules']:
+                        failures.append(f'{name}: imports {module}')
+                for key in ['wall_ms', 'import_ms']:
+                    if key in budget.get(name, {}) and result[key] > budget[name][key]:
+                        failures.append(f'{name}: {key} {result[key]:.1f} over budget {budget[name][key]}')
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    print(f'{"command":<18}{"wall ms":>10}{"import ms":>12}{"modules":>10}')
+    for name, result in results.items():
+        print(f'{name:<18}{result["wall_ms"]:>10.1f}{result["import_ms"]:>12.1f}{len(result["modules"]):>10}')
+    for _ in failures:
+        print(f'FAILED {_}')
+
+    if options.json is not None:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(results, indent=2))
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,9 @@
+def __getattr__(name: str):
+    # imported on first use, as "m2l help" should not load the converter
+    if name == 'Converter':
+        from md2latex_converter.converter import Converter
+        return Converter
+    if name in ['convert_async', 'convert_file_async', 'convert_many']:
+        from md2latex_converter import aio
+        return getattr(aio, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
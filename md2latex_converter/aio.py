@@ -0,0 +1,155 @@
+"""
+Conversions for asyncio programs, run out of the event loop.
+
+Files are read and written, and documents converted, in an executor: the default one of
+the event loop unless another is given, e.g. a `ProcessPoolExecutor` for documents big
+enough to be worth sending to another process.
+
+    latex = await convert_async(markdown)
+
+    async for result in convert_many(['a.md', ('b.md', 'b.tex')], concurrency=4):
+        print(result.source, result.error or 'ok')
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterable, AsyncIterator, Iterable
+
+from md2latex_converter.converter import Converter
+
+
+class Result:
+    """
+    The conversion of one document of `convert_many`.
+
+    `latex` is the LaTeX text of a source converted alone, and None for a source
+    converted into an output file. `error` is what made the conversion fail, if it did.
+    """
+
+    source: str
+    output: str | None
+    latex: str | None
+    error: BaseException | None
+
+    def __init__(self, source: str, output: str | None, latex: str | None, error: BaseException | None):
+        self.source = source
+        self.output = output
+        self.latex = latex
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f'Result({self.source!r}, {self.output!r}, error={self.error!r})'
+
+
+async def _offload(executor: Executor | None, method, *args):
+    """
+    Run a conversion `method` of a converter in `executor`, stopping it between two
+    blocks if the awaiting task is cancelled.
+
+    An event cannot be shared with the processes of a `ProcessPoolExecutor`, so a
+    conversion there is only stopped if it has not started yet.
+    """
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor):
+        return await loop.run_in_executor(executor, method, *args)
+
+    cancelled = threading.Event()
+    try:
+        return await loop.run_in_executor(executor, functools.partial(method, *args, cancelled=cancelled))
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+
+async def convert_async(
+        markdown: str,
+        converter: Converter | None = None,
+        executor: Executor | None = None,
+        semaphore: asyncio.Semaphore | None = None,
+        argv: list[str] | None = None
+) -> str:
+    """
+    `Converter.convert`, in `executor`. Conversions sharing a `semaphore` wait for one
+    another once as many as it allows are running.
+    """
+    converter = converter or Converter()
+    if semaphore is None:
+        return await _offload(executor, converter.convert, markdown, argv)
+    async with semaphore:
+        return await _offload(executor, converter.convert, markdown, argv)
+
+
+async def convert_file_async(
+        src: str,
+        dst: str,
+        converter: Converter | None = None,
+        executor: Executor | None = None,
+        semaphore: asyncio.Semaphore | None = None,
+        argv: list[str] | None = None
+) -> None:
+    """
+    `Converter.convert_file`, in `executor`, see `convert_async`.
+    """
+    converter = converter or Converter()
+    if semaphore is None:
+        return await _offload(executor, converter.convert_file, src, dst, argv)
+    async with semaphore:
+        return await _offload(executor, converter.convert_file, src, dst, argv)
+
+
+async def _iterate(jobs: Iterable | AsyncIterable) -> AsyncIterator:
+    if isinstance(jobs, AsyncIterable):
+        async for _ in jobs:
+            yield _
+    else:
+        for _ in jobs:
+            yield _
+
+
+async def convert_many(
+        jobs: Iterable[str | tuple[str, str]] | AsyncIterable[str | tuple[str, str]],
+        concurrency: int = 4,
+        converter: Converter | None = None,
+        executor: Executor | None = None,
+        argv: list[str] | None = None
+) -> AsyncIterator[Result]:
+    """
+    Convert every job, a source file converted into LaTeX text or an (input, output)
+    pair of files, giving a `Result` for each as soon as it is done.
+
+    At most `concurrency` conversions run at a time, the next job being taken from
+    `jobs` only once one of them is done. A failure on one job does not stop the others.
+    The conversions still running are cancelled if the iteration stops early.
+    """
+    assert concurrency >= 1, f'at least one conversion should run at a time, reading {concurrency}'
+    converter = converter or Converter()
+    iterator = _iterate(jobs)
+    running: dict[asyncio.Task, tuple[str, str | None]] = dict()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(running) < concurrency:
+                job = await anext(iterator, None)
+                if job is None:
+                    exhausted = True
+                    break
+                src, dst = (job, None) if isinstance(job, str) else job
+                if dst is None:
+                    task = asyncio.ensure_future(_offload(executor, converter.convert_source, src, argv))
+                else:
+                    task = asyncio.ensure_future(_offload(executor, converter.convert_file, src, dst, argv))
+                running[task] = (src, dst)
+
+            if not running:
+                return
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                src, dst = running.pop(task)
+                error = task.exception()
+                yield Result(src, dst, task.result() if error is None and dst is None else None, error)
+    finally:
+        for _ in running:
+            _.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
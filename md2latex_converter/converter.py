@@ -0,0 +1,124 @@
+import json
+import threading
+from concurrent.futures import CancelledError
+from typing import Iterable, Iterator
+
+from md2latex_converter.core import ext_bundle, io_handler
+from md2latex_converter.core.includes import IncludeGraph
+from md2latex_converter.core.workflow import EOF_SENTINEL, convert_lines, emit_lines
+from md2latex_converter.data_structures import sent_ext, blk_ext
+from md2latex_converter.data_structures.runtime_maps import Registry
+
+# converters unpickled in this process, by their extensions, see `Converter.__reduce__`, the oldest dropped first
+_unpickled: dict[tuple[str, str], 'Converter'] = dict()
+_UNPICKLED_KEPT = 16
+
+
+def _until_set(lines: Iterable[str], cancelled: threading.Event) -> Iterator[str]:
+    for _ in lines:
+        # blank lines end blocks, so that a conversion is stopped between two of them
+        if _ == '' and cancelled.is_set():
+            raise CancelledError()
+        yield _
+
+
+def _unpickle(sources: tuple[str, str]) -> 'Converter':
+    if sources not in _unpickled:
+        if len(_unpickled) >= _UNPICKLED_KEPT:
+            _unpickled.pop(next(iter(_unpickled)), None)
+        _unpickled[sources] = Converter._from_sources(*sources)
+    return _unpickled[sources]
+
+
+class Converter:
+    """
+    A markdown to LaTeX converter with its own sentence and block extensions.
+
+    The extensions of a converter are registered in a `Registry` of its own, made active
+    only while it converts, so that converters with different extensions, or with the
+    same ones registered again after a change, live side by side in one process. Once
+    made, a converter is only read, and can convert from several threads at a time.
+
+    A converter is pickled as the sources of its extensions, and is made again once in
+    each process it is unpickled in, e.g. the workers of a `ProcessPoolExecutor`.
+
+        converter = Converter([{"Line": "---"}], [{"name": "SingleLine", ...}])
+        latex = converter.convert('# Title\\n\\nSome text.\\n')
+    """
+
+    registry: Registry
+    # the JSON texts of the sentence and block extensions
+    _sources: tuple[str, str]
+
+    def __init__(self, sent_ext_src: list | None = None, blk_ext_src: list | None = None):
+        """
+        `sent_ext_src` and `blk_ext_src` are the JSON contents of -eS and -eB files.
+        """
+        self.registry = Registry()
+        self._sources = (json.dumps(sent_ext_src or []), json.dumps(blk_ext_src or []))
+        with self.registry.activate():
+            sent_ext.register(sent_ext_src or [])
+            blk_ext.register(blk_ext_src or [])
+
+    @staticmethod
+    def from_files(sent_ext_filename: str = '', blk_ext_filename: str = '') -> 'Converter':
+        """
+        A converter with the extensions of -eS and -eB files, as they read now, registered
+        from their bundle if "m2l compile-ext" wrote one, see `ext_bundle.register_sources`.
+        It is pickled with their contents, not their names, so that a process unpickling
+        it does not keep the extensions of files changed since.
+        """
+        return Converter._from_sources(*ext_bundle.read_sources(sent_ext_filename, blk_ext_filename))
+
+    @staticmethod
+    def _from_sources(sent_ext_source: str, blk_ext_source: str) -> 'Converter':
+        converter = Converter()
+        with converter.registry.activate():
+            ext_bundle.register_sources(sent_ext_source, blk_ext_source)
+        converter._sources = (sent_ext_source, blk_ext_source)
+        return converter
+
+    def __reduce__(self):
+        return _unpickle, (self._sources,)
+
+    def convert(self, markdown: str, argv: list[str] | None = None,
+                cancelled: threading.Event | None = None, record_command: bool = True,
+                filename: str | None = None) -> str:
+        """
+        Convert markdown text into LaTeX. `argv` is the command recorded in the output,
+        `sys.argv` by default, unless not `record_command`. Files included by the text are
+        relative to the directory of `filename`, the file it was read from, if given, or
+        to the working directory.
+
+        Once `cancelled` is set, the conversion stops before the next block, raising
+        `concurrent.futures.CancelledError`.
+        """
+        lines = (markdown + EOF_SENTINEL).split('\n')
+        with self.registry.activate():
+            return convert_lines(lines if cancelled is None else _until_set(lines, cancelled), argv=argv,
+                                 record_command=record_command, include_graph=IncludeGraph(filename))
+
+    def convert_source(self, src: str, argv: list[str] | None = None,
+                       cancelled: threading.Event | None = None, record_command: bool = True) -> str:
+        """
+        `convert`, for the markdown file `src`.
+        """
+        lines = io_handler.read_mapped_lines_from_file_generator(src)()
+        with self.registry.activate():
+            return convert_lines(lines if cancelled is None else _until_set(lines, cancelled), argv=argv,
+                                 record_command=record_command, include_graph=IncludeGraph(src))
+
+    def convert_file(self, src: str, dst: str, argv: list[str] | None = None,
+                     cancelled: threading.Event | None = None, record_command: bool = True) -> None:
+        """
+        `convert_source`, into the LaTeX file `dst`, which is only written if the
+        conversion succeeds.
+        """
+        lines = io_handler.read_mapped_lines_from_file_generator(src)()
+        sink = io_handler.FileSink(dst)
+        with self.registry.activate():
+            try:
+                emit_lines(lines if cancelled is None else _until_set(lines, cancelled), sink.write, argv=argv,
+                           record_command=record_command, include_graph=IncludeGraph(src))
+            finally:
+                sink.close()
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+from md2latex_converter.core import ext_bundle, inline, io_handler
+from md2latex_converter.core.includes import IncludeGraph
+from md2latex_converter.core.render_cache import RenderCache
+from md2latex_converter.core.workflow import emit_lines
+
+
+_render_cache: RenderCache | None = None
+_record_command = True
+
+
+def _register(sent_ext_filename: str, blk_ext_filename: str, render_cache_args: tuple[str, int] | None,
+              memo_settings: tuple[int, bool], record_command: bool) -> None:
+    global _render_cache, _record_command
+
+    ext_bundle.register_files_generator(sent_ext_filename, blk_ext_filename)()
+    inline.configure_memo(*memo_settings)
+    _record_command = record_command
+    _render_cache = RenderCache(*render_cache_args) if render_cache_args is not None else None
+
+
+def _convert(input_filename: str, output_filename: str) -> tuple[str, str, str | None, float, int, int]:
+    start = time.perf_counter()
+    hits, misses = (_render_cache.hits, _render_cache.misses) if _render_cache is not None else (0, 0)
+    sink = io_handler.FileSink(output_filename)
+    try:
+        try:
+            emit_lines(io_handler.read_mapped_lines_from_file_generator(input_filename)(), sink.write, _render_cache,
+                       record_command=_record_command, include_graph=IncludeGraph(input_filename))
+        finally:
+            sink.close()
+            if _render_cache is not None:
+                _render_cache.close()
+                hits, misses = _render_cache.hits - hits, _render_cache.misses - misses
+        error = None
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+    return input_filename, output_filename, error, time.perf_counter() - start, hits, misses
+
+
+def batch_handler_generator(
+        jobs: list[tuple[str, str]],
+        sent_ext_filename: str,
+        blk_ext_filename: str,
+        workers: int | None,
+        render_cache_args: tuple[str, int] | None = None,
+        render_cache_stats: bool = False,
+        record_command: bool = True
+) -> Callable[[], None]:
+    """
+    Convert every (input, output) pair in `jobs`, spread over `workers` processes.
+
+    Extensions are registered, and the render cache is opened, once in each worker
+    process when it starts. A failure
+    on one file does not stop the others; a summary is printed at the end, and the
+    exit status is non-zero if any file failed.
+    """
+
+    def _r():
+        start = time.perf_counter()
+
+        if workers == 1 or len(jobs) <= 1:
+            _register(sent_ext_filename, blk_ext_filename, render_cache_args, inline.memo_settings(), record_command)
+            results = [_convert(*_) for _ in jobs]
+        else:
+            # several files per task, so that short files do not pay a round trip each
+            chunksize = max(1, len(jobs) // (8 * (workers or os.cpu_count() or 1)))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_register,
+                                     initargs=(sent_ext_filename, blk_ext_filename, render_cache_args,
+                                               inline.memo_settings(), record_command)) as executor:
+                results = list(executor.map(_convert, *zip(*jobs), chunksize=chunksize))
+
+        failed = 0
+        for input_filename, output_filename, error, seconds, _, _ in results:
+            if error is None:
+                print(f'ok     {input_filename} -> {output_filename} ({seconds:.3f}s)')
+            else:
+                failed += 1
+                print(f'FAILED {input_filename}: {error}')
+
+        print(f'{len(results) - failed} succeeded, {failed} failed, '
+              f'in {time.perf_counter() - start:.3f}s')
+        sys.stdout.flush()
+
+        if render_cache_stats and render_cache_args is not None:
+            hits, misses = sum([_[4] for _ in results]), sum([_[5] for _ in results])
+            looked_up = hits + misses
+            print(f'render cache {render_cache_args[0]}: {hits} hits, {misses} misses '
+                  f'({hits / looked_up * 100 if looked_up else 0.0:.1f}% hit rate)', file=sys.stderr)
+            sys.stderr.flush()
+
+        if failed:
+            sys.exit(1)
+
+    return _r
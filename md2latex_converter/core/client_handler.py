@@ -0,0 +1,110 @@
+import json
+import os
+import socket
+import sys
+from typing import Callable, Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from md2latex_converter.core.io_handler import Sink
+
+# kept in sync with workflow.EOF_SENTINEL, without importing the converter
+_EOF_SENTINEL = '\n\n\n\0'
+
+
+def default_socket_filename() -> str:
+    directory = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(directory, f'm2l-{os.getuid()}.sock')
+
+
+def _post(sock: socket.socket, path: str, body: bytes) -> tuple[int, bytes]:
+    """
+    A minimal HTTP/1.0 exchange, as http.client takes longer to import than most conversions.
+    """
+    sock.sendall(f'POST {path} HTTP/1.0\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode('ascii') + body)
+    chunks = []
+    while chunk := sock.recv(1 << 16):
+        chunks.append(chunk)
+    head, _, content = b''.join(chunks).partition(b'\r\n\r\n')
+    return int(head.split(b' ', 2)[1]), content
+
+
+def request_conversion(
+        markdown: str,
+        sent_ext_filename: str,
+        blk_ext_filename: str,
+        socket_filename: str | None,
+        port: int | None,
+        timeout: float = 600.0,
+        record_command: bool = True,
+        filename: str | None = None
+) -> str | None:
+    """
+    Ask the daemon to convert `markdown`, read from `filename` if given. None is given if
+    no daemon is listening.
+    """
+    body = json.dumps({
+        'markdown': markdown,
+        'sent_ext': os.path.abspath(sent_ext_filename) if sent_ext_filename else '',
+        'blk_ext': os.path.abspath(blk_ext_filename) if blk_ext_filename else '',
+        'argv': sys.argv,
+        'record_command': record_command,
+        'filename': os.path.abspath(filename) if filename else None,
+    }).encode('utf-8')
+
+    if port is not None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ('127.0.0.1', port)
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = socket_filename or default_socket_filename()
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+        status, content = _post(sock, '/convert', body)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    finally:
+        sock.close()
+
+    reply = json.loads(content)
+    assert status == 200, f'the daemon failed to convert, {reply.get("error")}'
+    return reply['latex']
+
+
+def client_handler_generator(
+        sent_ext_filename: str,
+        blk_ext_filename: str,
+        provider: Callable[[], str | Iterable[str]],
+        sinks: list['Sink'],
+        socket_filename: str | None,
+        port: int | None,
+        fallback: Callable[[], None],
+        record_command: bool = True,
+        input_filename: str | None = None
+) -> Callable[[], None]:
+    """
+    Convert through the daemon started by "m2l serve", or run `fallback`, i.e. convert
+    in this process, if no daemon is listening. `input_filename` is the file `provider`
+    reads, if any, which included files are relative to.
+    """
+
+    def _r():
+        src = provider()
+        if isinstance(src, str):
+            markdown = src.removesuffix(_EOF_SENTINEL)
+        else:
+            # file lines are followed by the two blank lines of the sentinel
+            markdown = '\n'.join(src).removesuffix('\n\n')
+
+        tar = request_conversion(markdown, sent_ext_filename, blk_ext_filename, socket_filename, port,
+                                 record_command=record_command, filename=input_filename)
+        if tar is None:
+            fallback()
+            return
+
+        for _ in sinks:
+            _.write(tar)
+            _.close()
+
+    return _r
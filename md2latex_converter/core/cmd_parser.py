@@ -1,10 +1,14 @@
 import os
 import sys
-from typing import Callable, List
+from collections import Counter
+from typing import Callable, Iterable, List, TYPE_CHECKING
 
-from md2latex_converter.core.configure_handler import config
-from md2latex_converter.core.helpme_handler import handler
-from md2latex_converter.core.workflow import worker_generator
+# handlers are imported by the command that needs them, to keep "m2l help" or "m2l --client"
+# from loading the converter, and file mode from loading the clipboard.
+if TYPE_CHECKING:
+    from md2latex_converter.core.includes import IncludeGraph
+    from md2latex_converter.core.io_handler import Sink
+    from md2latex_converter.core.render_cache import RenderCache
 
 
 def _warn_ifnot(expr, s):
@@ -13,6 +17,71 @@ def _warn_ifnot(expr, s):
         sys.stderr.flush()
 
 
+def _default_output_filename(input_filename: str) -> str:
+    output_filename = os.path.basename(input_filename)
+    if output_filename.endswith('.md'):
+        return output_filename[:-3] + '.tex'
+    else:
+        return output_filename + '.tex'
+
+
+def _expand_inputs(patterns: list[str]) -> list[str]:
+    """
+    Expand the inputs given on the command line into markdown file names.
+
+    An existing file is taken as it is, even if its name has wildcards, e.g. notes[1].md.
+    A directory stands for every .md file under it, a pattern with wildcards stands for
+    the files matching it, and either fails if it stands for no file. Anything else is
+    taken as a file name as it is. Duplicates are dropped, keeping the first occurrence.
+    """
+    import glob
+
+    ret: list[str] = []
+    for pattern in patterns:
+        if os.path.isfile(pattern):
+            ret.append(pattern)
+        elif os.path.isdir(pattern):
+            matched = sorted(glob.glob(os.path.join(glob.escape(pattern), '**', '*.md'), recursive=True))
+            assert matched, f'no markdown file found in the directory {pattern}'
+            ret.extend(matched)
+        elif _has_magic(pattern):
+            matched = sorted([_ for _ in glob.glob(pattern, recursive=True) if os.path.isfile(_)])
+            assert matched, f'no file matches {pattern}'
+            ret.extend(matched)
+        else:
+            ret.append(pattern)
+    return list(dict.fromkeys(ret))
+
+
+def _has_magic(pattern: str) -> bool:
+    # as glob.has_magic, without importing glob and re for every command
+    return any([_ in pattern for _ in '*?['])
+
+
+def _is_batch(patterns: list[str]) -> bool:
+    return len(patterns) > 1 or any([os.path.isdir(_) or (_has_magic(_) and not os.path.isfile(_)) for _ in patterns])
+
+
+def _report_after(handler: Callable[[], None], report: Callable[[], str]) -> Callable[[], None]:
+    def _r():
+        try:
+            handler()
+        finally:
+            print(report(), file=sys.stderr)
+            sys.stderr.flush()
+
+    return _r
+
+
+def _configure_memo_before(handler: Callable[[], None], size: int | None, per_document: bool) -> Callable[[], None]:
+    def _r():
+        from md2latex_converter.core import inline
+        inline.configure_memo(inline.DEFAULT_MEMO_SIZE if size is None else size, per_document)
+        handler()
+
+    return _r
+
+
 class Cmd:
     handler: Callable[[], None]
     output_to_stdout: bool
@@ -21,6 +90,31 @@ class Cmd:
     input_from_pastebin: bool
     output_filename: str | None
     input_filename: str | None
+    batch_jobs: list[tuple[str, str]] | None
+    jobs: int | None
+    render_cache_filename: str
+    render_cache_size: int | None
+    render_cache_stats: bool
+    watch: bool
+    serve: bool
+    client: bool
+    socket_filename: str | None
+    port: int | None
+    max_concurrency: int | None
+    allow_tcp: bool
+    compile_ext: bool
+    stats: bool
+    stats_filename: str | None
+    profile_prefix: str | None
+    memo_size: int | None
+    memo_per_document: bool
+    split: bool
+    record_command: bool
+    depfile_filename: str | None
+    filter: bool
+    nul: bool
+    # the files included by the input, see `_include_graph`
+    include_graph: 'IncludeGraph | None'
 
     def __init__(self,
                  input_filename: str | None,
@@ -30,7 +124,30 @@ class Cmd:
                  help_me: bool,
                  output_to_stdout: bool,
                  sent_ext_filename: str = '',
-                 blk_ext_filename: str = ''
+                 blk_ext_filename: str = '',
+                 batch_inputs: list[str] | None = None,
+                 jobs: int | None = None,
+                 render_cache_filename: str = '',
+                 render_cache_size: int | None = None,
+                 render_cache_stats: bool = False,
+                 watch: bool = False,
+                 serve: bool = False,
+                 client: bool = False,
+                 socket_filename: str | None = None,
+                 port: int | None = None,
+                 max_concurrency: int | None = None,
+                 allow_tcp: bool = False,
+                 compile_ext: bool = False,
+                 stats: bool = False,
+                 stats_filename: str | None = None,
+                 profile_prefix: str | None = None,
+                 memo_size: int | None = None,
+                 memo_per_document: bool = False,
+                 split: bool = False,
+                 record_command: bool = True,
+                 depfile_filename: str | None = None,
+                 filter: bool = False,
+                 nul: bool = False
                  ):
         assert not (configure and (
                 input_filename or output_filename or input_from_pastebin or help_me or output_to_stdout or sent_ext_filename or blk_ext_filename)), \
@@ -40,6 +157,76 @@ class Cmd:
             '"m2l help" does not accept other arguments.'
         assert not (input_filename and input_from_pastebin), \
             '"m2l" does not support multiple sources of input.'
+        assert not (batch_inputs and (
+                input_filename or output_filename or input_from_pastebin or output_to_stdout)), \
+            '"m2l" with several inputs does not accept -o, -pb or -stdout.'
+        assert jobs is None or jobs >= 1, f'--jobs should be a positive number, reading {jobs}'
+        assert not (serve and (
+                input_filename or output_filename or input_from_pastebin or configure or help_me or output_to_stdout
+                or sent_ext_filename or blk_ext_filename or batch_inputs or watch or client)), \
+            '"m2l serve" only accepts --socket, --port, --allow-tcp and --max-concurrency.'
+        assert not (client and not (input_filename or input_from_pastebin)), \
+            '--client needs an input, try "m2l foo.md --client".'
+        assert not (client and (batch_inputs or watch or render_cache_filename)), \
+            '--client does not accept several inputs, --watch or --cache.'
+        assert not ((socket_filename or port is not None) and not (serve or client)), \
+            '--socket and --port are for "m2l serve" and --client.'
+        assert not (socket_filename and port is not None), '--socket and --port cannot be used together.'
+        assert not (max_concurrency is not None and not serve), '--max-concurrency is for "m2l serve".'
+        assert not (allow_tcp and not (serve and port is not None)), '--allow-tcp is for "m2l serve --port".'
+        # any local user can connect to the port, and have the daemon read -eS/-eB and !include files for them
+        assert not (serve and port is not None and not allow_tcp), \
+            '"m2l serve --port" lets every local user have the daemon read files with your rights, ' \
+            'add --allow-tcp to accept that, or leave --port out to serve on a Unix socket only you can use.'
+        assert max_concurrency is None or max_concurrency >= 1, \
+            f'--max-concurrency should be a positive number, reading {max_concurrency}'
+        assert not (compile_ext and (
+                input_filename or output_filename or input_from_pastebin or configure or help_me or output_to_stdout
+                or batch_inputs or jobs is not None or render_cache_filename or watch or serve or client)), \
+            '"m2l compile-ext" only accepts -eS and -eB.'
+        assert not (compile_ext and not (sent_ext_filename or blk_ext_filename)), \
+            '"m2l compile-ext" needs extensions, try "m2l compile-ext -eS sent_ext.json -eB blk_ext.json".'
+        assert not ((stats or stats_filename or profile_prefix) and not (input_filename or input_from_pastebin)), \
+            '--stats, --stats-json and --cprofile need an input, try "m2l foo.md --stats".'
+        assert not ((stats or stats_filename or profile_prefix) and (
+                batch_inputs or watch or client or (jobs is not None and jobs > 1))), \
+            '--stats, --stats-json and --cprofile measure a single conversion in this process, ' \
+            'without several inputs, --watch, --client or --jobs.'
+        assert not (watch and not input_filename), \
+            '--watch needs an input file, try "m2l foo.md --watch".'
+        assert not ((render_cache_size is not None or render_cache_stats) and not render_cache_filename), \
+            '--cache-size and --cache-stats need a cache, try "m2l foo.md --cache m2l_cache.sqlite".'
+        assert not ((memo_size is not None or memo_per_document) and (configure or help_me or compile_ext or client)), \
+            '--memo and --memo-document are for conversions in this process or in "m2l serve".'
+        assert not (split and not input_filename), \
+            '--split needs an input file, try "m2l foo.md -o foo.tex --split".'
+        assert not (split and (
+                batch_inputs or input_from_pastebin or output_to_stdout or client or (jobs is not None and jobs > 1))), \
+            '--split writes files of its own, without several inputs, -pb, -stdout, --client or --jobs.'
+        assert not (depfile_filename and not input_filename), \
+            '--depfile needs an input file, try "m2l foo.md -o foo.tex --depfile foo.d".'
+        assert not (depfile_filename and (batch_inputs or client)), \
+            '--depfile lists the inputs of a conversion in this process, without several inputs or --client.'
+        assert not (filter and (
+                input_filename or output_filename or input_from_pastebin or configure or help_me or output_to_stdout
+                or batch_inputs or (jobs is not None and jobs > 1) or watch or serve or client or compile_ext
+                or split or depfile_filename)), \
+            '"m2l filter" reads stdin and writes stdout, only accepting -eS, -eB, --nul, --cache, --memo and --no-command.'
+        assert not (nul and not filter), '--nul is for "m2l filter".'
+
+        batch_jobs = None
+        if batch_inputs:  # read many files and compile each of them to tex
+            for _ in [sent_ext_filename, blk_ext_filename]:
+                if _ is not None and _ != '':
+                    assert _.endswith('.json'), f'extension {_} should be a json file!'
+
+            batch_jobs = []
+            for _ in _expand_inputs(batch_inputs):
+                _warn_ifnot(_.endswith('.md'), f'input file name {_} does not seem to be a MarkDown file.')
+                batch_jobs.append((_, _default_output_filename(_)))
+
+            for _, count in Counter([_[1] for _ in batch_jobs]).items():
+                _warn_ifnot(count == 1, f'{_} is the output of several inputs and will be overwritten.')
 
         if input_filename:  # read a file and compile it to tex
             assert isinstance(input_filename, str), \
@@ -53,11 +240,7 @@ class Cmd:
                 assert sent_ext_filename.endswith('.json'), f'extension {sent_ext_filename} should be a json file!'
 
             if output_filename is None or output_filename == '':
-                output_filename = os.path.basename(input_filename)
-                if output_filename.endswith('.md'):
-                    output_filename = output_filename[:-3] + '.tex'
-                else:
-                    output_filename = output_filename + '.tex'
+                output_filename = _default_output_filename(input_filename)
             else:
                 _warn_ifnot(output_filename.endswith('.tex'),
                             f'output file name {output_filename} does not seem to be a LaTeX file.')
@@ -94,65 +277,227 @@ class Cmd:
         self.output_to_stdout = output_to_stdout
         self.sent_ext_filename = sent_ext_filename
         self.blk_ext_filename = blk_ext_filename
+        self.batch_jobs = batch_jobs
+        self.jobs = jobs
+        self.render_cache_filename = render_cache_filename
+        self.render_cache_size = render_cache_size
+        self.render_cache_stats = render_cache_stats
+        self.watch = watch
+        self.serve = serve
+        self.client = client
+        self.socket_filename = socket_filename
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.allow_tcp = allow_tcp
+        self.compile_ext = compile_ext
+        self.stats = stats
+        self.stats_filename = stats_filename
+        self.profile_prefix = profile_prefix
+        self.memo_size = memo_size
+        self.memo_per_document = memo_per_document
+        self.split = split
+        self.record_command = record_command
+        self.depfile_filename = depfile_filename
+        self.include_graph = None
+        self.filter = filter
+        self.nul = nul
 
         if self.configure:
+            from md2latex_converter.core.configure_handler import config
             self.handler = config
         elif self.help_me:
+            from md2latex_converter.core.helpme_handler import handler
             self.handler = handler
-        else:
-            self.handler = worker_generator(
-                self._sent_extension_handler,
-                self._blk_extension_handler,
+        elif self.serve:
+            from md2latex_converter.core import serve_handler
+            self.handler = serve_handler.serve_handler_generator(
+                self.socket_filename,
+                self.port,
+                *([self.max_concurrency] if self.max_concurrency is not None else [])
+            )
+        elif self.compile_ext:
+            from md2latex_converter.core import compile_ext_handler
+            self.handler = compile_ext_handler.compile_ext_handler_generator(
+                self.sent_ext_filename,
+                self.blk_ext_filename
+            )
+        elif self.filter:
+            from md2latex_converter.core import filter_handler
+            self.handler = filter_handler.filter_handler_generator(
+                self._register,
+                self._render_cache,
+                self.nul,
+                self.record_command
+            )
+        elif self.batch_jobs is not None:
+            from md2latex_converter.core import batch_handler
+            self.handler = batch_handler.batch_handler_generator(
+                self.batch_jobs,
+                self.sent_ext_filename,
+                self.blk_ext_filename,
+                self.jobs,
+                self._render_cache_args,
+                self.render_cache_stats,
+                self.record_command
+            )
+        elif self.watch:
+            from md2latex_converter.core import watch_handler
+            self.handler = watch_handler.watch_handler_generator(
+                self.input_filename,
+                [self.sent_ext_filename, self.blk_ext_filename],
+                self._register,
+                self._write_depfile_after(self._converter(self._render_cache)),
+                dependencies=lambda: self._include_graph.inputs
+            )
+        elif self.client:
+            from md2latex_converter.core import client_handler
+            self.handler = client_handler.client_handler_generator(
+                self.sent_ext_filename,
+                self.blk_ext_filename,
                 self._provider,
-                self._consumer
+                self._sinks,
+                self.socket_filename,
+                self.port,
+                self._convert_in_process,
+                self.record_command,
+                self.input_filename
             )
+        else:
+            self.handler = self._convert_in_process
+
+        if self.stats or self.stats_filename:
+            from md2latex_converter.core import instrument
+            self.handler = instrument.instrument_handler_generator(self.handler, self.stats, self.stats_filename)
+        if self.profile_prefix:
+            from md2latex_converter.core import instrument
+            self.handler = instrument.cprofile_handler_generator(self.handler, self.profile_prefix)
+        if self.memo_size is not None or self.memo_per_document:
+            self.handler = _configure_memo_before(self.handler, self.memo_size, self.memo_per_document)
+
+    def _convert_in_process(self) -> None:
+        if self.jobs is not None and self.jobs > 1 and self.input_filename:
+            from md2latex_converter.core import parallel_handler
+            self._register()
+            parallel_handler.parallel_handler_generator(
+                self.input_filename,
+                self._sinks,
+                self.jobs,
+                self.sent_ext_filename,
+                self.blk_ext_filename,
+                self._render_cache_args,
+                self.render_cache_stats,
+                self.record_command,
+                self._include_graph
+            )()
+            self._write_depfile()
+            return
+
+        render_cache = self._render_cache
+        convert = self._converter(render_cache)
+        if render_cache is not None and self.render_cache_stats:
+            convert = _report_after(convert, render_cache.stats)
+        self._register()
+        convert()
+        self._write_depfile()
 
     def __str__(self):
         if self.configure:
             return 'm2l configure'
         elif self.help_me:
             return 'm2l help'
+        elif self.serve:
+            return 'm2l serve' + (f' --port {self.port}' if self.port is not None else '')
+        elif self.compile_ext:
+            return 'm2l compile-ext'
+        elif self.filter:
+            return 'm2l filter' + (' --nul' if self.nul else '')
+        elif self.batch_jobs is not None:
+            return f'm2l {" ".join([_[0] for _ in self.batch_jobs])}' + \
+                (f' --jobs {self.jobs}' if self.jobs is not None else '')
         elif self.input_filename:
-            return f'm2l {self.input_filename} -o {self.output_filename}'
+            return f'm2l {self.input_filename} -o {self.output_filename}' + (' --watch' if self.watch else '') + \
+                (f' --jobs {self.jobs}' if self.jobs is not None else '')
         elif self.input_from_pastebin:
             if self.output_filename is None:
                 return f'm2l -pb'
             else:
                 return f'm2l -pb -o {self.output_filename}'
 
+    def _converter(self, render_cache: 'RenderCache | None') -> Callable[[], None]:
+        if self.split:
+            from md2latex_converter.core import split_handler
+            return split_handler.split_handler_generator(self._provider, self.output_filename, render_cache,
+                                                         self.record_command, self._include_graph)
+        from md2latex_converter.core.workflow import converter_generator
+        return converter_generator(self._provider, self._sinks, render_cache, self.record_command,
+                                   self._include_graph)
+
     @property
-    def _sent_extension_handler(self) -> Callable[[], list]:
-        from md2latex_converter.core import io_handler
-        if self.sent_ext_filename is not None and self.sent_ext_filename != '':
-            return io_handler.load_sent_ext_from_json_generator(self.sent_ext_filename)
-        else:
-            return lambda: []
+    def _include_graph(self) -> 'IncludeGraph':
+        # kept for the life of the command, so that --watch renders again only the included files that changed
+        if self.include_graph is None:
+            from md2latex_converter.core.includes import IncludeGraph
+            self.include_graph = IncludeGraph(self.input_filename or None)
+        return self.include_graph
+
+    def _write_depfile(self) -> None:
+        """
+        Write the Make rule of the output, depending on every file the last conversion read.
+        """
+        if not self.depfile_filename:
+            return
+        from md2latex_converter.core import includes, io_handler
+        inputs = [self.input_filename, *self._include_graph.inputs,
+                  *[_ for _ in [self.sent_ext_filename, self.blk_ext_filename] if _ is not None and _ != '']]
+        sink = io_handler.FileSink(self.depfile_filename, keep_unchanged=True)
+        sink.write(includes.depfile(self.output_filename, inputs))
+        sink.close()
+
+    def _write_depfile_after(self, convert: Callable[[], None]) -> Callable[[], None]:
+        def _r():
+            convert()
+            self._write_depfile()
+
+        return _r
 
     @property
-    def _blk_extension_handler(self) -> Callable[[], list]:
-        from md2latex_converter.core import io_handler
-        if self.blk_ext_filename is not None and self.blk_ext_filename != '':
-            return io_handler.load_blk_ext_from_json_generator(self.blk_ext_filename)
-        else:
-            return lambda: []
+    def _render_cache_args(self) -> tuple[str, int] | None:
+        if self.render_cache_filename is None or self.render_cache_filename == '':
+            return None
+        from md2latex_converter.core.render_cache import DEFAULT_MAX_BYTES
+        if self.render_cache_size is None:
+            return self.render_cache_filename, DEFAULT_MAX_BYTES
+        return self.render_cache_filename, self.render_cache_size * 1024 * 1024
 
     @property
-    def _consumer(self) -> List[Callable[[str], None]]:
+    def _render_cache(self) -> 'RenderCache | None':
+        if (args := self._render_cache_args) is None:
+            return None
+        from md2latex_converter.core.render_cache import RenderCache
+        return RenderCache(*args)
+
+    @property
+    def _register(self) -> Callable[[], None]:
+        from md2latex_converter.core import ext_bundle
+        return ext_bundle.register_files_generator(self.sent_ext_filename, self.blk_ext_filename)
+
+    @property
+    def _sinks(self) -> 'List[Sink]':
         from md2latex_converter.core import io_handler
-        _r: List[Callable[[str], None]] = []
+        _r: List[io_handler.Sink] = []
         if self.output_filename is not None and self.output_filename != '':
-            _r.append(io_handler.write_to_file_generator(self.output_filename))
+            _r.append(io_handler.FileSink(self.output_filename, keep_unchanged=True))
         if self.input_from_pastebin:
-            _r.append(io_handler.write_to_pastebin)
+            _r.append(io_handler.PastebinSink())
         if self.output_to_stdout:
-            _r.append(io_handler.write_to_stdout)
-        return _r
+            _r.append(io_handler.StdoutSink())
+        return [io_handler.TeeSink(_r)] if len(_r) > 1 else _r
 
     @property
-    def _provider(self) -> Callable[[], str]:
+    def _provider(self) -> Callable[[], str | Iterable[str]]:
         from md2latex_converter.core import io_handler
         if self.input_filename:
-            return io_handler.read_from_file_generator(self.input_filename)
+            return io_handler.read_mapped_lines_from_file_generator(self.input_filename)
         else:
             return io_handler.read_from_pastebin
 
@@ -164,7 +509,7 @@ def parse_command() -> Cmd:
 def _parse_command(args) -> Cmd:
     i, argc = 1, len(args)
 
-    input_filename = None
+    input_filenames: list[str] = []
     output_filename = None
     input_from_pastebin = False
     configure = False
@@ -172,6 +517,28 @@ def _parse_command(args) -> Cmd:
     output_to_stdout = False
     sent_ext_filename = ''
     blk_ext_filename = ''
+    jobs = None
+    render_cache_filename = ''
+    render_cache_size = None
+    render_cache_stats = False
+    watch = False
+    serve = False
+    client = False
+    socket_filename = None
+    port = None
+    max_concurrency = None
+    allow_tcp = False
+    compile_ext = False
+    stats = False
+    stats_filename = None
+    profile_prefix = None
+    memo_size = None
+    memo_per_document = False
+    split = False
+    record_command = True
+    depfile_filename = None
+    filter = False
+    nul = False
 
     while i < argc:
         temp = args[i]
@@ -203,6 +570,117 @@ def _parse_command(args) -> Cmd:
 
             i += 1
 
+        elif temp in ['-j', '--j', '-jobs', '--jobs']:
+            assert i + 1 < argc, f'-j symbol without number of processes, try "m2l docs/ -j 8".'
+            assert args[i + 1].isdigit(), f'-j symbol expects a number of processes, reading {args[i + 1]}'
+
+            jobs = int(args[i + 1])
+
+            i += 1
+
+        elif temp in ['-cache', '--cache']:
+            assert i + 1 < argc, f'--cache symbol without filename, try "m2l foo.md --cache m2l_cache.sqlite".'
+
+            render_cache_filename = args[i + 1]
+
+            i += 1
+
+        elif temp in ['-cache-size', '--cache-size']:
+            assert i + 1 < argc, f'--cache-size symbol without size, try "m2l foo.md --cache m2l_cache.sqlite --cache-size 64".'
+            assert args[i + 1].isdigit(), f'--cache-size symbol expects a size in MB, reading {args[i + 1]}'
+
+            render_cache_size = int(args[i + 1])
+
+            i += 1
+
+        elif temp in ['-cache-stats', '--cache-stats']:
+            render_cache_stats = True
+
+        elif temp in ['serve', '--serve']:
+            serve = True
+
+        elif temp in ['filter', '--filter']:
+            filter = True
+
+        elif temp in ['-nul', '--nul', '-0']:
+            nul = True
+
+        elif temp in ['compile-ext', '--compile-ext']:
+            compile_ext = True
+
+        elif temp in ['-client', '--client']:
+            client = True
+
+        elif temp in ['-socket', '--socket']:
+            assert i + 1 < argc, f'--socket symbol without filename, try "m2l serve --socket /tmp/m2l.sock".'
+
+            socket_filename = args[i + 1]
+
+            i += 1
+
+        elif temp in ['-port', '--port']:
+            assert i + 1 < argc, f'--port symbol without port, try "m2l serve --port 8642".'
+            assert args[i + 1].isdigit(), f'--port symbol expects a port number, reading {args[i + 1]}'
+
+            port = int(args[i + 1])
+
+            i += 1
+
+        elif temp in ['-max-concurrency', '--max-concurrency']:
+            assert i + 1 < argc, f'--max-concurrency symbol without number, try "m2l serve --max-concurrency 8".'
+            assert args[i + 1].isdigit(), f'--max-concurrency symbol expects a number, reading {args[i + 1]}'
+
+            max_concurrency = int(args[i + 1])
+
+            i += 1
+
+        elif temp in ['-allow-tcp', '--allow-tcp']:
+            allow_tcp = True
+
+        elif temp in ['-stats', '--stats']:
+            stats = True
+
+        elif temp in ['-stats-json', '--stats-json']:
+            assert i + 1 < argc, f'--stats-json symbol without filename, try "m2l foo.md --stats-json stats.json".'
+
+            stats_filename = args[i + 1]
+
+            i += 1
+
+        elif temp in ['-cprofile', '--cprofile', '-profile', '--profile']:
+            assert i + 1 < argc, f'--cprofile symbol without filename prefix, try "m2l foo.md --cprofile m2l".'
+
+            profile_prefix = args[i + 1]
+
+            i += 1
+
+        elif temp in ['-memo', '--memo']:
+            assert i + 1 < argc, f'--memo symbol without size, try "m2l foo.md --memo 65536".'
+            assert args[i + 1].isdigit(), f'--memo symbol expects a number of strings, reading {args[i + 1]}'
+
+            memo_size = int(args[i + 1])
+
+            i += 1
+
+        elif temp in ['-memo-document', '--memo-document']:
+            memo_per_document = True
+
+        elif temp in ['-split', '--split']:
+            split = True
+
+        elif temp in ['-no-command', '--no-command']:
+            record_command = False
+
+        elif temp in ['-depfile', '--depfile']:
+            assert i + 1 < argc, f'--depfile symbol without filename, try "m2l foo.md -o foo.tex --depfile foo.d".'
+
+            depfile_filename = args[i + 1]
+
+            i += 1
+
+        elif temp in ['-w', '--w', '-watch', '--watch']:
+            watch = True
+
         elif temp in ['-pb', '--pb', '-p', '--p', 'pastebin', '--pastebin']:
             input_from_pastebin = True
 
@@ -210,9 +688,20 @@ def _parse_command(args) -> Cmd:
             output_to_stdout = True
 
         else:
-            input_filename = temp
+            input_filenames.append(temp)
 
         i += 1
 
+    batch_inputs = input_filenames if _is_batch(input_filenames) else None
+    input_filename = input_filenames[0] if input_filenames and batch_inputs is None else None
+
     return Cmd(input_filename, output_filename, input_from_pastebin, configure, help_me, output_to_stdout,
-               sent_ext_filename, blk_ext_filename)
+               sent_ext_filename, blk_ext_filename, batch_inputs=batch_inputs, jobs=jobs,
+               render_cache_filename=render_cache_filename, render_cache_size=render_cache_size,
+               render_cache_stats=render_cache_stats, watch=watch,
+               serve=serve, client=client, socket_filename=socket_filename, port=port,
+               max_concurrency=max_concurrency, allow_tcp=allow_tcp, compile_ext=compile_ext,
+               stats=stats, stats_filename=stats_filename, profile_prefix=profile_prefix,
+               memo_size=memo_size, memo_per_document=memo_per_document,
+               split=split, record_command=record_command, depfile_filename=depfile_filename,
+               filter=filter, nul=nul)
@@ -0,0 +1,26 @@
+import sys
+import time
+from typing import Callable
+
+from md2latex_converter.core import ext_bundle
+from md2latex_converter.data_structures.runtime_maps import EXTENDED_NAME_SENTENCE_MAP, EXTENDED_NAME_BLOCK_MAP
+
+
+def compile_ext_handler_generator(sent_ext_filename: str, blk_ext_filename: str) -> Callable[[], None]:
+    """
+    Check the extensions of the -eS/-eB files, and write their bundle into the cache, so
+    that every later command given the same files registers them from the bundle.
+    """
+
+    def _r():
+        start = time.perf_counter()
+        try:
+            filename = ext_bundle.compile_files(sent_ext_filename, blk_ext_filename)
+        except OSError as e:
+            print(f'm2l: could not write the bundle, {e}', file=sys.stderr)
+            sys.exit(1)
+        print(f'm2l: {len(EXTENDED_NAME_SENTENCE_MAP)} sentence and {len(EXTENDED_NAME_BLOCK_MAP)} block '
+              f'extensions checked in {(time.perf_counter() - start) * 1000:.1f} ms')
+        print(f'm2l: bundle written to {filename}')
+
+    return _r
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import marshal
+import os
+import sys
+from typing import Callable
+
+from md2latex_converter.data_structures import sent_ext, blk_ext
+from md2latex_converter.version import VERSION
+
+# bumped whenever what a bundle holds changes
+BUNDLE_FORMAT = 1
+BUNDLE_SUFFIX = '.m2lb'
+
+
+def default_cache_directory() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'm2l')
+
+
+def _read(filename: str) -> str:
+    if filename is None or filename == '':
+        return ''
+    with open(filename, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def read_sources(sent_ext_filename: str, blk_ext_filename: str) -> tuple[str, str]:
+    """
+    The texts of a pair of -eS/-eB files, empty for a file not given.
+    """
+    return _read(sent_ext_filename), _read(blk_ext_filename)
+
+
+def bundle_filename(sent_source: str, blk_source: str, cache_directory: str | None = None) -> str:
+    """
+    Where the bundle of a pair of extension files is cached. The name is a digest of their
+    contents, of the Python version, whose marshal format the bundle is written in, and of
+    the version of m2l.
+    """
+    sent_bytes, blk_bytes = sent_source.encode('utf-8'), blk_source.encode('utf-8')
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f'{BUNDLE_FORMAT}:{VERSION}:{sys.implementation.cache_tag}\n'.encode('utf-8'))
+    digest.update(f'{len(sent_bytes)}:'.encode('utf-8') + sent_bytes)
+    digest.update(f'{len(blk_bytes)}:'.encode('utf-8') + blk_bytes)
+    return os.path.join(cache_directory or default_cache_directory(), digest.hexdigest() + BUNDLE_SUFFIX)
+
+
+def _parse(sent_source: str, blk_source: str) -> tuple[list, list]:
+    sent_json = json.loads(sent_source) if sent_source else []
+    assert isinstance(sent_json, list), f'Wrong json format! {sent_json}'
+    blk_json = json.loads(blk_source) if blk_source else []
+    assert isinstance(blk_json, list), f'Wrong json format! Expect a list but get {blk_json}'
+    return sent_json, blk_json
+
+
+def _load(filename: str) -> tuple[list, list] | None:
+    try:
+        with open(filename, 'rb') as f:
+            bundle = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not (isinstance(bundle, tuple) and len(bundle) == 3 and bundle[0] == BUNDLE_FORMAT):
+        return None
+    return bundle[1], bundle[2]
+
+
+def _store(filename: str, sent_json: list, blk_json: list) -> None:
+    temp_filename = f'{filename}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(temp_filename, 'wb') as f:
+            f.write(marshal.dumps((BUNDLE_FORMAT, sent_json, blk_json)))
+        # readers, e.g. the workers of a batch, see either no bundle or a whole one
+        os.replace(temp_filename, filename)
+    finally:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+
+def register_sources(sent_source: str, blk_source: str, cache_directory: str | None = None) -> bool:
+    """
+    Register the extensions of the texts of a pair of -eS/-eB files, from their bundle if
+    "m2l compile-ext" wrote one, and from the JSON otherwise. Bundles are only read here,
+    never written.
+
+    A bundle holds the extensions once they are validated, so that registering from it
+    skips parsing the JSON, checking the entries and compiling the regexes of sentences,
+    which are compiled only when a line first needs them.
+
+    Gives whether the bundle was used.
+    """
+    if (bundle := _load(bundle_filename(sent_source, blk_source, cache_directory))) is not None:
+        sent_ext.register(bundle[0], validated=True)
+        blk_ext.register(bundle[1])
+        return True
+
+    sent_json, blk_json = _parse(sent_source, blk_source)
+    sent_ext.register(sent_json)
+    blk_ext.register(blk_json)
+    return False
+
+
+def register_files(sent_ext_filename: str, blk_ext_filename: str, cache_directory: str | None = None) -> bool:
+    """
+    `register_sources`, for the -eS/-eB files themselves.
+    """
+    return register_sources(*read_sources(sent_ext_filename, blk_ext_filename), cache_directory)
+
+
+def compile_files(sent_ext_filename: str, blk_ext_filename: str, cache_directory: str | None = None) -> str:
+    """
+    Check the extensions of a pair of -eS/-eB files by registering them, and write their
+    bundle. Gives the bundle filename.
+    """
+    sent_source, blk_source = read_sources(sent_ext_filename, blk_ext_filename)
+    sent_json, blk_json = _parse(sent_source, blk_source)
+    sent_ext.register(sent_json)
+    blk_ext.register(blk_json)
+
+    filename = bundle_filename(sent_source, blk_source, cache_directory)
+    _store(filename, sent_json, blk_json)
+    return filename
+
+
+def register_files_generator(sent_ext_filename: str, blk_ext_filename: str) -> Callable[[], None]:
+    def _r():
+        if sent_ext_filename or blk_ext_filename:
+            register_files(sent_ext_filename, blk_ext_filename)
+
+    return _r
@@ -0,0 +1,125 @@
+import json
+import os
+import sys
+import time
+from typing import BinaryIO, Callable, Iterator, TYPE_CHECKING
+
+from md2latex_converter.core.includes import IncludeGraph
+from md2latex_converter.core.workflow import EOF_SENTINEL, convert_lines
+
+if TYPE_CHECKING:
+    from md2latex_converter.core.render_cache import RenderCache
+
+_READ_SIZE = 64 * 1024
+# the render cache is written every so many records, or once so much new LaTeX is kept
+_FLUSH_RECORDS = 256
+_FLUSH_BYTES = 4 * 1024 * 1024
+
+
+def _nul_records(stream: BinaryIO) -> Iterator[bytes]:
+    """
+    The records of `stream` ended by '\\0', each given as soon as its end is read. The
+    text after the last '\\0' is a record as well, unless blank.
+    """
+    # the start of a record read so far, kept apart so that a long record is not copied for each chunk
+    pending = bytearray()
+    while chunk := stream.read1(_READ_SIZE):
+        *records, rest = chunk.split(b'\0')
+        if records:
+            records[0] = bytes(pending) + records[0]
+            pending.clear()
+            yield from records
+        pending += rest
+    if pending.strip():
+        yield bytes(pending)
+
+
+def _json_records(stream: BinaryIO) -> Iterator[bytes]:
+    for _ in stream:
+        if _.strip():
+            yield _
+
+
+def filter_handler_generator(
+        register: Callable[[], None],
+        render_cache: 'RenderCache | None' = None,
+        nul: bool = False,
+        record_command: bool = True,
+        source: BinaryIO | None = None,
+        target: BinaryIO | None = None
+) -> Callable[[], None]:
+    """
+    Convert every document read from `source`, stdin by default, and write each result to
+    `target`, stdout by default, flushed as soon as it is converted, so that many small
+    documents are converted by one process.
+
+    Records are JSON lines, {"id": ..., "markdown": ..., "filename": ...}, "filename" being
+    optional and the file which included files are relative to. Results are JSON lines,
+    {"id": ..., "latex": ..., "error": ..., "ms": ...}, with "latex" null for a failed
+    record and "error" null otherwise.
+
+    If `nul`, records are markdown texts ended by '\\0', and results are LaTeX texts ended
+    by '\\0', an empty one for a failed record, whose error is reported on stderr.
+
+    The blocks `render_cache` renders are written every few hundred records, so that a
+    long stream keeps its memory bounded and its work saved if it is killed.
+    """
+
+    def _convert(markdown: str, filename: str | None) -> str:
+        return convert_lines((markdown + EOF_SENTINEL).split('\n'), render_cache, record_command=record_command,
+                             include_graph=IncludeGraph(filename))
+
+    def _json_result(record: bytes) -> bytes:
+        start = time.perf_counter()
+        identifier, latex, error = None, None, None
+        try:
+            request = json.loads(record)
+            assert isinstance(request, dict) and isinstance(request.get('markdown'), str), \
+                f'wrong record! expect {{"id": ..., "markdown": ...}}'
+            identifier = request.get('id')
+            latex = _convert(request['markdown'], request.get('filename'))
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        result = {'id': identifier, 'latex': latex, 'error': error,
+                  'ms': round((time.perf_counter() - start) * 1000, 3)}
+        return json.dumps(result, ensure_ascii=False).encode('utf-8') + b'\n'
+
+    def _nul_result(index: int, record: bytes) -> bytes:
+        try:
+            return _convert(record.decode('utf-8'), None).encode('utf-8') + b'\0'
+        except Exception as e:
+            print(f'm2l: failed to convert record {index}, {type(e).__name__}: {e}', file=sys.stderr)
+            sys.stderr.flush()
+            return b'\0'
+
+    def _flush_after(index: int) -> None:
+        if render_cache is not None and \
+                ((index + 1) % _FLUSH_RECORDS == 0 or render_cache.pending_bytes >= _FLUSH_BYTES):
+            render_cache.flush()
+
+    def _r():
+        register()
+        reader = source if source is not None else sys.stdin.buffer
+        writer = target if target is not None else sys.stdout.buffer
+
+        try:
+            if nul:
+                for index, record in enumerate(_nul_records(reader)):
+                    writer.write(_nul_result(index, record))
+                    writer.flush()
+                    _flush_after(index)
+            else:
+                for index, record in enumerate(_json_records(reader)):
+                    writer.write(_json_result(record))
+                    writer.flush()
+                    _flush_after(index)
+        except BrokenPipeError:
+            # the consumer is gone: stop, without failing again on flushing stdout at exit
+            if target is None:
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        finally:
+            # evicting is left to the end of the stream, the new entries being written as they go
+            if render_cache is not None:
+                render_cache.close()
+
+    return _r
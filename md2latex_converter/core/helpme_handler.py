@@ -7,7 +7,11 @@ def handler():
         r'',
         r'Usage:',
         r'  m2l path/to/input_file.md [options]',
+        r'  m2l path/to/input_file.md path/to/dir "path/to/*.md" ... [options]',
         r'  m2l pastebin [options]',
+        r'  m2l serve [--socket path/to/m2l.sock | --port PORT --allow-tcp] [--max-concurrency N]',
+        r'  m2l compile-ext [-eS path/to/sent_ext.json] [-eB path/to/blk_ext.json]',
+        r'  m2l filter [--nul] [options]',
         r'  m2l help',
         r'  m2l configure',
         r'',
@@ -21,6 +25,16 @@ def handler():
         r'  will be generated at input_file.tex at the current working dir',
         r'',
         r'',
+        r'Batch mode:',
+        r'  Read many files and compile each of them to latex. Basic command composition:',
+        r'',
+        r'    m2l path/to/a.md path/to/dir "path/to/*.md" [options]',
+        r'',
+        r'  A directory stands for every .md file under it. Each target LaTeX file is',
+        r'  generated at the current working dir, as in file mode. Files are converted',
+        r'  in parallel, and a summary of the succeeded and failed files is printed.',
+        r'',
+        r'',
         r'Pastebin mode:',
         r'  Read from pastebin and compile to latex. Basic command composition:',
         r'',
@@ -30,6 +44,40 @@ def handler():
         r'  Target file path to save will be determined by a dialog window or prompt.',
         r'  The dialog can be closed, in which case no output file is produced.',
         r'',
+        r'Serve mode:',
+        r'  Keep a conversion daemon running, for "--client" to convert through it.',
+        r'',
+        r'    m2l serve [--socket path/to/m2l.sock | --port PORT --allow-tcp] [--max-concurrency N]',
+        r'',
+        r'  The daemon listens on a Unix socket only you can use, or on PORT of',
+        r'  localhost over HTTP. Any local user can connect to PORT, and have the',
+        r'  daemon read extension and !include files with your rights, so --port',
+        r'  needs --allow-tcp.',
+        r'  It keeps the extensions of each pair of -eS/-eB files registered, and',
+        r'  admits at most N requests at a time (8 by default). Request counts and',
+        r'  latencies are given at /stats.',
+        r'',
+        r'Filter mode:',
+        r'  Convert many documents read from stdin, in a single process.',
+        r'',
+        r'    m2l filter [--nul] [-eS ...] [-eB ...] [--no-command]',
+        r'',
+        r'  Each record is a JSON line {"id": ..., "markdown": ...}, and gives a JSON',
+        r'  line {"id": ..., "latex": ..., "error": ..., "ms": ...} on stdout, flushed',
+        r'  as soon as it is converted. With --nul, records and results are texts',
+        r'  ended by NUL characters, and errors are reported on stderr.',
+        r'',
+        r'Compile-ext mode:',
+        r'  Check extension files and cache them as a bundle.',
+        r'',
+        r'    m2l compile-ext [-eS path/to/sent_ext.json] [-eB path/to/blk_ext.json]',
+        r'',
+        r'  Every command given the same -eS/-eB files then registers their extensions',
+        r'  from the bundle, without checking them again. Bundles are kept under',
+        r'  $XDG_CACHE_HOME/m2l (~/.cache/m2l by default), and are only written by',
+        r'  compile-ext. Conversions read the bundle of their files if there is one;',
+        r'  delete it to register from the JSON again.',
+        r'',
         r'----------------------------------------------------------------------------',
         r'Possible options include:',
         r'',
@@ -41,7 +89,74 @@ def handler():
         r'',
         r'  -stdout (or -print)',
         r'',
-        r'    Print to stdout as well after compilation.'
+        r'    Print to stdout as well after compilation.',
+        r'',
+        r'',
+        r'  -j N (or --jobs N)',
+        r'',
+        r'    Use N processes in batch mode. Defaults to the number of CPUs.',
+        r'    In file mode, convert a large file with N processes, splitting it at',
+        r'    blank lines.',
+        r'',
+        r'',
+        r'  --cache path/to/cache.sqlite [--cache-size MB] [--cache-stats]',
+        r'',
+        r'    Keep the LaTeX rendered for each block in path/to/cache.sqlite, and reuse it',
+        r'    for unchanged blocks in later runs. Least recently used blocks are evicted',
+        r'    beyond MB megabytes (64 by default). --cache-stats prints hits and misses.',
+        r'',
+        r'',
+        r'  --split',
+        r'',
+        r'    In file mode, write each section (## title) to its own file in the',
+        r'    foo-sections directory next to foo.tex, which \inputs them. Files whose',
+        r'    text is unchanged are not written again, and the files of removed sections',
+        r'    are deleted, so that latexmk only rebuilds what changed.',
+        r'',
+        r'',
+        r'  --no-command',
+        r'',
+        r'    Leave the "% Invoked by command" line out of the output, so that it is the',
+        r'    same whatever the command line and working directory.',
+        r'',
+        r'',
+        r'  --depfile deps.d',
+        r'',
+        r'    In file mode, write a Make rule making the output depend on the input, the',
+        r'    files it includes with "!include path/to/part.md" lines, and the extensions.',
+        r'',
+        r'',
+        r'  --memo N [--memo-document]',
+        r'',
+        r'    Remember the LaTeX of the last N inline strings rendered (4096 by default,',
+        r'    0 to remember none), so that repeated lines are rendered once. With',
+        r'    --memo-document, every string of a document is remembered while it is',
+        r'    rendered instead. Hits and misses are shown by --stats.',
+        r'',
+        r'',
+        r'  --watch (or -w)',
+        r'',
+        r'    In file mode, keep running and convert again whenever the input file or',
+        r'    the extension files change, until Ctrl-C is pressed.',
+        r'',
+        r'',
+        r'  --stats [--stats-json path/to/stats.json]',
+        r'',
+        r'    Print where the conversion spent its time: each stage, block type and',
+        r'    sentence regex, with sentence counts and texify calls. --stats-json saves',
+        r'    the same figures as JSON.',
+        r'',
+        r'',
+        r'  --cprofile path/to/prefix',
+        r'',
+        r'    Profile the conversion into prefix.prof, for pstats, and prefix.folded,',
+        r'    collapsed stacks for flame graphs.',
+        r'',
+        r'',
+        r'  --client [--socket path/to/m2l.sock | --port PORT]',
+        r'',
+        r'    Convert through the daemon started by "m2l serve", or in this process',
+        r'    if no daemon is listening.'
     ]
     for _ in help_strs:
         print(_)
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import re
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING
+
+from md2latex_converter.data_structures.sentences import Include
+
+if TYPE_CHECKING:
+    from md2latex_converter.core.render_cache import RenderCache
+    from md2latex_converter.data_structures.blocks import Component
+
+
+class Fragment:
+    """
+    A markdown file rendered on its own: its title candidates, the text of its body, one
+    chunk per component, and the chunk starting each of its sections and of its include
+    directives, whose chunks are left empty.
+    """
+
+    title_candidates: list['Component']
+    body: list[str]
+    sections: list[tuple[int, str]]
+    includes: list[tuple[int, Include]]
+
+    def __init__(self, title_candidates: list['Component'], body: list[str], sections: list[tuple[int, str]],
+                 includes: list[tuple[int, Include]]):
+        self.title_candidates = title_candidates
+        self.body = body
+        self.sections = sections
+        self.includes = includes
+
+
+def _lines(text: str) -> list[str]:
+    lines = re.split(r'\r\n|\r|\n', text) if '\r' in text else text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    lines.extend(['', ''])
+    return lines
+
+
+def render_fragment(filename: str, text: str, render_cache: 'RenderCache | None' = None) -> Fragment:
+    """
+    Lex, parse and render the markdown text of `filename`, leaving its includes out.
+    """
+    from md2latex_converter.core.workflow import render_body
+
+    sections: list[tuple[int, str]] = []
+    includes: list[tuple[int, Include]] = []
+    try:
+        title_candidates, body = render_body(_lines(text), render_cache, sections=sections, includes=includes)
+    except AssertionError as e:
+        raise AssertionError(f'{filename}: {e}') from e
+    return Fragment(title_candidates, body, sections, includes)
+
+
+def resolve(including: str | None, include: Include) -> str:
+    """
+    The file an include directive of `including` stands for, relative to the directory of
+    `including`, or to the working directory for text read from no file.
+    """
+    directory = os.path.dirname(including) if including else ''
+    return os.path.normpath(os.path.join(directory, include.path))
+
+
+class IncludeGraph:
+    """
+    The files included by a document, directly or through other included files.
+
+    Each included file is lexed, parsed and rendered on its own, and kept by the digest of
+    its content and of the extensions registered, so that the same graph converting the
+    document again, e.g. for --watch, only renders the files that changed. Files missing
+    from the cache are independent of each other, as each one leaves its own includes out,
+    and are rendered by an executor if one is given.
+
+    An include cycle fails the conversion. `inputs` lists the files the last conversion
+    included, for a depfile, see `depfile`.
+    """
+
+    root: str | None
+    inputs: list[str]
+    _fragments: dict[str, Fragment]
+
+    def __init__(self, root: str | None = None):
+        """
+        `root` is the file of the document, None for text read from no file.
+        """
+        self.root = root
+        self.inputs = []
+        self._fragments = dict()
+
+    def _load(self, pending: list[tuple[str | None, Include]], render_cache: 'RenderCache | None',
+              executor: Executor | None) -> dict[str, Fragment]:
+        """
+        Every file included from the (including file, include directive) pairs of `pending`,
+        and from the files they include in turn, by file name.
+        """
+        from md2latex_converter.core.render_cache import extension_fingerprint
+
+        fingerprint = extension_fingerprint().encode('utf-8')
+        loaded: dict[str, Fragment] = dict()
+        fragments: dict[str, Fragment] = dict()
+
+        while pending:
+            contents: dict[str, tuple[str, bytes]] = dict()
+            for including, include in pending:
+                filename = resolve(including, include)
+                if filename in loaded or filename in contents:
+                    continue
+                assert os.path.isfile(filename), \
+                    f'{filename} not found, included in line {include.line} of {including or "the input"}'
+                with open(filename, 'rb') as f:
+                    content = f.read()
+                contents[filename] = (hashlib.blake2b(fingerprint + content, digest_size=20).hexdigest(), content)
+
+            missing = [(filename, content.decode('utf-8')) for filename, (digest, content) in contents.items()
+                       if digest not in self._fragments and digest not in fragments]
+            if executor is not None and len(missing) > 1:
+                rendered = list(executor.map(render_fragment, *zip(*missing)))
+            else:
+                rendered = [render_fragment(filename, text, render_cache) for filename, text in missing]
+            for (filename, _), fragment in zip(missing, rendered):
+                fragments[contents[filename][0]] = fragment
+
+            for filename, (digest, _) in contents.items():
+                fragments[digest] = loaded[filename] = fragments.get(digest) or self._fragments[digest]
+            pending = [(filename, include) for filename in contents for _, include in loaded[filename].includes]
+
+        # only what the document still includes is kept, so that edited files do not pile up
+        self._fragments = fragments
+        return loaded
+
+    def expand(self, root: Fragment, render_cache: 'RenderCache | None' = None,
+               executor: Executor | None = None) -> Fragment:
+        """
+        The rendered document with every included file spliced in place of its directive.
+        """
+        if not root.includes:
+            self.inputs, self._fragments = [], dict()
+            return root
+        loaded = self._load([(self.root, include) for _, include in root.includes], render_cache, executor)
+        expanded = Fragment([], [], [], [])
+        self.inputs = []
+        self._splice(root, self.root, [os.path.normpath(self.root)] if self.root else [], loaded, expanded)
+        expanded.title_candidates = expanded.title_candidates[:2]
+        return expanded
+
+    def _splice(self, fragment: Fragment, filename: str | None, stack: list[str], loaded: dict[str, Fragment],
+                expanded: Fragment) -> None:
+        expanded.title_candidates.extend(fragment.title_candidates)
+        sections, includes = dict(fragment.sections), dict(fragment.includes)
+        for index, chunk in enumerate(fragment.body):
+            if index in sections:
+                expanded.sections.append((len(expanded.body), sections[index]))
+            if index not in includes:
+                expanded.body.append(chunk)
+                continue
+
+            included = resolve(filename, includes[index])
+            assert included not in stack, f'include cycle, {" -> ".join([*stack, included])}'
+            if included not in self.inputs:
+                self.inputs.append(included)
+            self._splice(loaded[included], included, [*stack, included], loaded, expanded)
+
+
+def depfile(target: str, inputs: list[str]) -> str:
+    """
+    A Make rule making `target` depend on `inputs`, e.g. for "-include foo.d" in a Makefile.
+    """
+    def _escape(filename: str) -> str:
+        return filename.replace(' ', '\\ ').replace('#', '\\#').replace('$', '$$')
+
+    return f'{_escape(target)}: {" ".join([_escape(_) for _ in inputs])}\n'
@@ -1,35 +1,181 @@
 import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Iterator
 
+_SPECIAL_CHARS = re.compile(r'[_*`\[]')
 
-def texify(content: str) -> str:
+# inline strings remembered by `texify`, the least recently used ones forgotten first
+DEFAULT_MEMO_SIZE = 4096
+
+
+class _NextFinder:
+    """
+    Finds the next occurrence of `sub` in `content` at or after a given position.
+
+    Queries are expected with non-decreasing positions, so the last answer is reused
+    as long as it is still ahead. Each part of `content` is therefore scanned at most once.
+    """
+
+    def __init__(self, content: str, sub: str):
+        self._content = content
+        self._sub = sub
+        self._found = -2
+
+    def find(self, start: int) -> int:
+        if -1 < self._found < start or self._found == -2:
+            self._found = self._content.find(self._sub, start)
+        return self._found
+
+
+def render(content: str) -> str:
+    """
+    Render inline markdown (bold, italic, inline code and links) of `content` into LaTeX.
+
+    The string is scanned once: whether a delimiter still has a closing one ahead is decided
+    by the position of its last occurrence, links are recognized with `str.find` on the
+    original string, and runs of plain characters are copied as slices.
+    """
+    i, l = 0, len(content)
     bolded: bool | str = False
     italic: bool = False
     inline_code: bool = False
 
-    i, l = 0, len(content)
-    buffer: str = ''
+    # a delimiter at i is closable iff it occurs again at or after i + 1
+    last_double_underscore = content.rfind('__')
+    last_double_asterisk = content.rfind('**')
+    last_underscore = content.rfind('_')
+    last_backquote = content.rfind('`')
+
+    next_line_break = _NextFinder(content, '\n')
+    next_link_middle = _NextFinder(content, '](')
+    next_right_paren = _NextFinder(content, ')')
+
+    def _link(start: int) -> tuple[int, int] | None:
+        r"""
+        Match r'\[(.+?)]\((.*?)\)' at `start`, giving the positions of '](' and ')'.
+        The first '](' with a ')' after it is taken, and a link never crosses a line break.
+        """
+        line_end = next_line_break.find(start)
+        line_end = l if line_end == -1 else line_end
+        middle = next_link_middle.find(start + 2)
+        if middle == -1 or middle + 2 > line_end:
+            return None
+        right = next_right_paren.find(middle + 2)
+        if right == -1 or right >= line_end:
+            return None
+        return middle, right
+
+    buffer: list[str] = []
     while i < l:
-        if content.startswith('__', i) and (bolded or content.count('__', i + 1) != 0):
-            buffer += '\\textbf{' if not bolded else '}'
+        if content.startswith('__', i) and (bolded or last_double_underscore > i):
+            buffer.append('\\textbf{' if not bolded else '}')
             bolded = '__' if not bolded else False
             i += 2
-        if content.startswith('**', i) and (bolded or content.count('**', i + 1) != 0):
-            buffer += '\\textbf{' if not bolded else '}'
+        if content.startswith('**', i) and (bolded or last_double_asterisk > i):
+            buffer.append('\\textbf{' if not bolded else '}')
             bolded = '**' if not bolded else False
             i += 2
-        elif content.startswith('_', i) and (italic or content.count('_', i + 1) != 0):
-            buffer += '\\textit{' if not italic else '}'
+        elif content.startswith('_', i) and (italic or last_underscore > i):
+            buffer.append('\\textit{' if not italic else '}')
             italic = not italic
             i += 1
-        elif content.startswith('`', i) and (inline_code or content.count('`', i + 1) != 0):
-            buffer += '\\texttt{' if not inline_code else '}'
+        elif content.startswith('`', i) and (inline_code or last_backquote > i):
+            buffer.append('\\texttt{' if not inline_code else '}')
             inline_code = not inline_code
             i += 1
-        elif (match := re.match('\[(.+?)]\((.*?)\)', content[i:])) is not None:
-            buffer += '\\href{' + match.group(2) + '}{' + match.group(1) + '}'
-            i += len(match.group())
+        elif content.startswith('[', i) and (link := _link(i)) is not None:
+            middle, right = link
+            buffer.append('\\href{' + content[middle + 2:right] + '}{' + content[i + 1:middle] + '}')
+            i = right + 1
         else:
-            buffer += content[i]
-            i += 1
+            # raises IndexError if i == l, as a trailing '__' always did
+            buffer.append(content[i])
+            run_end = match.start() if (match := _SPECIAL_CHARS.search(content, i + 1)) is not None else l
+            buffer.append(content[i + 1:run_end])
+            i = run_end
+
+    return ''.join(buffer)
+
+
+_memo = lru_cache(maxsize=DEFAULT_MEMO_SIZE)(render)
+_memo_per_document = False
+# the memo of the document being rendered, see `document_memo`
+_document_memo: ContextVar[Callable[[str], str] | None] = ContextVar('m2l_document_memo', default=None)
+# hits and misses of the memos of the documents rendered so far
+_document_counts = [0, 0]
+
+
+def _texify_per_document(content: str) -> str:
+    return (_document_memo.get() or _memo)(content)
+
+
+# `_memo`, or `_texify_per_document` if memos are per document, as looking up the
+# memo of the document is a cost of its own
+_texify: Callable[[str], str] = _memo
+
+
+def texify(content: str) -> str:
+    """
+    `render`, remembering the strings rendered last, or every string of the document
+    being rendered, see `configure_memo`.
+
+    Blocks render their text a whole line at a time, e.g. an item of a list with the
+    lines following it, so that repeated lines are only rendered once.
+    """
+    return _texify(content)
+
+
+def configure_memo(size: int = DEFAULT_MEMO_SIZE, per_document: bool = False) -> None:
+    """
+    Remember the last `size` strings rendered by `texify`, none if 0. If `per_document`,
+    every string of a document is remembered instead while it is rendered, so that
+    each distinct string of the document is rendered once, and forgotten afterwards.
+    """
+    global _memo, _memo_per_document, _texify
+    assert size >= 0, f'the memo of texify cannot hold {size} strings'
+    _memo = lru_cache(maxsize=size)(render)
+    _memo_per_document = per_document
+    _texify = _texify_per_document if per_document else _memo
+
+
+def memo_settings() -> tuple[int, bool]:
+    """
+    The arguments of `configure_memo` in use, to be passed to worker processes.
+    """
+    return _memo.cache_info().maxsize, _memo_per_document
+
+
+def clear_memo() -> None:
+    _memo.cache_clear()
+
+
+def memo_stats() -> dict[str, int]:
+    """
+    Hits and misses of the memos of `texify` so far, the memos of documents included.
+    """
+    info = _memo.cache_info()
+    return {'size': info.maxsize, 'hits': info.hits + _document_counts[0],
+            'misses': info.misses + _document_counts[1]}
+
+
+@contextmanager
+def document_memo() -> Iterator[None]:
+    """
+    Render the strings of a document through a memo of their own, if memos are per
+    document, see `configure_memo`.
+    """
+    if not _memo_per_document:
+        yield
+        return
 
-    return buffer
+    memo = lru_cache(maxsize=None)(render)
+    token = _document_memo.set(memo)
+    try:
+        yield
+    finally:
+        _document_memo.reset(token)
+        info = memo.cache_info()
+        _document_counts[0] += info.hits
+        _document_counts[1] += info.misses
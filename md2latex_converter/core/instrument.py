@@ -0,0 +1,327 @@
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Callable
+
+from md2latex_converter.core import ext_bundle, inline, io_handler, sentence_parser
+from md2latex_converter.data_structures import blocks, blk_ext
+from md2latex_converter.data_structures.runtime_maps import EXTENDED_REGEX_SENTENCE_MAP
+
+STAGES = ['register', 'read', 'lex', 'parse', 'render', 'write']
+
+
+class _TimedPattern:
+    """
+    A compiled pattern, timing its matches for `Instrumentation.regexes`.
+    """
+
+    def __init__(self, pattern, name: str, instrumentation: 'Instrumentation'):
+        self._pattern = pattern
+        self._record = instrumentation.regexes[name]
+
+    def match(self, line: str):
+        start = time.perf_counter()
+        match = self._pattern.match(line)
+        record = self._record
+        record['seconds'] += time.perf_counter() - start
+        record['calls'] += 1
+        record['matches'] += match is not None
+        return match
+
+
+class _TimedScanner(sentence_parser._Scanner):
+    def __init__(self, regex_sentence_map: dict, instrumentation: 'Instrumentation'):
+        super().__init__(regex_sentence_map)
+        self._instrumentation = instrumentation
+
+    def _patterns(self, first: str) -> list:
+        return [(_TimedPattern(pattern, sent_type.identifier, self._instrumentation), sent_type)
+                for pattern, sent_type in super()._patterns(first)]
+
+
+class Instrumentation:
+    """
+    Wall time of each stage of a conversion, and of each block type, with counts of the
+    sentence types, of texify calls and of the characters they go through, and the time
+    spent in each sentence regex.
+
+    Nothing is measured unless `install`ed: the functions measured are then replaced
+    by timing wrappers, and brought back by `uninstall`, so that the converter carries
+    no instrumentation otherwise. Times of the lazy pipeline are told apart by taking
+    the time of the inner stages out of the outer ones, e.g. lexing out of parsing.
+    """
+
+    def __init__(self):
+        self.total_seconds = 0.0
+        self.stage_seconds: dict[str, float] = defaultdict(float)
+        self.block_seconds: dict[str, float] = defaultdict(float)
+        self.block_counts: Counter = Counter()
+        self.sentence_counts: Counter = Counter()
+        self.texify_calls = 0
+        self.texify_characters = 0
+        self.texify_seconds = 0.0
+        self.regexes: dict[str, dict[str, float]] = defaultdict(lambda: {'calls': 0, 'matches': 0, 'seconds': 0.0})
+        # time spent writing to and closing each sink, some of it in background threads, see `io_handler.TeeSink`
+        self.sink_seconds: dict[str, float] = defaultdict(float)
+        # hits and misses of the memos of texify, see `inline.memo_stats`
+        self.memo: dict[str, int] = {'size': 0, 'hits': 0, 'misses': 0}
+
+        self._originals: list[tuple[object, str, object]] = []
+        # time spent lexing, reading lines included, taken out of the time spent parsing
+        self._lexing = 0.0
+
+    def _replace(self, owner, name: str, replacement) -> None:
+        original = vars(owner)[name]
+        self._originals.append((owner, name, original))
+        setattr(owner, name, replacement)
+
+    def install(self) -> None:
+        original_lex_lines = sentence_parser.lex_lines
+        original_parse = blocks.Component.parse
+        original_emit_body = blocks.Document.emit_body
+        original_texify = inline.texify
+        original_register = ext_bundle.register_files
+        master_pattern = sentence_parser._BUILTIN_MASTER_PATTERN
+        self._memo_before = inline.memo_stats()
+
+        def _read(lines):
+            iterator = iter(lines)
+            while True:
+                start = time.perf_counter()
+                line = next(iterator, None)
+                self.stage_seconds['read'] += time.perf_counter() - start
+                if line is None:
+                    return
+                yield line
+
+        def _lex_lines(input_lines, start=0):
+            iterator = original_lex_lines(_read(input_lines), start)
+            while True:
+                begin = time.perf_counter()
+                sentence = next(iterator, None)
+                self._lexing += time.perf_counter() - begin
+                if sentence is None:
+                    return
+                self.sentence_counts[sentence.identifier] += 1
+                yield sentence
+
+        def _parse(tokenizer):
+            start, lexing = time.perf_counter(), self._lexing
+            try:
+                return original_parse(tokenizer)
+            finally:
+                self.stage_seconds['parse'] += time.perf_counter() - start - (self._lexing - lexing)
+
+        def _emit_body(component, emit_line, render_cache=None):
+            start = time.perf_counter()
+            try:
+                original_emit_body(component, emit_line, render_cache)
+            finally:
+                seconds = time.perf_counter() - start
+                name = getattr(type(component), 'block_name', type(component).__name__)
+                self.block_seconds[name] += seconds
+                self.block_counts[name] += 1
+                self.stage_seconds['render'] += seconds
+
+        def _texify(content: str) -> str:
+            start = time.perf_counter()
+            try:
+                return original_texify(content)
+            finally:
+                self.texify_seconds += time.perf_counter() - start
+                self.texify_calls += 1
+                self.texify_characters += len(content)
+
+        def _register(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original_register(*args, **kwargs)
+            finally:
+                self.stage_seconds['register'] += time.perf_counter() - start
+
+        self._replace(sentence_parser, 'lex_lines', _lex_lines)
+        self._replace(sentence_parser, '_get_scanner', lambda: _TimedScanner(EXTENDED_REGEX_SENTENCE_MAP, self))
+        self._replace(sentence_parser, '_BUILTIN_MASTER_PATTERN', _TimedPattern(master_pattern, 'built-in', self))
+        self._replace(blocks.Component, 'parse', staticmethod(_parse))
+        self._replace(blocks.Document, 'emit_body', staticmethod(_emit_body))
+        # texify is looked up as a global of the modules rendering with it
+        self._replace(blocks, 'texify', _texify)
+        self._replace(blk_ext, 'texify', _texify)
+        self._replace(ext_bundle, 'register_files', _register)
+
+        for sink_type in [io_handler.Sink, *self._sink_types(io_handler.Sink)]:
+            if issubclass(sink_type, io_handler.TeeSink):
+                continue  # its time is that of the sinks it writes to
+            for name in ['write', 'close']:
+                if name in vars(sink_type):
+                    self._replace(sink_type, name, self._timed_sink_method(vars(sink_type)[name]))
+
+    @staticmethod
+    def _sink_types(base: type) -> list[type]:
+        return [_ for subclass in base.__subclasses__() for _ in [subclass, *Instrumentation._sink_types(subclass)]]
+
+    def _timed_sink_method(self, method: Callable) -> Callable:
+        def _r(sink, *args):
+            start = time.perf_counter()
+            try:
+                return method(sink, *args)
+            finally:
+                seconds = time.perf_counter() - start
+                self.stage_seconds['write'] += seconds
+                self.sink_seconds[str(sink)] += seconds
+
+        return _r
+
+    def uninstall(self) -> None:
+        memo = inline.memo_stats()
+        self.memo = {'size': memo['size'], 'hits': memo['hits'] - self._memo_before['hits'],
+                     'misses': memo['misses'] - self._memo_before['misses']}
+        while self._originals:
+            owner, name, original = self._originals.pop()
+            setattr(owner, name, original)
+
+    def stages(self) -> dict[str, float]:
+        ret = {_: self.stage_seconds.get(_, 0.0) for _ in STAGES}
+        ret['lex'] = max(0.0, self._lexing - ret['read'])
+        ret['other'] = max(0.0, self.total_seconds - sum(ret.values()))
+        return ret
+
+    def as_json(self) -> dict:
+        return {
+            'total_seconds': self.total_seconds,
+            'stages': self.stages(),
+            'blocks': {name: {'count': self.block_counts[name], 'seconds': seconds}
+                       for name, seconds in sorted(self.block_seconds.items(), key=lambda _: -_[1])},
+            'sentences': dict(self.sentence_counts.most_common()),
+            'texify': {'calls': self.texify_calls, 'characters': self.texify_characters,
+                       'seconds': self.texify_seconds},
+            'memo': self.memo,
+            'sinks': dict(self.sink_seconds),
+            'regexes': dict(sorted(self.regexes.items(), key=lambda _: -_[1]['seconds'])),
+        }
+
+    def summary(self, top: int = 10) -> str:
+        total = self.total_seconds or 1.0
+        lines = [f'm2l: converted in {self.total_seconds * 1000:.1f} ms', '', f'{"stage":<24}{"ms":>10}{"share":>9}']
+        for name, seconds in self.stages().items():
+            lines.append(f'{name:<24}{seconds * 1000:>10.1f}{seconds / total * 100:>8.1f}%')
+
+        lines += ['', f'{"block":<24}{"count":>10}{"ms":>10}']
+        for name, record in list(self.as_json()['blocks'].items())[:top]:
+            lines.append(f'{name:<24}{record["count"]:>10}{record["seconds"] * 1000:>10.1f}')
+
+        lines += ['', f'{"sentence":<24}{"count":>10}']
+        for name, count in self.sentence_counts.most_common(top):
+            lines.append(f'{name:<24}{count:>10}')
+
+        lines += ['', f'texify: {self.texify_calls} calls, {self.texify_characters} characters, '
+                      f'{self.texify_seconds * 1000:.1f} ms']
+        looked_up = self.memo['hits'] + self.memo['misses']
+        lines.append(f'texify memo: {self.memo["hits"]} hits, {self.memo["misses"]} misses '
+                     f'({self.memo["hits"] / looked_up * 100 if looked_up else 0.0:.1f}% hit rate)')
+
+        lines += ['', f'{"sink":<24}{"ms":>10}']
+        for name, seconds in self.sink_seconds.items():
+            lines.append(f'{name:<24}{seconds * 1000:>10.1f}')
+
+        lines += ['', f'{"regex":<24}{"calls":>10}{"matches":>10}{"ms":>10}']
+        for name, record in list(self.as_json()['regexes'].items())[:top]:
+            lines.append(f'{name:<24}{record["calls"]:>10}{record["matches"]:>10}{record["seconds"] * 1000:>10.1f}')
+        return '\n'.join(lines)
+
+
+def instrument_handler_generator(
+        handler: Callable[[], None],
+        summary: bool,
+        json_filename: str | None
+) -> Callable[[], None]:
+    """
+    Run `handler` with an `Instrumentation` installed, then print its summary to stderr
+    and/or save it as JSON to `json_filename`.
+    """
+
+    def _r():
+        instrumentation = Instrumentation()
+        instrumentation.install()
+        start = time.perf_counter()
+        try:
+            handler()
+        finally:
+            instrumentation.total_seconds = time.perf_counter() - start
+            instrumentation.uninstall()
+
+            if summary:
+                print(instrumentation.summary(), file=sys.stderr)
+                sys.stderr.flush()
+            if json_filename is not None and json_filename != '':
+                with open(json_filename, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(instrumentation.as_json(), indent=2))
+
+    return _r
+
+
+def _label(function: tuple[str, int, str]) -> str:
+    filename, line, name = function
+    if filename == '~':
+        return name  # built-in functions
+    return f'{filename.rsplit("/", 1)[-1].removesuffix(".py")}:{name}:{line}'
+
+
+def collapse_stacks(stats: dict, max_depth: int = 64) -> list[str]:
+    """
+    Collapsed stacks, "root;caller;callee microseconds" per line, of the `pstats.Stats.stats`
+    of a profile, as read by flamegraph.pl or speedscope.
+
+    A profile only keeps the time of each caller-callee pair, not whole stacks, so the
+    time of a function is spread over the stacks reaching it in proportion to the time
+    spent in it from each caller.
+    """
+    callees: dict[tuple, list[tuple[tuple, float]]] = defaultdict(list)
+    for function, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees[caller].append((function, cumulative))
+
+    weights: Counter = Counter()
+
+    def _walk(function: tuple, path: tuple[str, ...], share: float) -> None:
+        _, _, inline_seconds, cumulative, _ = stats[function]
+        path = (*path, _label(function))
+        weights[';'.join(path)] += share * inline_seconds
+        if len(path) >= max_depth:
+            return
+        for callee, seconds in callees[function]:
+            # stacks under a microsecond are left out, as their number grows with the depth
+            if callee in stats and _label(callee) not in path and share * seconds >= 1e-6:
+                _walk(callee, path, share * seconds / stats[callee][3])
+
+    for function, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            _walk(function, (), 1.0)
+
+    return [f'{stack} {round(seconds * 1e6)}' for stack, seconds in weights.items() if round(seconds * 1e6) > 0]
+
+
+def cprofile_handler_generator(handler: Callable[[], None], prefix: str) -> Callable[[], None]:
+    """
+    Run `handler` under cProfile, saving the profile to `prefix`.prof, for pstats or
+    snakeviz, and its collapsed stacks to `prefix`.folded, for flame graphs.
+    """
+
+    def _r():
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            handler()
+        finally:
+            profiler.disable()
+            profiler.dump_stats(prefix + '.prof')
+            with open(prefix + '.folded', 'w', encoding='utf-8') as f:
+                f.write('\n'.join(collapse_stacks(pstats.Stats(profiler).stats)) + '\n')
+            print(f'm2l: profile written to {prefix}.prof and {prefix}.folded', file=sys.stderr)
+            sys.stderr.flush()
+
+    return _r
@@ -1,7 +1,14 @@
 import json
+import mmap
+import os
+import queue
+import sys
+import threading
+import time
+from array import array
+from itertools import accumulate
 
-import pyperclip
-from typing import Callable
+from typing import Callable, Iterator
 
 
 def read_from_file_generator(filename: str) -> Callable[[], str]:
@@ -12,20 +19,314 @@ def read_from_file_generator(filename: str) -> Callable[[], str]:
     return _r
 
 
+def read_lines_from_file_generator(filename: str) -> Callable[[], Iterator[str]]:
+    """
+    Lazy version of `read_from_file_generator`, giving the lines without line breaks
+    one at a time, as `read_from_file_generator(filename)().split('\\n')` would.
+    """
+    def _r():
+        with open(filename, 'r', encoding='utf-8') as f:
+            line = ''
+            for line in f:
+                yield line[:-1] if line.endswith('\n') else line
+            if line == '' or line.endswith('\n'):
+                yield ''
+        yield from ['', '', '\0']
+
+    return _r
+
+
+class MappedLines:
+    """
+    The lines of a UTF-8 file, without line breaks, read through a memory map.
+
+    The file is not read upfront: an index of the (start, end) span of every line is built
+    in one pass over the mapped buffer, and a line is decoded only when it is asked for.
+    Line breaks are '\\n', '\\r\\n' or '\\r', as for files opened in text mode.
+    """
+
+    _starts: array
+    _ends: array
+
+    def __init__(self, filename: str):
+        self._file = open(filename, 'rb')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._buffer = b''  # empty files cannot be mapped
+        else:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._starts, self._ends = MappedLines._index(self._buffer)
+
+    @staticmethod
+    def _index(buffer) -> tuple[array, array]:
+        if len(buffer) == 0:
+            return array('q', [0]), array('q', [0])
+
+        if buffer.find(b'\r') == -1:
+            # the line lengths are taken by readline, so that the index is built without a Python loop
+            buffer.seek(0)
+            starts = array('q', accumulate(map(len, iter(buffer.readline, b'')), initial=0))
+            if buffer[-1] != ord('\n'):
+                starts.pop()
+            ends = array('q', [_ - 1 for _ in starts[1:]])
+            ends.append(len(buffer))
+            return starts, ends
+
+        import re
+        starts, ends = array('q', [0]), array('q')
+        for _ in re.finditer(rb'\r\n|\r|\n', buffer):
+            ends.append(_.start())
+            starts.append(_.end())
+        ends.append(len(buffer))
+        return starts, ends
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def span(self, index: int) -> tuple[int, int]:
+        return self._starts[index], self._ends[index]
+
+    def __getitem__(self, index: int) -> str:
+        return self._buffer[self._starts[index]:self._ends[index]].decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        buffer = self._buffer
+        for start, end in zip(self._starts, self._ends):
+            yield buffer[start:end].decode('utf-8')
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> 'MappedLines':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def read_mapped_lines_from_file_generator(filename: str) -> Callable[[], Iterator[str]]:
+    """
+    The lines of `read_lines_from_file_generator`, read through `MappedLines`.
+
+    The '\\0' line of the EOF sentinel is left out, as the tokenizer gives the EOF sentence
+    once the lines run out.
+    """
+    def _r():
+        with MappedLines(filename) as lines:
+            yield from lines
+        yield from ['', '']
+
+    return _r
+
+
 def read_from_pastebin() -> str:
+    import pyperclip
     s = pyperclip.paste()
     return s + '\n\n\n\0'
 
 
+class Sink:
+    """
+    Where the converted text goes, written chunk by chunk.
+
+    A sink is opened by its first `write` and finished by `close`; it can be written
+    again afterwards, e.g. by the next rebuild of --watch. A `slow` sink is written
+    by a thread of its own when written along with others, see `TeeSink`.
+    """
+
+    slow: bool = False
+
+    def __str__(self) -> str:
+        return type(self).__name__
+
+    def write(self, s: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def _same_content(filename: str, other_filename: str) -> bool:
+    if os.path.getsize(filename) != os.path.getsize(other_filename):
+        return False
+    with open(filename, 'rb') as f, open(other_filename, 'rb') as g:
+        while (block := f.read(1024 * 1024)) == g.read(1024 * 1024):
+            if not block:
+                return True
+    return False
+
+
+class FileSink(Sink):
+    """
+    A file, written to a temporary file next to it and renamed over it on `close`, so
+    that readers, e.g. a LaTeX viewer during --watch, never see a partial file.
+
+    If `keep_unchanged`, a file already holding the same text is left as it is, so that
+    its modification time only changes with its content, e.g. for latexmk.
+    """
+
+    def __init__(self, filename: str, keep_unchanged: bool = False):
+        self.filename = filename
+        self.keep_unchanged = keep_unchanged
+        self._file = None
+        self._temp_filename = f'{filename}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+    def __str__(self) -> str:
+        return self.filename
+
+    def write(self, s: str) -> None:
+        if self._file is None:
+            self._file = open(self._temp_filename, 'w', encoding='utf-8')
+        self._file.write(s)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if self.keep_unchanged and os.path.isfile(self.filename) and \
+                    _same_content(self._temp_filename, self.filename):
+                os.remove(self._temp_filename)
+            else:
+                os.replace(self._temp_filename, self.filename)
+
+
+class StdoutSink(Sink):
+    def __init__(self):
+        self._written = False
+
+    def __str__(self) -> str:
+        return 'stdout'
+
+    def write(self, s: str) -> None:
+        self._written = True
+        sys.stdout.write(s)
+
+    def close(self) -> None:
+        if self._written:
+            print()  # as write_to_stdout does
+            self._written = False
+
+
+class BufferSink(Sink):
+    def __init__(self):
+        self._chunks: list[str] = []
+
+    def write(self, s: str) -> None:
+        self._chunks.append(s)
+
+    def getvalue(self) -> str:
+        return ''.join(self._chunks)
+
+
+class PastebinSink(BufferSink):
+    # pyperclip runs xclip or xsel on Linux, taking longer than the conversion of most documents
+    slow = True
+
+    def __str__(self) -> str:
+        return 'clipboard'
+
+    def close(self) -> None:
+        if self._chunks:
+            write_to_pastebin(self.getvalue())
+            self._chunks.clear()
+
+
+class TeeSink(Sink):
+    """
+    Several sinks, each written every chunk as it comes.
+
+    A `slow` sink is written by a thread of its own, through a queue buffering the
+    chunks it is behind by, so that it holds up neither the conversion nor the other
+    sinks; `close` waits for every sink to be closed. The time spent in each sink is
+    kept in `seconds`.
+    """
+
+    sinks: list[Sink]
+    seconds: dict[Sink, float]
+
+    def __init__(self, sinks: list[Sink]):
+        self.sinks = sinks
+        self.seconds = {_: 0.0 for _ in sinks}
+        self._queues: dict[Sink, queue.SimpleQueue] = dict()
+        self._threads: list[threading.Thread] = []
+        self._errors: list[BaseException] = []
+
+    def _timed(self, sink: Sink, method: Callable, *args) -> BaseException | None:
+        start = time.perf_counter()
+        try:
+            method(*args)
+        except BaseException as e:
+            return e
+        finally:
+            self.seconds[sink] += time.perf_counter() - start
+        return None
+
+    def _drain(self, sink: Sink, chunks: queue.SimpleQueue) -> None:
+        # chunks are taken up to the None put by `close` even after an error, as `close` waits for it
+        error = None
+        while (chunk := chunks.get()) is not None:
+            if error is None:
+                error = self._timed(sink, sink.write, chunk)
+        if error is None:
+            error = self._timed(sink, sink.close)
+        if error is not None:
+            self._errors.append(error)
+
+    def write(self, s: str) -> None:
+        if not self._threads:
+            for sink in self.sinks:
+                if sink.slow:
+                    self._queues[sink] = queue.SimpleQueue()
+                    self._threads.append(threading.Thread(target=self._drain, args=(sink, self._queues[sink]),
+                                                          name=f'm2l sink {sink}', daemon=True))
+                    self._threads[-1].start()
+
+        seconds = self.seconds
+        for sink in self.sinks:
+            if (chunks := self._queues.get(sink)) is not None:
+                chunks.put(s)
+            else:
+                start = time.perf_counter()
+                sink.write(s)
+                seconds[sink] += time.perf_counter() - start
+
+    def close(self) -> None:
+        for chunks in self._queues.values():
+            chunks.put(None)
+        try:
+            for sink in self.sinks:
+                if sink not in self._queues:
+                    start = time.perf_counter()
+                    sink.close()
+                    self.seconds[sink] += time.perf_counter() - start
+        finally:
+            for _ in self._threads:
+                _.join()
+            self._queues.clear()
+            self._threads.clear()
+
+        if self._errors:
+            error = self._errors[0]
+            self._errors.clear()
+            raise error
+
+    def stats(self) -> str:
+        return ', '.join([f'{sink} {seconds * 1000:.1f} ms' + (' (in background)' if sink.slow else '')
+                          for sink, seconds in self.seconds.items()])
+
+
 def write_to_file_generator(filename: str) -> Callable[[str], None]:
     def _r(s):
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(s)
+        sink = FileSink(filename)
+        sink.write(s)
+        sink.close()
 
     return _r
 
 
 def write_to_pastebin(s) -> None:
+    import pyperclip
     pyperclip.copy(s)
 
 
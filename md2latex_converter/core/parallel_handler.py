@@ -0,0 +1,214 @@
+import mmap
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator
+
+from md2latex_converter.core import ext_bundle, inline, io_handler, sentence_parser
+from md2latex_converter.core.includes import IncludeGraph
+from md2latex_converter.core.render_cache import RenderCache
+from md2latex_converter.core.workflow import converter_generator, expand_includes, join_lines, render_body
+from md2latex_converter.data_structures import runtime_maps
+from md2latex_converter.data_structures.blocks import Document
+from md2latex_converter.data_structures.sentences import EmptySentence
+
+# shards are made smaller than this only if there are too few of them to keep every process busy
+MIN_SHARD_BYTES = 256 * 1024
+# shards per process, so that a slow shard is made up for by the others
+SHARDS_PER_JOB = 4
+
+_LINE_BREAK = re.compile(rb'\r\n|\r|\n')
+
+_render_cache: RenderCache | None = None
+
+
+def _register(sent_ext_filename: str, blk_ext_filename: str, render_cache_args: tuple[str, int] | None,
+              memo_settings: tuple[int, bool]) -> None:
+    global _render_cache
+
+    # forked workers start with the extensions of the parent process
+    runtime_maps.clear()
+    ext_bundle.register_files_generator(sent_ext_filename, blk_ext_filename)()
+    inline.configure_memo(*memo_settings)
+    _render_cache = RenderCache(*render_cache_args) if render_cache_args is not None else None
+
+
+def _is_blank(line: str) -> bool:
+    return next(sentence_parser.lex_lines([line])).code == EmptySentence.code
+
+
+def _lines_from(buffer, position: int) -> Iterator[tuple[int, str]]:
+    """
+    The start offset and the text of each line from `position`, the start of a line.
+    """
+    while position < len(buffer):
+        line_break = _LINE_BREAK.search(buffer, position)
+        if line_break is None:
+            yield position, buffer[position:].decode('utf-8')
+            return
+        yield position, buffer[position:line_break.start()].decode('utf-8')
+        position = line_break.end()
+
+
+def _boundary_after(buffer, offset: int) -> int | None:
+    """
+    The start of the first non-blank line after a blank line, from `offset` on.
+
+    Unless a block extension expects blank lines, every component ends at a blank line,
+    so that the document can be parsed from such a line on as if it started there.
+    """
+    if (line_break := _LINE_BREAK.search(buffer, offset)) is None:
+        return None
+
+    blank = False
+    for start, line in _lines_from(buffer, line_break.end()):
+        if blank and not _is_blank(line):
+            return start
+        blank = _is_blank(line)
+    return None
+
+
+def _count_line_breaks(region: bytes) -> int:
+    count = region.count(b'\n')
+    if b'\r' in region:
+        count += region.count(b'\r') - region.count(b'\r\n')
+    return count
+
+
+def shard(filename: str, shards: int) -> list[tuple[int, int, int]]:
+    """
+    Split a file into at most `shards` spans of about the same size, each starting at
+    a component. The size of a span stands for its rendering cost, as almost every
+    character goes through `texify`.
+
+    Gives the (start offset, end offset, first line) of each span.
+    """
+    with open(filename, 'rb') as f:
+        if (size := os.fstat(f.fileno()).st_size) == 0:
+            return [(0, 0, 0)]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            boundaries = [0]
+            for _ in range(1, shards):
+                target = size * _ // shards
+                if target <= boundaries[-1]:
+                    continue
+                # the rest of the file has no boundary, if the last search ran out of it
+                if (boundary := _boundary_after(buffer, target)) is None:
+                    break
+                boundaries.append(boundary)
+            boundaries.append(size)
+
+            ret, first_line = [], 0
+            for start, end in zip(boundaries, boundaries[1:]):
+                ret.append((start, end, first_line))
+                first_line += _count_line_breaks(buffer[start:end])
+            return ret
+
+
+def _shard_lines(filename: str, start: int, end: int, last: bool) -> list[str]:
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    lines = re.split(r'\r\n|\r|\n', text) if '\r' in text else text.split('\n')
+    if lines[-1] == '':
+        # the line break ending a span does not start a line of it, as in `MappedLines`
+        lines.pop()
+    if last:
+        lines.extend(['', ''])
+    return lines
+
+
+def _render(filename: str, start: int, end: int, first_line: int, last: bool) -> tuple[list, list, list, int, int]:
+    """
+    The title candidates, body and include directives of a span, its body joined into a
+    single chunk unless it includes files.
+    """
+    hits, misses = (_render_cache.hits, _render_cache.misses) if _render_cache is not None else (0, 0)
+    includes = []
+    try:
+        title_candidates, body = render_body(_shard_lines(filename, start, end, last), _render_cache, first_line,
+                                             includes=includes)
+    finally:
+        if _render_cache is not None:
+            _render_cache.close()
+            hits, misses = _render_cache.hits - hits, _render_cache.misses - misses
+    return title_candidates, body if includes else [''.join(body)], includes, hits, misses
+
+
+def parallel_handler_generator(
+        input_filename: str,
+        sinks: list[io_handler.Sink],
+        jobs: int,
+        sent_ext_filename: str,
+        blk_ext_filename: str,
+        render_cache_args: tuple[str, int] | None = None,
+        render_cache_stats: bool = False,
+        record_command: bool = True,
+        include_graph: IncludeGraph | None = None
+) -> Callable[[], None]:
+    """
+    Convert a single file with `jobs` processes, for documents too large for one.
+
+    The file is split into spans at blank lines, each lexed, parsed and rendered by a
+    worker process with the same extensions registered, and the spans are written back
+    in order. As a block extension expecting blank lines may span them, such extensions
+    make the file converted in this process instead. The extensions are expected to be
+    registered in this process already.
+
+    Included files are resolved by `include_graph`, and those not rendered yet are
+    rendered by the worker processes as well.
+    """
+
+    def _r():
+        shards = min(jobs * SHARDS_PER_JOB, os.path.getsize(input_filename) // MIN_SHARD_BYTES)
+        if sentence_parser.blank_lines_counted():
+            print('Warning! A block extension expects blank lines, the file is converted in a single process.',
+                  file=sys.stderr)
+            shards = 1
+
+        spans = shard(input_filename, shards) if shards > 1 else []
+        # workers are only started once something is submitted, e.g. included files to render
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=_register,
+                                       initargs=(sent_ext_filename, blk_ext_filename, render_cache_args,
+                                                 inline.memo_settings()))
+        if len(spans) <= 1:
+            render_cache = RenderCache(*render_cache_args) if render_cache_args is not None else None
+            with executor:
+                converter_generator(io_handler.read_mapped_lines_from_file_generator(input_filename), sinks,
+                                    render_cache, record_command, include_graph, executor)()
+            if render_cache is not None and render_cache_stats:
+                print(render_cache.stats(), file=sys.stderr)
+            return
+
+        try:
+            with executor:
+                results = list(executor.map(
+                    _render,
+                    *zip(*[(input_filename, *_, _ is spans[-1]) for _ in spans])
+                ))
+
+                title_candidates, body, includes = [], [], []
+                for result in results:
+                    title_candidates.extend(result[0])
+                    includes.extend([(len(body) + index, include) for index, include in result[2]])
+                    body.extend(result[1])
+                title_candidates, body = expand_includes(title_candidates[:2], body, includes, include_graph,
+                                                         executor=executor)
+
+            for sink in sinks:
+                sink.write(join_lines(Document.head(title_candidates, record_command=record_command)))
+                for _ in body:
+                    sink.write(_)
+                sink.write(join_lines(Document.tail()))
+        finally:
+            for _ in sinks:
+                _.close()
+
+        if render_cache_stats and render_cache_args is not None:
+            hits, misses = sum([_[3] for _ in results]), sum([_[4] for _ in results])
+            looked_up = hits + misses
+            print(f'render cache {render_cache_args[0]}: {hits} hits, {misses} misses '
+                  f'({hits / looked_up * 100 if looked_up else 0.0:.1f}% hit rate)', file=sys.stderr)
+
+    return _r
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+from md2latex_converter.data_structures.prototypes import Block
+from md2latex_converter.data_structures.runtime_maps import EXTENDED_NAME_SENTENCE_MAP, EXTENDED_NAME_BLOCK_MAP
+from md2latex_converter.version import VERSION
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def extension_fingerprint() -> str:
+    """
+    A digest of the converter version and of every sentence and block extension registered.
+    """
+    sentences = sorted([(name, sent_type.regex) for name, sent_type in EXTENDED_NAME_SENTENCE_MAP.items()])
+    blocks = sorted([(name, json.dumps(blk_type.source, sort_keys=True))
+                     for name, blk_type in EXTENDED_NAME_BLOCK_MAP.items()])
+    return hashlib.blake2b(json.dumps([VERSION, sentences, blocks]).encode('utf-8'), digest_size=20).hexdigest()
+
+
+class RenderCache:
+    """
+    On-disk cache of the LaTeX rendered for each component, stored in an SQLite database.
+
+    A component is keyed by a digest of its type, its source sentences and the
+    `extension_fingerprint`, so that an edit, an extension change or an upgrade simply
+    misses the cache. The cache holds at most `max_bytes` of LaTeX; least recently
+    used entries are evicted on `close`.
+    """
+
+    path: str
+    max_bytes: int
+    hits: int
+    misses: int
+    evicted: int
+    # bytes of LaTeX rendered since the entries were last written
+    pending_bytes: int
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.pending_bytes = 0
+
+        self._connection: sqlite3.Connection | None = None
+        self._fingerprint: str | None = None
+        self._used: dict[str, float] = dict()
+        self._stored: dict[str, str] = dict()
+
+    def _open(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS blocks '
+                                     '(key TEXT PRIMARY KEY, latex TEXT NOT NULL, size INTEGER NOT NULL, '
+                                     'used REAL NOT NULL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS blocks_used ON blocks (used)')
+            # extensions are registered by now
+            self._fingerprint = extension_fingerprint()
+        return self._connection
+
+    def key(self, component: Block) -> str:
+        digest = hashlib.blake2b(self._fingerprint.encode('utf-8'), digest_size=20)
+        digest.update(f'{type(component).__name__}:{getattr(component, "block_name", "")}\n'.encode('utf-8'))
+        for _ in component.sentences():
+            digest.update(f'{len(_.identifier)}:{_.identifier}{len(_.content)}:{_.content}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def render(self, component: Block) -> list[tuple[int, str]]:
+        """
+        `component.toLaTeX()`, from the cache if it was rendered before.
+        """
+        connection = self._open()
+        key = self.key(component)
+
+        if (latex := self._stored.get(key)) is None:
+            row = connection.execute('SELECT latex FROM blocks WHERE key = ?', (key,)).fetchone()
+            latex = None if row is None else row[0]
+
+        if latex is not None:
+            self.hits += 1
+            self._used[key] = time.time()
+            return [(indent, content) for indent, content in json.loads(latex)]
+
+        self.misses += 1
+        ret = component.toLaTeX()
+        self._stored[key] = latex = json.dumps(ret)
+        self._used[key] = time.time()
+        self.pending_bytes += len(latex)
+        return ret
+
+    def _write(self, connection: sqlite3.Connection) -> None:
+        connection.executemany('INSERT OR REPLACE INTO blocks (key, latex, size, used) VALUES (?, ?, ?, ?)',
+                               [(key, latex, len(latex), self._used[key]) for key, latex in self._stored.items()])
+        connection.executemany('UPDATE blocks SET used = ? WHERE key = ?',
+                               [(used, key) for key, used in self._used.items() if key not in self._stored])
+        self._stored.clear()
+        self._used.clear()
+        self.pending_bytes = 0
+
+    def flush(self) -> None:
+        """
+        Write the new entries and access times so far, for a long-lived process to keep
+        its memory bounded and its work saved. Entries are only evicted on `close`.
+        """
+        if self._connection is None:
+            return
+
+        with self._connection as connection:
+            self._write(connection)
+
+    def close(self) -> None:
+        """
+        Write the new entries and access times, then evict entries beyond `max_bytes`.
+        """
+        if self._connection is None:
+            return
+
+        with self._connection as connection:
+            self._write(connection)
+
+            total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM blocks').fetchone()[0]
+            if total > self.max_bytes:
+                evicted = []
+                for key, size in connection.execute('SELECT key, size FROM blocks ORDER BY used'):
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append((key,))
+                    total -= size
+                connection.executemany('DELETE FROM blocks WHERE key = ?', evicted)
+                self.evicted += len(evicted)
+
+        self._connection.close()
+        self._connection = None
+
+    def stats(self) -> str:
+        looked_up = self.hits + self.misses
+        hit_rate = self.hits / looked_up * 100 if looked_up else 0.0
+        return f'render cache {self.path}: {self.hits} hits, {self.misses} misses ' \
+               f'({hit_rate:.1f}% hit rate), {self.evicted} evicted'
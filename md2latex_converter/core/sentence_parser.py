@@ -1,6 +1,101 @@
-from md2latex_converter.data_structures.runtime_maps import EXTENDED_REGEX_SENTENCE_MAP
+from typing import Iterable, Iterator
+
+from md2latex_converter.data_structures import runtime_maps
+from md2latex_converter.data_structures.runtime_maps import EXTENDED_NAME_BLOCK_MAP
 from md2latex_converter.data_structures.sentences import *
 
+# built-in sentence types, by priority. Each type is a named group of the master regex below,
+# so `match.lastgroup` tells which type the line is classified into.
+_BUILTIN_PRIORITY: list[type[Sentence]] = [Title, EmptySentence, UnorderedList, OrderedList, Eof, Picture, Include,
+                                             Text]
+_BUILTIN_NAME_TYPE_MAP: dict[str, type[Sentence]] = {_.__name__: _ for _ in _BUILTIN_PRIORITY}
+_BUILTIN_MASTER_PATTERN: re.Pattern = re.compile(
+    '|'.join([f'(?P<{_.__name__}>{_.regex})' for _ in _BUILTIN_PRIORITY])
+)
+
+_REGEX_META_CHARS = '.^$*+?{}[]()|\\'
+
+
+def _leading_char(regex: str) -> str | None:
+    """
+    Find the character every line matched by `regex` must start with.
+
+    The analysis is conservative, None is returned whenever the leading character
+    cannot be told from the first token of the regex, e.g. r'\\s*```', r'a|b' or r'(?i)foo'.
+    """
+    if regex.startswith('^'):
+        regex = regex[1:]
+    if regex == '' or '|' in regex:
+        return None
+
+    if regex[0] == '\\':
+        if len(regex) < 2 or regex[1].isalnum():
+            return None
+        leading, rest = regex[1], regex[2:]
+    elif regex[0] in _REGEX_META_CHARS:
+        return None
+    else:
+        leading, rest = regex[0], regex[1:]
+
+    if rest.startswith(('*', '?', '{')):
+        return None
+    return leading
+
+
+class _Scanner:
+    """
+    Line classifier compiled from the extended sentence types registered at the time.
+
+    Extended patterns are indexed by their leading character, so that a line is only tried
+    against the patterns that could match it. They are compiled when a line first needs
+    them. Built-in patterns are combined into a single master regex, classifying the line
+    in one match.
+
+    First-match priority is the same as trying the extended patterns by registration
+    order, and then the built-in ones by `_BUILTIN_PRIORITY`.
+    """
+
+    _extended: list[tuple[type[Sentence], str | None]]
+    _leading_chars: set[str]
+    _dispatch: dict[str, list[tuple[re.Pattern, type[Sentence]]]]
+
+    def __init__(self, regex_sentence_map: dict[str, type[Sentence]]):
+        self._extended = [(sent_type, _leading_char(regex)) for regex, sent_type in regex_sentence_map.items()]
+        self._leading_chars = set([leading for _, leading in self._extended if leading is not None])
+        self._dispatch = dict()
+
+    def _patterns(self, first: str) -> list[tuple[re.Pattern, type[Sentence]]]:
+        """
+        The patterns to try on lines starting with `first`, compiled on the first such line.
+        """
+        if first not in self._leading_chars:
+            first = None
+        patterns = [(sent_type.pattern, sent_type) for sent_type, leading in self._extended
+                    if leading is None or leading == first]
+        return patterns
+
+    def scan(self, index: int, line: str) -> Sentence:
+        first = line[:1]
+        if (patterns := self._dispatch.get(first)) is None:
+            patterns = self._dispatch[first] = self._patterns(first)
+
+        for pattern, sent_type in patterns:
+            if (match := pattern.match(line)) is not None:
+                return sent_type.from_match(index, match)
+
+        match = _BUILTIN_MASTER_PATTERN.match(line)
+        assert match is not None, f'This is impossible'
+        return _BUILTIN_NAME_TYPE_MAP[match.lastgroup].from_match(index, match)
+
+
+def _get_scanner() -> _Scanner:
+    # kept by the active registry, so that converters with other extensions do not evict it
+    registry = runtime_maps.active()
+    key = tuple(registry.regex_sentence_map.items())
+    if (cache := registry.scanner_cache) is None or cache[0] != key:
+        cache = registry.scanner_cache = (key, _Scanner(registry.regex_sentence_map))
+    return cache[1]
+
 
 def lex(input_string: str) -> list[Sentence]:
     """
@@ -23,37 +118,49 @@ def lex(input_string: str) -> list[Sentence]:
             r'^(\s*)\d+\.\s+(.*)$'
         [sentence.Eof]:
             r'^\x00$'
+        [sentence.Picture]:
+            r'^!\[(.*)]\((.+)\)'
+        [sentence.Include]:
+            r'^!include\s+(\S.*?)\s*$'
         [sentence.Text]:
             r'^.*$'
-        [sentence.Picture]
 
     For each line from the input, the lexer will seek the first match in the
-    regexes above.
-    """
-    ret = []
-    input_strings = input_string.split('\n')
-    for _ in range(len(input_strings)):
-        sentence = input_strings[_]
-        for regex in EXTENDED_REGEX_SENTENCE_MAP:
-            if re.match(regex, sentence) is not None:
-                sent_type = EXTENDED_REGEX_SENTENCE_MAP[regex]
-                ret.append(sent_type(_, sentence))
-                break
+    extended regexes, and then in the regexes above. All the regexes are compiled
+    once into a scanner (see `_Scanner`), and the match found is handed to the
+    sentence constructor directly.
+
+    A run of blank lines gives a single [sentence.EmptySentence], as the grammar
+    does not tell one blank line from several (see `blank_lines_counted`).
+    """
+    return list(lex_lines(input_string.split('\n')))
+
+
+def lex_lines(input_lines: Iterable[str], start: int = 0) -> Iterator[Sentence]:
+    """
+    The lazy form of `lex`, classifying lines one at a time as they are drawn from
+    `input_lines`. Lines are expected without their trailing line breaks, and are
+    numbered from `start`.
+    """
+    scanner = _get_scanner()
+    collapse = not blank_lines_counted()
+
+    blank = False
+    for index, line in enumerate(input_lines, start):
+        sentence = scanner.scan(index, line)
+        if collapse and type(sentence) is EmptySentence:
+            if blank:
+                continue
+            blank = True
         else:
-            if re.match(r'^(#){1,6}\s*(.*)$', sentence) is not None:
-                ret.append(Title(_, sentence))
-            elif re.match(r'^\s*$', sentence) is not None:
-                ret.append(EmptySentence(_))
-            elif re.match(r'^(\s*)[*-]\s+(.*)$', sentence) is not None:
-                ret.append(UnorderedList(_, sentence))
-            elif re.match(r'^(\s*)\d+\.\s+(.*)$', sentence) is not None:
-                ret.append(OrderedList(_, sentence))
-            elif re.match(r'^\x00$', sentence) is not None:
-                ret.append(Eof(_))
-            elif re.match(r'^!\[(.*)]\((.+)\)', sentence) is not None:
-                ret.append(Picture(_, sentence))
-            elif re.match(r'^.*$', sentence) is not None:
-                ret.append(Text(_, sentence))
-            else:
-                assert False, f'This is impossible'
-    return ret
\ No newline at end of file
+            blank = False
+        yield sentence
+
+
+def blank_lines_counted() -> bool:
+    """
+    Whether a registered block extension expects EmptySentence, or any Sentence, as one
+    of its parts, so that each blank line has to be kept.
+    """
+    return any([stype in (EmptySentence, Sentence)
+                for blk_type in EXTENDED_NAME_BLOCK_MAP.values() for stype in blk_type.sentence_types])
@@ -0,0 +1,222 @@
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from md2latex_converter.converter import Converter
+from md2latex_converter.core.client_handler import default_socket_filename
+
+
+def _stamp(filename: str) -> tuple[int, int] | None:
+    if filename is None or filename == '':
+        return None
+    stat = os.stat(filename)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _ExtensionSets:
+    """
+    A `Converter` for every extension set seen by the daemon.
+
+    An extension set is identified by its pair of -eS/-eB files. Its converter is made
+    once, and made again once one of the files changes. Converters keep their extensions
+    to themselves, so that requests with different extension sets convert concurrently.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sets: dict[tuple[str, str], tuple[tuple, Converter]] = dict()
+
+    def converter(self, sent_ext_filename: str, blk_ext_filename: str) -> Converter:
+        key = (sent_ext_filename, blk_ext_filename)
+        stamps = (_stamp(sent_ext_filename), _stamp(blk_ext_filename))
+
+        with self._lock:
+            if key in self._sets and self._sets[key][0] == stamps:
+                return self._sets[key][1]
+
+            converter = Converter.from_files(sent_ext_filename, blk_ext_filename)
+            self._sets[key] = (stamps, converter)
+            return converter
+
+
+class _Stats:
+    def __init__(self, kept: int = 1000):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latencies: deque[float] = deque(maxlen=kept)
+
+    def record(self, outcome: str, seconds: float | None = None) -> None:
+        with self._lock:
+            self.requests += 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            if seconds is not None:
+                self.latencies.append(seconds * 1000)
+
+    def to_json(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+
+        def _percentile(p: float) -> float | None:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else None
+
+        return {
+            'uptime_s': time.time() - self.started,
+            'requests': self.requests,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'latency_ms': {
+                'recent': len(latencies),
+                'mean': sum(latencies) / len(latencies) if latencies else None,
+                'p50': _percentile(0.5),
+                'p95': _percentile(0.95),
+                'max': latencies[-1] if latencies else None,
+            }
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    POST /convert with {"markdown": ..., "sent_ext": ..., "blk_ext": ..., "argv": [...], "record_command": true,
+    "filename": ...} gives {"latex": ...} or {"error": ...}; GET /stats gives the request counts and latencies.
+    Files included by the markdown are relative to the directory of "filename", if given.
+    """
+
+    server: '_Server'
+
+    def _reply(self, status: int, obj: dict) -> None:
+        body = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self._reply(200, self.server.stats.to_json())
+        else:
+            self._reply(404, {'error': f'no such path {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/convert':
+            self._reply(404, {'error': f'no such path {self.path}'})
+            return
+
+        if not self.server.slots.acquire(timeout=self.server.queue_timeout):
+            self.server.stats.record('rejected')
+            self._reply(503, {'error': 'too many requests in flight'})
+            return
+
+        start = time.perf_counter()
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            assert isinstance(request, dict) and isinstance(request.get('markdown'), str), \
+                f'wrong request! expect {{"markdown": ...}}'
+
+            converter = self.server.extension_sets.converter(request.get('sent_ext') or '', request.get('blk_ext') or '')
+            latex = converter.convert(request['markdown'], argv=request.get('argv'),
+                                      record_command=request.get('record_command', True),
+                                      filename=request.get('filename'))
+        except Exception as e:
+            self.server.stats.record('failed', time.perf_counter() - start)
+            self._reply(400, {'error': f'{type(e).__name__}: {e}'})
+        else:
+            self.server.stats.record('succeeded', time.perf_counter() - start)
+            self._reply(200, {'latex': latex})
+        finally:
+            self.server.slots.release()
+
+    def address_string(self) -> str:
+        return self.client_address[0] if self.client_address else 'unix socket'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server:
+    stats: _Stats
+    extension_sets: _ExtensionSets
+    slots: threading.BoundedSemaphore
+    queue_timeout: float
+
+
+class _TCPServer(_Server, ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(_Server, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_handler_generator(
+        socket_filename: str | None,
+        port: int | None,
+        max_concurrency: int = 8,
+        queue_timeout: float = 10.0
+) -> Callable[[], None]:
+    """
+    Run the conversion daemon until interrupted, on `port` of localhost if given, or on
+    the Unix socket `socket_filename` otherwise.
+
+    Requests name extension files, and include files, that the daemon reads with the
+    rights of its user. The Unix socket is only open to that user, while any local user
+    can connect to `port`.
+
+    At most `max_concurrency` requests are admitted at a time; a request waiting longer
+    than `queue_timeout` seconds for a slot is rejected with 503.
+    """
+
+    def _r():
+        if port is not None:
+            server = _TCPServer(('127.0.0.1', port), _Handler)
+            address = f'http://127.0.0.1:{port}'
+        else:
+            filename = socket_filename or default_socket_filename()
+            if os.path.exists(filename):
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    probe.connect(filename)
+                except OSError:
+                    os.remove(filename)  # left by a daemon that is gone
+                else:
+                    assert False, f'a daemon is already serving on {filename}'
+                finally:
+                    probe.close()
+            # only the user running the daemon can connect, as it reads files with their rights
+            umask = os.umask(0o177)
+            try:
+                server = _UnixServer(filename, _Handler)
+            finally:
+                os.umask(umask)
+            os.chmod(filename, 0o600)
+            address = filename
+
+        server.stats = _Stats()
+        server.extension_sets = _ExtensionSets()
+        server.slots = threading.BoundedSemaphore(max_concurrency)
+        server.queue_timeout = queue_timeout
+
+        print(f'm2l: serving on {address}, press Ctrl-C to stop', file=sys.stderr)
+        sys.stderr.flush()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if port is None:
+                os.remove(address)
+
+    return _r
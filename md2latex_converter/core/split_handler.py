@@ -0,0 +1,123 @@
+import hashlib
+import os
+import re
+from collections import Counter
+from typing import Callable, Iterable, TYPE_CHECKING
+
+from md2latex_converter.core import io_handler
+from md2latex_converter.core.includes import Fragment, IncludeGraph
+from md2latex_converter.core.workflow import join_lines, render_body
+from md2latex_converter.data_structures.blocks import Document
+from md2latex_converter.data_structures.sentences import Include
+
+if TYPE_CHECKING:
+    from md2latex_converter.core.render_cache import RenderCache
+
+
+def sections_directory(output_filename: str) -> str:
+    """
+    The directory of the section files of `output_filename`, next to it: foo-sections for foo.tex.
+    """
+    return output_filename.removesuffix('.tex') + '-sections'
+
+
+def _slug(title: str) -> str:
+    """
+    A file name for a section, from its title: lowercase ASCII words joined by '-', or
+    a digest of the title if it has none, e.g. a Chinese title.
+    """
+    slug = '-'.join(re.findall(r'[a-z0-9]+', title.lower()))[:48].strip('-')
+    return slug or 'section-' + hashlib.blake2b(title.encode('utf-8'), digest_size=4).hexdigest()
+
+
+def section_names(titles: list[str]) -> list[str]:
+    """
+    The file names of sections with `titles`, in order.
+
+    The first section with a slug is named after it. A later one is named after its slug
+    and a digest of its title and of how many sections with the same title come before
+    it, e.g. "intro-1f2e3d4c", so that a name depends on its section only, and not on
+    where the section is, and a name never takes the slug of another section.
+    """
+    slugs = [_slug(_) for _ in titles]
+    reserved = set(slugs)
+    taken: set[str] = set()
+    occurrences: Counter[str] = Counter()
+
+    names: list[str] = []
+    for title, slug in zip(titles, slugs):
+        occurrence = occurrences[title]
+        occurrences[title] += 1
+        name = slug
+        if name in taken:
+            key = f'{occurrence}:{title}'.encode('utf-8')
+            # a longer digest only if a shorter one clashes, as good as never
+            for size in range(4, 65, 4):
+                name = f'{slug}-{hashlib.blake2b(key, digest_size=size).hexdigest()}'
+                if name not in reserved and name not in taken:
+                    break
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+def split_handler_generator(
+        provider: Callable[[], str | Iterable[str]],
+        output_filename: str,
+        render_cache: 'RenderCache | None' = None,
+        record_command: bool = True,
+        include_graph: IncludeGraph | None = None
+) -> Callable[[], None]:
+    """
+    Convert what `provider` gives into a master file, `output_filename`, and a file for
+    each section, i.e. each 2nd level title and the components up to the next one, in
+    `sections_directory`. The master file holds the head, the components before the
+    first section and an \\input of each section file.
+
+    Section files are named after their titles, see `section_names`, so that adding a
+    section leaves the names of the others unchanged. A file is only written if its text changed, and
+    the section files of sections no longer in the document are removed, so that the
+    LaTeX toolchain rebuilds only what changed.
+
+    Included files are spliced in before the document is split, through `include_graph`
+    if one is given, so that the sections they hold get files of their own.
+    """
+
+    def _r():
+        src = provider()
+        sections: list[tuple[int, str]] = []
+        includes: list[tuple[int, Include]] = []
+        try:
+            title_candidates, body = render_body(src.split('\n') if isinstance(src, str) else src, render_cache,
+                                                 sections=sections, includes=includes)
+            document = (include_graph or IncludeGraph()).expand(Fragment(title_candidates, body, sections, includes),
+                                                               render_cache)
+            title_candidates, body, sections = document.title_candidates, document.body, document.sections
+        finally:
+            if render_cache is not None:
+                render_cache.close()
+
+        directory = sections_directory(output_filename)
+        relative_directory = os.path.basename(directory)
+        os.makedirs(directory, exist_ok=True)
+
+        master = io_handler.FileSink(output_filename, keep_unchanged=True)
+        master.write(join_lines(Document.head(title_candidates, record_command=record_command)))
+        ends = [_[0] for _ in sections[1:]] + [len(body)]
+        master.write(''.join(body[:sections[0][0] if sections else len(body)]))
+
+        names = section_names([_[1] for _ in sections])
+        for (begin, _), end, name in zip(sections, ends, names):
+            sink = io_handler.FileSink(os.path.join(directory, name + '.tex'), keep_unchanged=True)
+            sink.write(''.join(body[begin:end]))
+            sink.close()
+            master.write(join_lines([(1, f'\\input{{{relative_directory}/{name}}}'), (1, '')]))
+
+        master.write(join_lines(Document.tail()))
+        master.close()
+
+        for _ in os.listdir(directory):
+            if _.endswith('.tex') and _.removesuffix('.tex') not in names:
+                os.remove(os.path.join(directory, _))
+
+    return _r
@@ -5,48 +5,100 @@ Markdown Grammar used in this project is listed as follows:
     Document:
         (Component)* [sentence.eof]
     Components:
-        (TitleBlock) | (PlainText) | (ULBlock) | (OLBlock) | (PictureImportation) | [sentence.emptySentence]
+        (TitleBlock) | (PlainText) | (ULBlock) | (OLBlock) | (PictureImportation) | (IncludeBlock) | [sentence.emptySentence]
     TitleBlock:
         [sentence.title]
     PlainText:
         [sentence.text]* [sentence.emptySentence]+
     ULBlock:
-        ([sentence.unorderedList] [sentence.text]* )* [sentence.emptySentence]+
+        [sentence.unorderedList] [sentence.text]* (([sentence.unorderedList] | [sentence.orderedList]) [sentence.text]* )* [sentence.emptySentence]+
     OLBlock:
-        ([sentence.orderedList] [sentence.text]* )* [sentence.emptySentence]+
+        [sentence.orderedList] [sentence.text]* (([sentence.unorderedList] | [sentence.orderedList]) [sentence.text]* )* [sentence.emptySentence]+
     PictureImportation:
         [sentence.orderedList] [sentence.emptySentence]+
+    IncludeBlock:
+        [sentence.include] [sentence.emptySentence]+
+
+Each block extension adds its identification as one more kind of component. A component
+is chosen by the type code of its first sentence, in a table lookup (see `Component.parse`),
+and runs of sentences of the same type are consumed by `Tokenizer.run`.
 """
+from collections import deque
+from typing import Iterable, Iterator
+
 from md2latex_converter.data_structures.sentences import *
 
 
 class Tokenizer:
+    """
+    Sentence stream for the parser.
 
-    _sentences: list[Sentence]
-    _index: int
-    _length: int
+    Sentences are drawn lazily from any iterable, e.g. the generator given by
+    `sentence_parser.lex_lines`, and at most `max_lookahead` of them are buffered
+    ahead of the parser. Once the sentences run out, `Eof` is given.
+    """
+
+    _sentences: Iterator[Sentence]
+    _buffer: deque[Sentence]
+    _max_lookahead: int
+    _next_index: int
     _peek_token: Sentence
 
-    def __init__(self, _sentences: list[Sentence]):
-        self._sentences = _sentences
-        self._index = 0
-        self._length = len(_sentences)
-        self._peek_token = _sentences[0]
+    def __init__(self, _sentences: Iterable[Sentence], max_lookahead: int = 1):
+        assert max_lookahead >= 1, f'max_lookahead should be positive, reading {max_lookahead}'
+        self._sentences = iter(_sentences)
+        self._buffer = deque()
+        self._max_lookahead = max_lookahead
+        self._next_index = 0
+        self._peek_token = self.lookahead(0)
 
     @property
     def peek(self) -> Sentence:
         return self._peek_token
 
+    def lookahead(self, k: int) -> Sentence:
+        """
+        The k-th sentence after the current one, `lookahead(0)` being `peek`.
+        """
+        assert k < self._max_lookahead, f'cannot look {k} sentences ahead, max_lookahead is {self._max_lookahead}'
+        while len(self._buffer) <= k:
+            sentence = next(self._sentences, None) or Eof(self._next_index)
+            self._next_index = sentence.line
+            self._buffer.append(sentence)
+        return self._buffer[k]
+
     def next(self) -> Sentence:
-        self._index += 1
-        self._peek_token = self._sentences[self._index] if self._index < self._length else Eof(self._index)
+        buffer = self._buffer
+        buffer.popleft()
+        if not buffer:
+            sentence = next(self._sentences, None) or Eof(self._next_index)
+            self._next_index = sentence.line
+            buffer.append(sentence)
+        self._peek_token = buffer[0]
         return self._peek_token
 
+    def run(self, code: int | None) -> list[Sentence]:
+        """
+        Consume the sentences ahead as long as their type code is `code`, or, if `code` is
+        None, as long as they are not EOF.
+        """
+        ret = []
+        if code is None:
+            while self._peek_token.code != Eof.code:
+                ret.append(self._peek_token)
+                self.next()
+        else:
+            while self._peek_token.code == code:
+                ret.append(self._peek_token)
+                self.next()
+        return ret
+
     @property
     def line(self) -> int:
-        return self._index + 1
+        """
+        The line of the current sentence in the source, blank lines being collapsed by the lexer.
+        """
+        return self._peek_token.line
 
     # def parse(self) -> 'Document':
     #     return Document.parse(self)
-
-
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+from typing import Callable
+
+from md2latex_converter.data_structures import runtime_maps
+
+
+def _stamp(filename: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _report(s: str) -> None:
+    print(s, file=sys.stderr)
+    sys.stderr.flush()
+
+
+def watch_handler_generator(
+        input_filename: str,
+        extension_filenames: list[str],
+        register: Callable[[], None],
+        convert: Callable[[], None],
+        interval: float = 0.01,
+        debounce: float = 0.02,
+        dependencies: Callable[[], list[str]] | None = None
+) -> Callable[[], None]:
+    """
+    Convert `input_filename`, then keep converting it whenever it changes, until interrupted.
+
+    The files are polled for their modification time and size every `interval` seconds,
+    and a rebuild starts once they stay unchanged for `debounce` seconds, so that a burst
+    of saves leads to a single rebuild. The process keeps its imports and registered
+    extensions between rebuilds; extensions are registered again only when one of
+    `extension_filenames` changes. The files the last rebuild read besides, given by
+    `dependencies`, e.g. the files included by the input, are watched as well.
+
+    A failing rebuild is reported, and the watch goes on.
+    """
+    watched = [input_filename, *[_ for _ in extension_filenames if _ is not None and _ != '']]
+
+    registered = False
+
+    def _rebuild(reload_extensions: bool) -> None:
+        nonlocal registered
+
+        start = time.perf_counter()
+        try:
+            if reload_extensions or not registered:
+                registered = False
+                runtime_maps.clear()
+                register()
+                registered = True
+            convert()
+        except Exception as e:
+            _report(f'm2l: failed to convert {input_filename}, {type(e).__name__}: {e}')
+        else:
+            _report(f'm2l: converted {input_filename} in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    def _dependent(stamps: dict[str, tuple[int, int] | None]) -> dict[str, tuple[int, int] | None]:
+        # files the last rebuild started reading are stamped now, the others keep their stamps
+        files = [*watched, *[_ for _ in (dependencies() if dependencies is not None else []) if _ not in watched]]
+        return {_: stamps[_] if _ in stamps else _stamp(_) for _ in files}
+
+    def _r():
+        stamps = {_: _stamp(_) for _ in watched}
+        _rebuild(True)
+        stamps = _dependent(stamps)
+        _report(f'm2l: watching {", ".join(stamps)}, press Ctrl-C to stop')
+
+        try:
+            while True:
+                time.sleep(interval)
+                if (current := {_: _stamp(_) for _ in stamps}) == stamps:
+                    continue
+
+                # wait for the burst of saves to settle
+                settled_at = time.perf_counter()
+                while time.perf_counter() - settled_at < debounce:
+                    time.sleep(interval)
+                    if (latest := {_: _stamp(_) for _ in stamps}) != current:
+                        current = latest
+                        settled_at = time.perf_counter()
+
+                reload_extensions = any([current[_] != stamps[_] for _ in watched[1:]])
+                _rebuild(reload_extensions)
+                stamps = _dependent(current)
+        except KeyboardInterrupt:
+            _report('m2l: stopped watching')
+
+    return _r
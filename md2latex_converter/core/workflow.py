@@ -1,16 +1,130 @@
-from typing import Callable
+from typing import Callable, Iterable, TYPE_CHECKING
 
-from md2latex_converter.core import sentence_parser
+from md2latex_converter.core import inline, io_handler, sentence_parser
 from md2latex_converter.core.tokenizer import Tokenizer
-from md2latex_converter.data_structures.blocks import Document
+from md2latex_converter.data_structures.blocks import Document, Component, IncludeBlock
 from md2latex_converter.data_structures import sent_ext, blk_ext
+from md2latex_converter.data_structures.sentences import Include
 
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from md2latex_converter.core.includes import IncludeGraph
+    from md2latex_converter.core.render_cache import RenderCache
 
-def worker_generator(
+
+# appended to the source text, ending the document with empty lines and an EOF sentence
+EOF_SENTINEL = '\n\n\n\0'
+
+
+def join_lines(latexes: list[tuple[int, str]]) -> str:
+    """
+    The text of (indent, line) pairs, each line indented by tabs and ended by a line break.
+    """
+    return ''.join([('\t' * _[0] + _[1] + '\n') for _ in latexes])
+
+
+def render_body(lines: Iterable[str], render_cache: 'RenderCache | None' = None, start: int = 0,
+                sections: list[tuple[int, str]] | None = None,
+                includes: list[tuple[int, Include]] | None = None) -> tuple[list[Component], list[str]]:
+    """
+    Lex, parse and render the source lines, numbered from `start`, one component at a time.
+
+    Gives the title candidates among the components, at most two of them as only whether
+    there is exactly one matters, and the text of the body, one chunk per component.
+    The chunk starting each section, and its title, are added to `sections` if given.
+    The chunk of each include directive is left empty, and added to `includes` with the
+    directive if given, see `includes.IncludeGraph`.
+    """
+    tokenizer = Tokenizer(sentence_parser.lex_lines(lines, start))
+
+    title_candidates: list[Component] = []
+    body: list[str] = []
+    component_lines: list[str] = []
+
+    def _emit_line(indent: int, line: str) -> None:
+        component_lines.append('\t' * indent + line + '\n')
+
+    with inline.document_memo():
+        for component in Document.parse_components(tokenizer):
+            if Document.is_title_candidate(component) and len(title_candidates) < 2:
+                title_candidates.append(component)
+            elif sections is not None and Document.is_section(component):
+                sections.append((len(body), component.title.title_name))
+            elif includes is not None and isinstance(component, IncludeBlock):
+                includes.append((len(body), component.include))
+                body.append('')
+                continue
+            Document.emit_body(component, _emit_line, render_cache)
+            body.append(''.join(component_lines))
+            component_lines.clear()
+
+    return title_candidates, body
+
+
+def expand_includes(title_candidates: list[Component], body: list[str], includes: list[tuple[int, Include]],
+                    include_graph: 'IncludeGraph | None' = None, render_cache: 'RenderCache | None' = None,
+                    executor: 'Executor | None' = None) -> tuple[list[Component], list[str]]:
+    """
+    Splice the files included by a body given by `render_body` in place of their directives,
+    through `include_graph` if one is given.
+    """
+    if not includes and include_graph is None:
+        return title_candidates, body
+
+    from md2latex_converter.core.includes import Fragment, IncludeGraph
+    include_graph = include_graph if include_graph is not None else IncludeGraph()
+    expanded = include_graph.expand(Fragment(title_candidates, body, [], includes), render_cache, executor)
+    return expanded.title_candidates, expanded.body
+
+
+def emit_lines(lines: Iterable[str], write: Callable[[str], None], render_cache: 'RenderCache | None' = None,
+               argv: list[str] | None = None, record_command: bool = True,
+               include_graph: 'IncludeGraph | None' = None, executor: 'Executor | None' = None) -> None:
+    """
+    Convert the source lines into LaTeX lazily, passing the text to `write` chunk by chunk:
+    lines are lexed, parsed and rendered one component at a time.
+
+    The head holds the title of the article, only known once every component is parsed,
+    so the body is kept as one chunk of text per component until then. Nothing is
+    written if the conversion fails.
+
+    Components already rendered in `render_cache` are not rendered again. `argv` is
+    the command recorded in the output, `sys.argv` by default, unless not `record_command`.
+    Included files are resolved by `include_graph`, relative to the working directory if
+    none is given, and rendered by `executor` if one is given.
+    """
+    includes: list[tuple[int, Include]] = []
+    title_candidates, body = expand_includes(*render_body(lines, render_cache, includes=includes), includes,
+                                             include_graph, render_cache, executor)
+
+    write(join_lines(Document.head(title_candidates, argv, record_command)))
+    for _ in body:
+        write(_)
+    write(join_lines(Document.tail()))
+
+
+def convert_lines(lines: Iterable[str], render_cache: 'RenderCache | None' = None,
+                  argv: list[str] | None = None, record_command: bool = True,
+                  include_graph: 'IncludeGraph | None' = None) -> str:
+    """
+    `emit_lines`, giving the whole LaTeX text.
+    """
+    sink = io_handler.BufferSink()
+    emit_lines(lines, sink.write, render_cache, argv, record_command, include_graph)
+    return sink.getvalue()
+
+
+def convert_markdown(markdown: str, render_cache: 'RenderCache | None' = None,
+                     argv: list[str] | None = None, record_command: bool = True) -> str:
+    """
+    Convert markdown text, as read from a file, into LaTeX.
+    """
+    return convert_lines((markdown + EOF_SENTINEL).split('\n'), render_cache, argv, record_command)
+
+
+def register_generator(
         sent_ext_handler: Callable[[], list],
-        blk_ext_handler: Callable[[], list],
-        provider: Callable[[], str],
-        consumers: list[Callable[[str], None]]
+        blk_ext_handler: Callable[[], list]
 ) -> Callable[[], None]:
     def _r():
         sent_ext_src = sent_ext_handler()
@@ -18,14 +132,54 @@ def worker_generator(
         blk_ext_src = blk_ext_handler()
         blk_ext.register(blk_ext_src)
 
+    return _r
+
+
+def converter_generator(
+        provider: Callable[[], str | Iterable[str]],
+        sinks: list[io_handler.Sink],
+        render_cache: 'RenderCache | None' = None,
+        record_command: bool = True,
+        include_graph: 'IncludeGraph | None' = None,
+        executor: 'Executor | None' = None
+) -> Callable[[], None]:
+    """
+    Convert what `provider` gives with the extensions registered at the time, and write
+    the result to every sink. The command is recorded in the output if `record_command`.
+    Included files are resolved by `include_graph`, see `emit_lines`.
+
+    `provider` gives either the whole source text, ended by '\\n\\n\\n\\0', or its lines.
+    """
+    def _write(s: str) -> None:
+        for _ in sinks:
+            _.write(s)
+
+    def _r():
         src = provider()
-        sentence_list = sentence_parser.lex(src)
-        tokenizer = Tokenizer(sentence_list)
-        document = Document.parse(tokenizer)
-        latexes = document.toLaTeX()
-        tar = ''.join([('\t' * _[0] + _[1] + '\n') for _ in latexes])
-
-        for _ in consumers:
-            _(tar)
+        try:
+            emit_lines(src.split('\n') if isinstance(src, str) else src, _write, render_cache,
+                       record_command=record_command, include_graph=include_graph, executor=executor)
+        finally:
+            if render_cache is not None:
+                render_cache.close()
+            for _ in sinks:
+                _.close()
+
+    return _r
+
+
+def worker_generator(
+        sent_ext_handler: Callable[[], list],
+        blk_ext_handler: Callable[[], list],
+        provider: Callable[[], str | Iterable[str]],
+        sinks: list[io_handler.Sink],
+        render_cache: 'RenderCache | None' = None
+) -> Callable[[], None]:
+    register = register_generator(sent_ext_handler, blk_ext_handler)
+    convert = converter_generator(provider, sinks, render_cache)
+
+    def _r():
+        register()
+        convert()
 
     return _r
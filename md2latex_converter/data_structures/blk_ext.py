@@ -1,14 +1,17 @@
+from typing import Any, Callable
+
 from md2latex_converter.core.inline import texify
 from md2latex_converter.data_structures.blocks import Component, BUILTIN_NAME_BLOCK_MAP, BUILTIN_PREFIX_BLOCK_MAP
 from md2latex_converter.data_structures.prototypes import Sentence
 from md2latex_converter.data_structures.runtime_maps import EXTENDED_PREFIX_BLOCK_MAP, EXTENDED_NAME_SENTENCE_MAP, \
     EXTENDED_NAME_BLOCK_MAP
-from md2latex_converter.data_structures.sentences import BUILTIN_SENTENCES_MAP
+from md2latex_converter.data_structures.sentences import BUILTIN_SENTENCES_MAP, Eof
 
 
 class _Identification:
     mapped: type[Sentence]
     compositions: list[tuple[str, str, type[Sentence]]]
+    _steps: list[tuple[int | None, str, type[Sentence]]]
 
     def __init__(self, compositions: list[dict]):
         self.compositions = []
@@ -33,166 +36,161 @@ class _Identification:
 
             assert self.compositions[0][2] != Sentence, f'Cannot expect "Sentence" at start of identification!'
 
+        self._check_reachable()
+        # a "Sentence" is of any type, and a run of them goes up to EOF
+        self._steps = [(None if stype is Sentence else stype.code, occurrence, stype)
+                       for _, occurrence, stype in self.compositions]
+
+    def _check_reachable(self) -> None:
+        """
+        Reject compositions that can never be parsed: the parse does not backtrack, so a
+        run takes every sentence of its type, and a run of any "Sentence" takes every
+        sentence up to EOF. A block started by EOF is never parsed either, as EOF ends
+        the document.
+        """
+        assert len(self.compositions) > 0, f'wrong identification! No sentence expected'
+        assert self.prefix is not Eof, f'wrong identification! A block cannot start with EOF'
+        for (name, occurrence, stype), (next_name, _, next_stype) in zip(self.compositions, self.compositions[1:]):
+            if occurrence in ['*', '+']:
+                assert stype is not Sentence, \
+                    f'wrong identification! {next_name} never follows a run of any Sentence'
+                assert stype is not next_stype, \
+                    f'wrong identification! {next_name} never follows a run of {name}'
+
     @property
     def prefix(self) -> type[Sentence]:
         return self.compositions[0][2]
 
     def parse(self, tokenizer):
         ret = []
-        for name, occurrence, stype in self.compositions:
-            assert occurrence in ['1', '*', '+'], f'occurrence should be among "1", "*", "+". Reading {occurrence}'
-
-            if occurrence == '1':
-                assert isinstance(tokenizer.peek, stype), f'missing {stype.identifier} in line {tokenizer.line}'
+        for code, occurrence, stype in self._steps:
+            if occurrence == '1' or occurrence == '+':
+                assert code is None or tokenizer.peek.code == code, f'missing {stype.identifier} in line {tokenizer.line}'
                 ret.append(tokenizer.peek)
                 tokenizer.next()
-            elif occurrence == '*':
-                temp = []
-                while isinstance(tokenizer.peek, stype):
-                    temp.append(tokenizer.peek)
-                    tokenizer.next()
-                ret.append(temp)
-            elif occurrence == '+':
-                temp = []
-                assert isinstance(tokenizer.peek, type), f'missing {stype.identifier} in line {tokenizer.line}'
-                ret.append(tokenizer.peek)
-                tokenizer.next()
-                while isinstance(tokenizer.peek, type):
-                    temp.append(tokenizer.peek)
-                    tokenizer.next()
-                ret.append(temp)
+            if occurrence == '*' or occurrence == '+':
+                ret.append(tokenizer.run(code))
 
         return ret
 
 
-class _ToLaTeX:
-
-    def __init__(self):
-        pass
-
-    def toLaTeX(self, located) -> str:
-        pass
-
-
-class _ToStr(_ToLaTeX):
-    _target_str: str
-
-    def __init__(self, target_str: str):
-        super().__init__()
-        self._target_str = target_str
-
-    def toLaTeX(self, located) -> str:
-        return self._target_str
-
-
-class _ToLineBreak(_ToLaTeX):
-    _target_str: str
-
-    def __init__(self):
-        super().__init__()
-        self._target_str = '\n'
-
-    def toLaTeX(self, located) -> str:
-        return '\n'
-
+# shapes of what a template is rendered on, known when the block extension is registered:
+# one sentence, a run of sentences of any length, or a tuple of the shapes of the parts.
+_SENTENCE = 'sentence'
+_RUN = 'run'
 
-class _ToIndent(_ToLaTeX):
-    _target_str: str
 
-    def __init__(self):
-        super().__init__()
-        self._target_str = '\t'
-
-    def toLaTeX(self, located) -> str:
-        return '\t'
-
-
-class _ToRef(_ToLaTeX):
-    to_latex: list[_ToLaTeX]
-    ref_id: int
-
-    def __init__(self, ref_id: int, to_latex: list[_ToLaTeX]):
-        super().__init__()
-        self.ref_id = ref_id
-        self.to_latex = to_latex
-
-    def toLaTeX(self, located) -> str:
-        assert isinstance(located, list), f'wrong toLaTeX! Want to ref into not an array!'
-        assert len(located) > self.ref_id
-        referenced = located[self.ref_id]
-        return ''.join([_.toLaTeX(referenced) for _ in self.to_latex])
-
-
-class _ToForeach(_ToLaTeX):
-    def __init__(self, to_latex: list[_ToLaTeX]):
-        super().__init__()
-        self.to_latex = to_latex
+def _shape_of(identification: _Identification) -> tuple:
+    ret = []
+    for _, occurrence, _ in identification.compositions:
+        if occurrence == '1':
+            ret.append(_SENTENCE)
+        elif occurrence == '*':
+            ret.append(_RUN)
+        elif occurrence == '+':
+            ret.extend([_SENTENCE, _RUN])
+    return tuple(ret)
+
+
+def _sequence(parts: list) -> str | Callable[[Any], str]:
+    """
+    A render function of the concatenation of `parts`, each a literal or a render function.
+    Adjacent literals are coalesced, and a sequence of literals is a literal itself.
+    """
+    coalesced = []
+    for _ in parts:
+        if isinstance(_, str) and coalesced and isinstance(coalesced[-1], str):
+            coalesced[-1] += _
+        elif not (isinstance(_, str) and _ == ''):
+            coalesced.append(_)
+
+    if len(coalesced) == 0:
+        return ''
+    if len(coalesced) == 1:
+        return coalesced[0]
+
+    def _r(located):
+        return ''.join([_ if type(_) is str else _(located) for _ in coalesced])
 
-    def toLaTeX(self, located) -> str:
-        assert isinstance(located, list), f'wrong toLaTeX! Want to foreach on not an array!'
-        return ''.join([''.join([_.toLaTeX(_1) for _ in self.to_latex]) for _1 in located])
+    return _r
 
 
-class _ToTexify(_ToLaTeX):
-    def __init__(self):
-        super().__init__()
+def _ref(ref_id: int, inner: str | Callable[[Any], str], shape) -> str | Callable[[Any], str]:
+    if isinstance(shape, tuple):
+        if isinstance(inner, str):
+            return inner
+        return lambda located: inner(located[ref_id])
 
-    def toLaTeX(self, located) -> str:
-        assert isinstance(located, Sentence), f'wrong toLaTeX! Want to texify a non-string! {located}'
-        return texify(located.content)
+    # the length of a run is only known when rendering
+    def _r(located):
+        assert -len(located) <= ref_id < len(located), \
+            f'wrong toLaTeX! ref_id {ref_id} is out of {len(located)} sentences'
+        return inner if isinstance(inner, str) else inner(located[ref_id])
 
+    return _r
 
-class _ToLiteral(_ToLaTeX):
-    def __init__(self):
-        super().__init__()
 
-    def toLaTeX(self, located) -> str:
-        assert isinstance(located, Sentence), f'wrong toLaTeX! Want to texify a non-string! {located}'
-        return located.content
+def _foreach(inner: str | Callable[[Any], str]) -> Callable[[Any], str]:
+    if isinstance(inner, str):
+        return lambda located: inner * len(located)
+    return lambda located: ''.join([inner(_) for _ in located])
 
 
-def factory(commands: list) -> list[_ToLaTeX]:
-    ret = []
+def compile_template(commands: list, shape) -> str | Callable[[Any], str]:
+    """
+    Compile the toLaTeX template of a block extension, rendered on parts of `shape`, into
+    a render function giving the LaTeX text, or into a literal if it does not depend on
+    the parts. The template is checked against the shape here, once, instead of on every
+    render.
+    """
+    parts = []
     for command in commands:
         if isinstance(command, str):
-            if command == '\n':
-                ret.append(_ToLineBreak())
-                continue
-            elif command == '\t':
-                ret.append(_ToIndent())
-                continue
-            else:
-                ret.append(_ToStr(command))
+            parts.append(command)
         elif isinstance(command, dict):
             assert 'method' in command, f'wrong toLaTeX! No method specified! {command}'
             method = command['method']
             if method == 'ref':
                 assert 'ref_id' in command, f'wrong toLaTeX! No ref_id specified! {command}'
                 ref_id = command['ref_id']
+                assert isinstance(ref_id, int) and not isinstance(ref_id, bool), \
+                    f'wrong toLaTeX! ref_id should be a number! {command}'
                 assert 'toLaTeX' in command, f'wrong toLaTeX! No toLaTeX specified! {command}'
                 to_latex = command['toLaTeX']
                 assert isinstance(to_latex, list), f'wrong toLaTeX! should be a list! {to_latex}'
-                to_latex = factory(to_latex)
-                ret.append(_ToRef(ref_id, to_latex))
+                assert shape != _SENTENCE, f'wrong toLaTeX! Want to ref into not an array!'
+                if isinstance(shape, tuple):
+                    assert -len(shape) <= ref_id < len(shape), \
+                        f'wrong toLaTeX! ref_id {ref_id} is out of {len(shape)} parts'
+                    ref_shape = shape[ref_id]
+                else:
+                    ref_shape = _SENTENCE
+                parts.append(_ref(ref_id, compile_template(to_latex, ref_shape), shape))
             elif method == 'foreach':
                 assert 'toLaTeX' in command, f'wrong toLaTeX! No toLaTeX specified! {command}'
                 to_latex = command['toLaTeX']
                 assert isinstance(to_latex, list), f'wrong toLaTeX! should be a list! {to_latex}'
-                to_latex = factory(to_latex)
-                ret.append(_ToForeach(to_latex))
+                assert shape != _SENTENCE, f'wrong toLaTeX! Want to foreach on not an array!'
+                if isinstance(shape, tuple):
+                    # the parts are known, so the loop is unrolled
+                    parts.extend([_ref(_, compile_template(to_latex, shape[_]), shape) for _ in range(len(shape))])
+                else:
+                    parts.append(_foreach(compile_template(to_latex, _SENTENCE)))
             elif method == 'texify':
-                ret.append(_ToTexify())
+                assert shape == _SENTENCE, f'wrong toLaTeX! Want to texify a non-string!'
+                parts.append(lambda located: texify(located.content))
             elif method == 'literal':
-                ret.append(_ToLiteral())
+                assert shape == _SENTENCE, f'wrong toLaTeX! Want to texify a non-string!'
+                parts.append(lambda located: located.content)
             else:
                 assert False, f'Bad method! {method}'
-    return ret
+    return _sequence(parts)
 
 
 class BlkExt:
     name: str
     identification: _Identification
-    toLaTeX: list[_ToLaTeX]
+    render: str | Callable[[Any], str]
 
     def __init__(self, obj: dict):
         assert 'name' in obj, f'missing name! {obj}'
@@ -213,10 +211,14 @@ class BlkExt:
         assert 'toLaTeX' in obj, f'missing toLaTeX! {obj}'
         self.toLaTeX_obj = obj['toLaTeX']
         assert isinstance(self.toLaTeX_obj, list)
-        self.toLaTeX = to_latex = factory(self.toLaTeX_obj)
+        self.render = render = compile_template(self.toLaTeX_obj, _shape_of(self.identification))
+
+        obj_source = obj
 
         class ExtendedBlk(Component):
             block_name = name
+            source = obj_source
+            sentence_types = [stype for _, _, stype in identification.compositions]
 
             def __init__(self, parsed: list):
                 self.parsed = parsed
@@ -226,32 +228,23 @@ class BlkExt:
                 parsed = identification.parse(tokenizer)
                 return ExtendedBlk(parsed)
 
-            def toLaTeX(self) -> list[tuple[int, str]]:
-                target = ''.join([_.toLaTeX(self.parsed) for _ in to_latex])
-
+            def sentences(self) -> list[Sentence]:
                 ret = []
-                indent = 0
-                buffer = ''
-                newline = True
-                for _ in target:
-                    if newline and _ == '\t':
-                        indent += 1
-                        continue
-
-                    if _ == '\n':
-                        ret.append((indent, buffer))
-                        indent = 0
-                        buffer = ''
-                        newline = True
-                        continue
-
-                    newline = False
-                    buffer += _
-
-                ret.append((indent, buffer))
-
+                stack = [self.parsed]
+                while stack:
+                    if isinstance(top := stack.pop(), list):
+                        stack.extend(reversed(top))
+                    else:
+                        ret.append(top)
                 return ret
 
+            def emit(self, emit_line: Callable[[int, str], None]) -> None:
+                target = render if isinstance(render, str) else render(self.parsed)
+                # tabs leading a line are its indentation
+                for _ in target.split('\n'):
+                    indent = len(_) - len(_.lstrip('\t'))
+                    emit_line(indent, _[indent:])
+
             def __str__(self):
                 return self.toLaTeX()[0]
 
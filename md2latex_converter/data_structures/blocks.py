@@ -1,5 +1,5 @@
 import sys
-from typing import Type
+from typing import Callable, Iterator, Type
 
 from md2latex_converter.core.inline import texify
 from md2latex_converter.data_structures.runtime_maps import EXTENDED_PREFIX_BLOCK_MAP
@@ -17,21 +17,39 @@ class Document(Block):
 
     @staticmethod
     def parse(tokenizer) -> 'Document':
-        components: list['Component'] = []
+        return Document(list(Document.parse_components(tokenizer)))
 
-        while not isinstance(tokenizer.peek, Eof):
+    @staticmethod
+    def parse_components(tokenizer) -> Iterator['Component']:
+        """
+        The lazy form of `parse`, yielding each component as soon as it is parsed.
+        """
+        while tokenizer.peek.code != Eof.code:
             if (component := Component.parse(tokenizer)) is not None:
-                components.append(component)
+                yield component
 
-        assert isinstance(tokenizer.peek, Eof), f'expected EOF in line {tokenizer.line}'
+    @staticmethod
+    def is_title_candidate(component: 'Component') -> bool:
+        return isinstance(component, TitleBlock) and component.title.hierarchy == 1
 
-        return Document(components)
+    @staticmethod
+    def is_section(component: 'Component') -> bool:
+        return isinstance(component, TitleBlock) and component.title.hierarchy == 2
 
-    def toLaTeX(self) -> list[tuple[int, str]]:
-        declarations = [
-            (0, f'% Powered by markdown2latex-converter'),
-            (0, f'% Invoked by command: {sys.argv}')
-        ]
+    @staticmethod
+    def head(title_candidates: list['Component'], argv: list[str] | None = None,
+             record_command: bool = True) -> list[tuple[int, str]]:
+        """
+        LaTeX lines before the components. The title of the article is given by
+        the only 1st level title, if there is exactly one.
+
+        `argv` is the command recorded in the declarations, `sys.argv` by default. It is
+        left out unless `record_command`, so that the output does not depend on where
+        and how m2l was run.
+        """
+        declarations = [(0, f'% Powered by markdown2latex-converter')]
+        if record_command:
+            declarations.append((0, f'% Invoked by command: {sys.argv if argv is None else argv}'))
 
         document_class: tuple[int, str] = (0, r'\documentclass{ctexart}')
 
@@ -40,9 +58,6 @@ class Document(Block):
             (0, r'\usepackage{hyperref}')
         ]
 
-        title_candidates: list[Component] = list(
-            filter(lambda c: isinstance(c, TitleBlock) and c.title.hierarchy == 1, self.components))
-
         if len(title_candidates) == 1:
             candidate0 = title_candidates[0]
             assert isinstance(candidate0, TitleBlock)
@@ -56,50 +71,71 @@ class Document(Block):
 
         make_title: tuple[int, str] = (1, r'\maketitle')
 
-        components_latex: list[tuple[int, str]] = \
-            [_ for component in self.components for _ in [*component.toLaTeX(), (0, '')]]
-
-        indented_components_latex = \
-            [(indent + 1, content) for indent, content in components_latex]
-
-        document_end: tuple[int, str] = (0, r'\end{document}')
-
         return [
             *declarations,
             document_class,
             *used_packages,
             title_decl,
             document_begin,
-            make_title,
-            *indented_components_latex,
-            document_end
+            make_title
         ]
 
+    @staticmethod
+    def emit_body(component: 'Component', emit_line: Callable[[int, str], None], render_cache=None) -> None:
+        """
+        Push the LaTeX lines of a component inside the document, followed by an empty line.
+        The component is rendered through `render_cache` if one is given.
+        """
+        if render_cache is None:
+            component.emit(lambda indent, line: emit_line(indent + 1, line))
+        else:
+            for indent, line in render_cache.render(component):
+                emit_line(indent + 1, line)
+        emit_line(1, '')
+
+    @staticmethod
+    def body(component: 'Component', render_cache=None) -> list[tuple[int, str]]:
+        ret: list[tuple[int, str]] = []
+        Document.emit_body(component, lambda indent, line: ret.append((indent, line)), render_cache)
+        return ret
+
+    @staticmethod
+    def tail() -> list[tuple[int, str]]:
+        return [(0, r'\end{document}')]
+
+    def emit(self, emit_line: Callable[[int, str], None]) -> None:
+        title_candidates: list[Component] = list(filter(Document.is_title_candidate, self.components))
+
+        for _ in Document.head(title_candidates):
+            emit_line(*_)
+        for component in self.components:
+            Document.emit_body(component, emit_line)
+        for _ in Document.tail():
+            emit_line(*_)
+
 
 class Component(Block):
     __symbol_name = 'Component'
 
     @staticmethod
     def parse(tokenizer):
-        if isinstance(tokenizer.peek, Title):
-            return TitleBlock.parse(tokenizer)
-        elif isinstance(tokenizer.peek, Text):
-            return PlainText.parse(tokenizer)
-        elif isinstance(tokenizer.peek, UnorderedList):
-            return ULBlock.parse(tokenizer)
-        elif isinstance(tokenizer.peek, OrderedList):
-            return OLBlock.parse(tokenizer)
-        elif isinstance(tokenizer.peek, EmptySentence):
-            tokenizer.next()
-            return None
-        elif isinstance(tokenizer.peek, Picture):
-            return PictureImportation.parse(tokenizer)
-        elif type(tokenizer.peek) in EXTENDED_PREFIX_BLOCK_MAP:
-            return EXTENDED_PREFIX_BLOCK_MAP[type(tokenizer.peek)].parse(tokenizer)
+        """
+        Parse the component started by the current sentence, or skip an EmptySentence.
+        The block is looked up by the type code of the sentence, in `BUILTIN_CODE_PARSE_TABLE`
+        for built-in sentences and in `EXTENDED_PREFIX_BLOCK_MAP` otherwise.
+        """
+        peek = tokenizer.peek
+        if 0 <= peek.code < len(BUILTIN_CODE_PARSE_TABLE) and (parse := BUILTIN_CODE_PARSE_TABLE[peek.code]):
+            return parse(tokenizer)
+        elif (blk_type := EXTENDED_PREFIX_BLOCK_MAP.get(type(peek))) is not None:
+            return blk_type.parse(tokenizer)
         else:
-            assert False, f'm2l did not support this sentence type {type(tokenizer.peek)}'
+            assert False, f'm2l did not support this sentence type {type(peek)}'
 
-    def toLaTeX(self) -> list[tuple[int, str]]:
+    def sentences(self) -> list[Sentence]:
+        """
+        The source sentences the rendering of this component depends on.
+        """
         pass
 
 
@@ -123,19 +159,20 @@ class TitleBlock(Component):
 
     @staticmethod
     def parse(tokenizer) -> 'TitleBlock':
-        assert isinstance(tokenizer.peek, Title), f'missing Title in line {tokenizer.line}'
+        assert tokenizer.peek.code == Title.code, f'missing Title in line {tokenizer.line}'
 
         title = tokenizer.peek
         tokenizer.next()
 
         return TitleBlock(title)
 
-    def toLaTeX(self) -> list[tuple[int, str]]:
-        if self.title.hierarchy == 1:
-            return []
-        else:
+    def sentences(self) -> list[Sentence]:
+        return [self.title]
+
+    def emit(self, emit_line: Callable[[int, str], None]) -> None:
+        if self.title.hierarchy != 1:
             label: str = TitleBlock.labels[self.title.hierarchy]
-            return [(0, '\\' + label + '{' + texify(self.title.title_name) + '}')]
+            emit_line(0, '\\' + label + '{' + texify(self.title.title_name) + '}')
 
 
 class PlainText(Component):
@@ -147,158 +184,139 @@ class PlainText(Component):
 
     @staticmethod
     def parse(tokenizer):
-        texts: list[Text] = []
-
-        assert isinstance(tokenizer.peek, Text), f'missing Text in line {tokenizer.line}'
-        while isinstance((temp := tokenizer.peek), Text):
-            assert isinstance(temp, Text)
-            texts.append(temp)
-            tokenizer.next()
+        assert tokenizer.peek.code == Text.code, f'missing Text in line {tokenizer.line}'
+        texts: list[Text] = tokenizer.run(Text.code)
 
-        assert isinstance(tokenizer.peek, EmptySentence), f'missing EmptySentence in line {tokenizer.line}'
-        while isinstance(tokenizer.peek, EmptySentence):
-            tokenizer.next()
+        assert tokenizer.peek.code == EmptySentence.code, f'missing EmptySentence in line {tokenizer.line}'
+        tokenizer.run(EmptySentence.code)
 
         return PlainText(texts)
 
-    def toLaTeX(self) -> list[tuple[int, str]]:
-        return [(0, ' '.join([texify(text.content.strip()) for text in self.texts]))]
+    def sentences(self) -> list[Sentence]:
+        return self.texts
 
+    def emit(self, emit_line: Callable[[int, str], None]) -> None:
+        emit_line(0, ' '.join([texify(text.content.strip()) for text in self.texts]))
 
-class ULBlock(Component):
-    listitems: list[tuple[UnorderedList, list[Text]]]
 
-    __symbol_name = 'ULBlock'
+class _ListEnvironment:
+    """
+    An itemize or enumerate environment of a list, holding its items, as their LaTeX
+    text, and the environments nested in it, in order.
+    """
 
-    def __init__(self, listitems: list[tuple[UnorderedList, list[Text]]]):
-        self.listitems = listitems
+    __slots__ = ('name', 'children')
 
-    @staticmethod
-    def parse(tokenizer) -> 'ULBlock':
-        listitems: list[tuple[UnorderedList, list[Text]]] = []
+    def __init__(self, name: str):
+        self.name = name
+        self.children: list['str | _ListEnvironment'] = []
 
-        assert isinstance(tokenizer.peek, UnorderedList), f'missing UnorderedList in line {tokenizer.line}'
-        while isinstance((ul := tokenizer.peek), UnorderedList):
-            assert isinstance(ul, UnorderedList)
-            tokenizer.next()
-            texts = []
-            while isinstance((text := tokenizer.peek), Text):
-                assert isinstance(text, Text)
-                texts.append(text)
-                tokenizer.next()
-            listitems.append((ul, texts))
-
-        assert isinstance(tokenizer.peek, EmptySentence), f'missing EmptySentence in line {tokenizer.line}'
-        while isinstance(tokenizer.peek, EmptySentence):
-            tokenizer.next()
 
-        return ULBlock(listitems)
-
-    def toLaTeX(self) -> list[tuple[int, str]]:
-        indent = 0
-
-        spans: set[int] = set([_[0].whitespace_span for _ in self.listitems])
-        spans: list[int] = list(spans)
-        spans.sort()
-        hierarchies: list[int] = [spans.index(_[0].whitespace_span) for _ in self.listitems]
-
-        ret: list[tuple[int, str]] = [(0, r'\begin{itemize}')]
-        cur: list[int] = [0]
-        for _ in range(len(self.listitems)):
-            if cur[-1] == hierarchies[_]:
-                ret.append((indent + 1, r'\item ' + texify(' '.join(
-                    [self.listitems[_][0].main_content.strip(),
-                     *[k.content.strip() for k in self.listitems[_][1]]]))))
-            elif cur[-1] < hierarchies[_]:
-                ret.append((indent + 1, r'\begin{itemize}'))
-                indent += 1
-                ret.append((indent + 1, r'\item ' + texify(' '.join(
-                    [self.listitems[_][0].main_content.strip(),
-                     *[k.content.strip() for k in self.listitems[_][1]]]))))
-                cur.append(hierarchies[_])
-            elif cur[-1] > hierarchies[_]:
-                while cur[-1] > hierarchies[_]:
-                    cur.pop()
-                    ret.append((indent, r'\end{itemize}'))
-                    indent -= 1
-                ret.append((indent + 1, r'\item ' + texify(' '.join(
-                    [self.listitems[_][0].main_content.strip(),
-                     *[k.content.strip() for k in self.listitems[_][1]]]))))
-        while cur[-1] > 0:
-            cur.pop()
-            ret.append((indent, r'\end{itemize}'))
-            indent -= 1
-        ret.append((0, r'\end{itemize}'))
+class ListBlock(Component):
+    """
+    A list, of unordered and ordered items nested by the indent of their markers: the
+    n-th smallest indent among the items is the n-th level of nesting. A nested list
+    is an itemize or an enumerate environment after its first item.
+    """
 
-        return ret
+    listitems: list[tuple[UnorderedList | OrderedList, list[Text]]]
 
+    __symbol_name = 'ListBlock'
 
-class OLBlock(Component):
-    listitems: list[tuple[OrderedList, list[Text]]]
+    environments: dict[int, str] = {
+        UnorderedList.code: 'itemize',
+        OrderedList.code: 'enumerate',
+    }
 
-    __symbol_name = 'OLBlock'
-
-    def __init__(self, listitems: list[tuple[OrderedList, list[Text]]]):
+    def __init__(self, listitems: list[tuple[UnorderedList | OrderedList, list[Text]]]):
         self.listitems = listitems
 
     @staticmethod
-    def parse(tokenizer) -> 'OLBlock':
-        listitems: list[tuple[OrderedList, list[Text]]] = []
+    def parse_items(tokenizer) -> list[tuple[UnorderedList | OrderedList, list[Text]]]:
+        listitems: list[tuple[UnorderedList | OrderedList, list[Text]]] = []
 
-        assert isinstance(tokenizer.peek, OrderedList), f'missing OrderedList in line {tokenizer.line}'
-        while isinstance((ol := tokenizer.peek), OrderedList):
-            assert isinstance(ol, OrderedList)
-            tokenizer.next()
-            texts = []
-            while isinstance((text := tokenizer.peek), Text):
-                assert isinstance(text, Text)
-                texts.append(text)
-                tokenizer.next()
-            listitems.append((ol, texts))
-
-        assert isinstance(tokenizer.peek, EmptySentence), f'missing EmptySentence in line {tokenizer.line}'
-        while isinstance(tokenizer.peek, EmptySentence):
+        while (item := tokenizer.peek).code == UnorderedList.code or item.code == OrderedList.code:
             tokenizer.next()
+            listitems.append((item, tokenizer.run(Text.code)))
+
+        assert tokenizer.peek.code == EmptySentence.code, f'missing EmptySentence in line {tokenizer.line}'
+        tokenizer.run(EmptySentence.code)
+
+        return listitems
+
+    def sentences(self) -> list[Sentence]:
+        return [_ for item, texts in self.listitems for _ in [item, *texts]]
+
+    def tree(self) -> list[_ListEnvironment]:
+        """
+        The environments of the list, most often a single one, in one pass over the items.
+
+        An item deeper than the one before opens an environment, however many levels
+        deeper it is. An item shallower closes every environment deeper than it, and
+        goes in the environment it is back to, even if that one is shallower still.
+        An item of the other kind than its environment ends it, and starts one of its
+        own kind in its place.
+        """
+        levels: dict[int, int] = {span: level for level, span in
+                                  enumerate(sorted(set([_[0].whitespace_span for _ in self.listitems])))}
+        environments = self.environments
+
+        roots: list[_ListEnvironment] = [_ListEnvironment(environments[self.listitems[0][0].code])]
+        # the environments open, with their levels
+        stack: list[tuple[int, _ListEnvironment]] = [(0, roots[0])]
+        for item, texts in self.listitems:
+            level, name = levels[item.whitespace_span], environments[item.code]
+            if stack[-1][0] < level:
+                environment = _ListEnvironment(name)
+                stack[-1][1].children.append(environment)
+                stack.append((level, environment))
+            else:
+                while stack[-1][0] > level:
+                    stack.pop()
+                if stack[-1][1].name != name:
+                    at, _ = stack.pop()
+                    environment = _ListEnvironment(name)
+                    (stack[-1][1].children if stack else roots).append(environment)
+                    stack.append((at, environment))
+            stack[-1][1].children.append(
+                texify(' '.join([item.main_content.strip(), *[_.content.strip() for _ in texts]])))
+        return roots
+
+    def emit(self, emit_line: Callable[[int, str], None]) -> None:
+        # environments are walked with a stack of their children left, as lists can nest arbitrarily deep
+        stack: list[tuple[int, _ListEnvironment, Iterator]] = []
+        for root in self.tree():
+            emit_line(0, '\\begin{' + root.name + '}')
+            stack.append((0, root, iter(root.children)))
+            while stack:
+                indent, environment, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    emit_line(indent, '\\end{' + environment.name + '}')
+                elif isinstance(child, str):
+                    emit_line(indent + 1, '\\item ' + child)
+                else:
+                    emit_line(indent + 1, '\\begin{' + child.name + '}')
+                    stack.append((indent + 1, child, iter(child.children)))
+
+
+class ULBlock(ListBlock):
+    __symbol_name = 'ULBlock'
 
-        return OLBlock(listitems)
-
-    def toLaTeX(self) -> list[tuple[int, str]]:
-        indent = 0
-
-        spans: set[int] = set([_[0].whitespace_span for _ in self.listitems])
-        spans: list[int] = list(spans)
-        spans.sort()
-        hierarchies: list[int] = [spans.index(_[0].whitespace_span) for _ in self.listitems]
-
-        ret: list[tuple[int, str]] = [(0, '\\begin{enumerate}')]
-        cur: list[int] = [0]
-        for _ in range(len(self.listitems)):
-            if cur[-1] == hierarchies[_]:
-                ret.append((indent + 1, '\\item ' + texify(' '.join(
-                    [self.listitems[_][0].main_content.strip(),
-                     *[k.content.strip() for k in self.listitems[_][1]]]))))
-            elif cur[-1] < hierarchies[_]:
-                ret.append((indent + 1, '\\begin{enumerate}'))
-                indent += 1
-                ret.append((indent + 1, '\\item ' + texify(' '.join(
-                    [self.listitems[_][0].main_content.strip(),
-                     *[k.content.strip() for k in self.listitems[_][1]]]))))
-                cur.append(hierarchies[_])
-            elif cur[-1] > hierarchies[_]:
-                while cur[-1] > hierarchies[_]:
-                    cur.pop()
-                    ret.append((indent, '\\end{enumerate}'))
-                    indent -= 1
-                ret.append((indent + 1, '\\item ' + texify(' '.join(
-                    [self.listitems[_][0].main_content.strip(),
-                     *[k.content.strip() for k in self.listitems[_][1]]]))))
-        while cur[-1] > 0:
-            cur.pop()
-            ret.append((indent, '\\end{enumerate}'))
-            indent -= 1
-        ret.append((0, '\\end{enumerate}'))
+    @staticmethod
+    def parse(tokenizer) -> 'ULBlock':
+        assert tokenizer.peek.code == UnorderedList.code, f'missing UnorderedList in line {tokenizer.line}'
+        return ULBlock(ListBlock.parse_items(tokenizer))
 
-        return ret
+
+class OLBlock(ListBlock):
+    __symbol_name = 'OLBlock'
+
+    @staticmethod
+    def parse(tokenizer) -> 'OLBlock':
+        assert tokenizer.peek.code == OrderedList.code, f'missing OrderedList in line {tokenizer.line}'
+        return OLBlock(ListBlock.parse_items(tokenizer))
 
 
 class PictureImportation(Component):
@@ -311,25 +329,57 @@ class PictureImportation(Component):
 
     @staticmethod
     def parse(tokenizer) -> 'PictureImportation':
-        assert isinstance(tokenizer.peek, Picture), f'missing Picture in line {tokenizer.line}'
+        assert tokenizer.peek.code == Picture.code, f'missing Picture in line {tokenizer.line}'
         picture = tokenizer.peek
         tokenizer.next()
 
-        assert isinstance(tokenizer.peek, EmptySentence), f'missing EmptySentence in line {tokenizer.line}'
-        while isinstance(tokenizer.peek, EmptySentence):
-            tokenizer.next()
+        assert tokenizer.peek.code == EmptySentence.code, f'missing EmptySentence in line {tokenizer.line}'
+        tokenizer.run(EmptySentence.code)
 
-        assert isinstance(picture, Picture)
         return PictureImportation(picture)
 
-    def toLaTeX(self) -> list[tuple[int, str]]:
-        ret: list[tuple[int, str]] = []
-        ret.append((0, r'\begin{figure}'))
-        ret.append((1, r'\includegraphics{' + self.picture.path_to_pic + '}'))
+    def sentences(self) -> list[Sentence]:
+        return [self.picture]
+
+    def emit(self, emit_line: Callable[[int, str], None]) -> None:
+        emit_line(0, r'\begin{figure}')
+        emit_line(1, r'\includegraphics{' + self.picture.path_to_pic + '}')
         if self.picture.alt_text is not None and self.picture.alt_text != '':
-            ret.append((1, r'\caption{' + self.picture.alt_text + '}'))
-        ret.append((0, r'\end{figure}'))
-        return ret
+            emit_line(1, r'\caption{' + self.picture.alt_text + '}')
+        emit_line(0, r'\end{figure}')
+
+
+class IncludeBlock(Component):
+    """
+    Another markdown file, lexed, parsed and rendered on its own, see `core.includes`.
+
+    The file is spliced in by the conversion; when the block is rendered by itself, e.g.
+    by `Document.emit`, only a comment stands for it.
+    """
+
+    include: Include
+
+    __symbol_name = 'IncludeBlock'
+
+    def __init__(self, include: Include):
+        self.include = include
+
+    @staticmethod
+    def parse(tokenizer) -> 'IncludeBlock':
+        assert tokenizer.peek.code == Include.code, f'missing Include in line {tokenizer.line}'
+        include = tokenizer.peek
+        tokenizer.next()
+
+        assert tokenizer.peek.code == EmptySentence.code, f'missing EmptySentence in line {tokenizer.line}'
+        tokenizer.run(EmptySentence.code)
+
+        return IncludeBlock(include)
+
+    def sentences(self) -> list[Sentence]:
+        return [self.include]
+
+    def emit(self, emit_line: Callable[[int, str], None]) -> None:
+        emit_line(0, '% include ' + self.include.path)
 
 
 BUILTIN_NAME_BLOCK_MAP: dict[str, Type[Block]] = {
@@ -340,13 +390,30 @@ BUILTIN_NAME_BLOCK_MAP: dict[str, Type[Block]] = {
     'ULBlock': ULBlock,
     'PlainText': PlainText,
     'PictureImportation': PictureImportation,
+    'IncludeBlock': IncludeBlock,
 }
 
+
+def _skip_empty_sentences(tokenizer) -> None:
+    tokenizer.run(EmptySentence.code)
+
+
+# parse of the component started by each built-in sentence type, indexed by its code
+BUILTIN_CODE_PARSE_TABLE: list[Callable | None] = [None] * len(BUILTIN_SENTENCES)
+BUILTIN_CODE_PARSE_TABLE[Title.code] = TitleBlock.parse
+BUILTIN_CODE_PARSE_TABLE[Text.code] = PlainText.parse
+BUILTIN_CODE_PARSE_TABLE[EmptySentence.code] = _skip_empty_sentences
+BUILTIN_CODE_PARSE_TABLE[UnorderedList.code] = ULBlock.parse
+BUILTIN_CODE_PARSE_TABLE[OrderedList.code] = OLBlock.parse
+BUILTIN_CODE_PARSE_TABLE[Picture.code] = PictureImportation.parse
+BUILTIN_CODE_PARSE_TABLE[Include.code] = IncludeBlock.parse
+
 BUILTIN_PREFIX_BLOCK_MAP: dict[type, Type[Component]] = {
     Title: TitleBlock,
     OrderedList: OLBlock,
     UnorderedList: ULBlock,
     Text: PlainText,
     Picture: PictureImportation,
+    Include: IncludeBlock,
     EmptySentence: None
 }
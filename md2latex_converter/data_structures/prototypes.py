@@ -1,13 +1,37 @@
+import re
+from typing import Callable
+
+
 class Sentence:
+    """
+    A classified line of the source.
+
+    Sentences are the most numerous objects of a conversion, so they are slotted and keep
+    only their line number and a reference to the line. The identifier, and the integer
+    code the parser dispatches on, are shared by the class. The parts of the line a
+    subclass exposes, e.g. the name of a title, are kept from the groups matched by the
+    lexer, see `from_match`.
+    """
+
+    __slots__ = ('line', 'content')
+
     line: int
-    identifier: str
+    identifier: str = 'Sentence'
+    code: int = -1
     content: str
 
-    def __init__(self, index: int, identifier: str, content: str):
+    def __init__(self, index: int, content: str):
         self.line = index + 1
-        self.identifier = identifier
         self.content = content
 
+    @classmethod
+    def from_match(cls, index: int, match: re.Match) -> 'Sentence':
+        """
+        Build the sentence from the match object produced by the lexer, so that
+        constructors do not need to match the same line once again.
+        """
+        return cls(index, match.string)
+
     def __str__(self):
         return f'@ line {self.line:<4} {self.identifier:<20} -- {self.content}'
 
@@ -17,8 +41,20 @@ class Block:
     def parse(tokenizer):
         pass
 
+    def emit(self, emit_line: Callable[[int, str], None]) -> None:
+        """
+        Push the LaTeX lines of the block into `emit_line`, one (indent, line) at a time.
+        Every block that is rendered overrides this.
+        """
+        assert False, f'{type(self).__name__} does not render to LaTeX'
+
     def toLaTeX(self) -> list[tuple[int, str]]:
-        pass
+        """
+        The LaTeX lines pushed by `emit`, collected into a list.
+        """
+        ret: list[tuple[int, str]] = []
+        self.emit(lambda indent, line: ret.append((indent, line)))
+        return ret
 
     def __str__(self):
         return ''.join([('\t' * _[0] + _[1] + '\n') for _ in self.toLaTeX()])
@@ -1,5 +1,110 @@
-EXTENDED_PREFIX_BLOCK_MAP = dict()
-EXTENDED_NAME_BLOCK_MAP = dict()
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+
+class Registry:
+    """
+    The sentence and block extensions registered for a converter, with what is derived
+    from them, e.g. the line scanner of `sentence_parser`.
+
+    The maps below stand for the registry active in the current thread or task, see
+    `activate`, the process-wide `DEFAULT_REGISTRY` unless another one is activated.
+    """
+
+    def __init__(self):
+        self.prefix_block_map: dict = dict()
+        self.name_block_map: dict = dict()
+        self.name_sentence_map: dict = dict()
+        self.regex_sentence_map: dict = dict()
+        # (regex_sentence_map items, scanner) of the last scan, see `sentence_parser._get_scanner`
+        self.scanner_cache: tuple | None = None
+
+    @contextmanager
+    def activate(self) -> Iterator['Registry']:
+        """
+        Make this registry the one registered into and converted with, in the current
+        thread or task, until the end of the block.
+        """
+        token = _active_registry.set(self)
+        try:
+            yield self
+        finally:
+            _active_registry.reset(token)
+
+
+DEFAULT_REGISTRY = Registry()
+_active_registry: ContextVar[Registry] = ContextVar('m2l_registry', default=DEFAULT_REGISTRY)
+
+
+def active() -> Registry:
+    return _active_registry.get()
+
+
+class _ActiveMap(MutableMapping):
+    """
+    One of the maps of the active `Registry`.
+    """
+
+    __slots__ = ('_attribute',)
+
+    def __init__(self, attribute: str):
+        self._attribute = attribute
+
+    def _map(self) -> dict:
+        return getattr(_active_registry.get(), self._attribute)
+
+    def __getitem__(self, key):
+        return self._map()[key]
+
+    def __setitem__(self, key, value):
+        self._map()[key] = value
+
+    def __delitem__(self, key):
+        del self._map()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._map()
+
+    def __iter__(self):
+        return iter(self._map())
+
+    def __len__(self) -> int:
+        return len(self._map())
+
+    def get(self, key, default=None):
+        return self._map().get(key, default)
+
+    def keys(self):
+        return self._map().keys()
+
+    def values(self):
+        return self._map().values()
+
+    def items(self):
+        return self._map().items()
+
+    def clear(self):
+        self._map().clear()
+
+    def __repr__(self) -> str:
+        return repr(self._map())
+
+
+EXTENDED_PREFIX_BLOCK_MAP = _ActiveMap('prefix_block_map')
+EXTENDED_NAME_BLOCK_MAP = _ActiveMap('name_block_map')
+
+EXTENDED_NAME_SENTENCE_MAP = _ActiveMap('name_sentence_map')
+EXTENDED_REGEX_SENTENCE_MAP = _ActiveMap('regex_sentence_map')
+
+
+def clear():
+    """
+    Forget every sentence and block extension registered, so that they can be registered again.
+    """
+    EXTENDED_PREFIX_BLOCK_MAP.clear()
+    EXTENDED_NAME_BLOCK_MAP.clear()
+    EXTENDED_NAME_SENTENCE_MAP.clear()
+    EXTENDED_REGEX_SENTENCE_MAP.clear()
 
-EXTENDED_NAME_SENTENCE_MAP = dict()
-EXTENDED_REGEX_SENTENCE_MAP = dict()
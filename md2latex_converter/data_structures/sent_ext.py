@@ -5,6 +5,25 @@ from md2latex_converter.data_structures.runtime_maps import EXTENDED_NAME_SENTEN
 from md2latex_converter.data_structures.sentences import BUILTIN_SENTENCES
 
 
+class _LazyPattern:
+    """
+    The compiled regex of an extended sentence type. A regex registered from JSON is
+    compiled there to be checked, and that pattern is kept. One registered from a bundle
+    (see `ext_bundle`) was checked when the bundle was written, and is compiled the first
+    time it is used, so that a large extension library does not compile patterns no line
+    needs.
+    """
+
+    def __init__(self, regex: str, pattern: re.Pattern | None = None):
+        self.regex = regex
+        self._pattern = pattern
+
+    def __get__(self, instance, owner) -> re.Pattern:
+        if self._pattern is None:
+            self._pattern = re.compile(self.regex)
+        return self._pattern
+
+
 class SentExt:
     """
     sentence extension, to allow DIY sentence types.
@@ -32,7 +51,7 @@ class SentExt:
 
     If regex matches, construction method will be invoked.
 
-    The parts to be recorded in the sentence will be recorded into recorded_dict
+    The parts to be recorded in the sentence are found in recorded_dict when it is asked for
 
     ----
 
@@ -42,61 +61,97 @@ class SentExt:
     The call of SentExt('FOO', r'```(?P<lang>.*)') **on** runtime is equal to declare as follows **before** runtime:
 
         class FOO(Sentence):
-            def __init__(self, line, content):
-                match = re.match(r'```(?P<lang>.*)')
+            identifier = 'FOO'
 
-                super().__init__(line, 'FOO', content)
+            def __init__(self, line, content):
+                assert re.match(r'```(?P<lang>.*)', content) is not None
 
-                self.recorded_dict = dict()
+                super().__init__(line, content)
 
-                self.recorded_dict['lang'] = match.groupdict()['lang']
+            @property
+            def recorded_dict(self):
+                return re.match(r'```(?P<lang>.*)', self.content).groupdict()
     """
 
     identifier: str
     regex: str
+    code: int
     generated_type: type
 
-    def __init__(self, name: str, regex: str):
+    def __init__(self, name: str, regex: str, pattern: re.Pattern | None = None):
         assert name not in BUILTIN_SENTENCES, f'Name {name} is already used!'
         assert name not in EXTENDED_NAME_SENTENCE_MAP, f'Name {name} is already used!'
+        assert regex not in EXTENDED_REGEX_SENTENCE_MAP, \
+            f'Regex {regex} is already used by {EXTENDED_REGEX_SENTENCE_MAP.get(regex, Sentence).identifier}!'
 
         self.identifier = name
         self.regex = regex
-        self.pattern = re.compile(regex)
-        self.recorded_names = list(self.pattern.groupindex.keys())
+        self.code = len(BUILTIN_SENTENCES) + len(EXTENDED_NAME_SENTENCE_MAP)
+        lazy_pattern = _LazyPattern(regex, pattern)
 
         class SentExtInstance(Sentence):
-            recoded_dict: dict[str, str]
+            __slots__ = ()
+
+            identifier = name
+            code = self.code
             _name = name
-            _recoded_names = self.recorded_names
+            regex = self.regex
+            pattern = lazy_pattern
 
-            def __init__(self, line, content):
-                assert (match := re.match(regex, content)) is not None, f'Extended sentence does not match! {name}'
-                super().__init__(line, name, content)
-                self.recoded_dict = match.groupdict()
+            def __init__(self, line, content, match: re.Match | None = None):
+                if match is None:
+                    match = SentExtInstance.pattern.match(content)
+                assert match is not None, f'Extended sentence does not match! {name}'
+                super().__init__(line, content)
+
+            @classmethod
+            def from_match(cls, index: int, match: re.Match) -> 'SentExtInstance':
+                return cls(index, match.string, match)
+
+            @property
+            def recoded_dict(self) -> dict[str, str]:
+                return SentExtInstance.pattern.match(self.content).groupdict()
 
         self.generated_type = SentExtInstance
 
         EXTENDED_NAME_SENTENCE_MAP[name] = SentExtInstance
         EXTENDED_REGEX_SENTENCE_MAP[regex] = SentExtInstance
 
+    @property
+    def pattern(self) -> re.Pattern:
+        return self.generated_type.pattern
+
+    @property
+    def recorded_names(self) -> list[str]:
+        return list(self.pattern.groupindex.keys())
+
     def __str__(self):
         return f'{self.identifier}: <{self.regex}>'
 
 
-def register(json_obj: list):
+def register(json_obj: list, validated: bool = False):
+    """
+    Register the sentence extensions of `json_obj`. Each regex is compiled once here to be
+    checked, unless the extensions are `validated` already, e.g. loaded from a bundle (see
+    `ext_bundle`), in which case regexes are compiled only when first used.
+    """
     _r = []
     for _ in json_obj:
+        if validated:
+            name, regex = next(iter(_.items()))
+            _r.append(SentExt(name, regex))
+            continue
+
         assert isinstance(_, dict) and len(_) == 1, f'Wrong json format! {_}'
         name = list(_)[0]
         regex = _[name]
         assert isinstance(name, str), f'Wrong json format! {_}'
         assert isinstance(regex, str), f'Wrong json format! {_}'
         try:
-            re.compile(regex)
+            pattern = re.compile(regex)
         except re.error:
             assert False, f'Wrong regex! {regex}'
 
-        _r.append(SentExt(name, regex))
+        _r.append(SentExt(name, regex, pattern))
 
     return _r
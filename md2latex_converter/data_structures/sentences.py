@@ -4,81 +4,191 @@ from md2latex_converter.data_structures.prototypes import Sentence
 
 
 class Title(Sentence):
-    title_name: str
+    """
+    A title line. Its parts are kept from the match of the lexer.
+    """
+
+    __slots__ = ('hierarchy', 'title_name')
+
     hierarchy: int
+    title_name: str
 
-    def __init__(self, line: int, content: str):
-        super().__init__(line, 'Title', content)
-        self.hierarchy = len(re.match(r'(#+)', content).group())
-        self.title_name = re.match(r'#+\s*(.*)$', content).group(1)
+    identifier = 'Title'
+    code = 0
+    regex = r'(?P<title_hashes>#+)\s*(?P<title_name>.*)$'
+    pattern = re.compile(regex)
+
+    def __init__(self, line: int, content: str, match: re.Match | None = None):
+        super().__init__(line, content)
+        match = match or Title.pattern.match(content)
+        self.hierarchy = len(match.group('title_hashes'))
+        self.title_name = match.group('title_name')
+
+    @classmethod
+    def from_match(cls, index: int, match: re.Match) -> 'Title':
+        return cls(index, match.string, match)
 
 
 class Text(Sentence):
+    __slots__ = ()
+
+    identifier = 'Text'
+    code = 1
+    regex = r'.*$'
+
     def __init__(self, line: int, content: str):
-        super().__init__(line, 'Text', content)
+        super().__init__(line, content)
 
 
 class EmptySentence(Sentence):
+    """
+    A blank line, or a run of blank lines, at the line of the first one.
+    """
+
+    __slots__ = ()
+
+    identifier = 'EmptySentence'
+    code = 2
+    regex = r'\s*$'
+
     def __init__(self, line: int):
-        super().__init__(line, 'EmptySentence', ' ')
+        super().__init__(line, ' ')
+
+    @classmethod
+    def from_match(cls, index: int, match: re.Match) -> 'EmptySentence':
+        return cls(index)
 
 
 class UnorderedList(Sentence):
-    main_content: str
+    """
+    An unordered list item. Its parts are kept from the match of the lexer.
+    """
+
+    __slots__ = ('whitespace_span', 'main_content')
+
     whitespace_span: int
+    main_content: str
 
-    def __init__(self, line: int, content: str):
-        super().__init__(line, 'UnorderedList', content)
-        match = re.match(r'(\s*)[*-]\s+(.*)', content)
+    identifier = 'UnorderedList'
+    code = 3
+    regex = r'(?P<ul_whitespace>\s*)[*-]\s+(?P<ul_content>.*)$'
+    pattern = re.compile(regex)
 
-        whitespace: str = match.group(1)
-        whitespace_span: int = 0
-        for _ in whitespace:
-            whitespace_span += 4 if _ == '\t' else 1
+    def __init__(self, line: int, content: str, match: re.Match | None = None):
+        super().__init__(line, content)
+        match = match or UnorderedList.pattern.match(content)
+        whitespace = match.group('ul_whitespace')
+        self.whitespace_span = len(whitespace) + 3 * whitespace.count('\t')
+        self.main_content = match.group('ul_content')
 
-        self.whitespace_span = whitespace_span
-        self.main_content = match.group(2)
+    @classmethod
+    def from_match(cls, index: int, match: re.Match) -> 'UnorderedList':
+        return cls(index, match.string, match)
 
 
 class OrderedList(Sentence):
+    """
+    An ordered list item. Its parts are kept from the match of the lexer.
+    """
+
+    __slots__ = ('whitespace_span', 'main_content')
+
     whitespace_span: int
     main_content: str
 
-    def __init__(self, line: int, content: str):
-        super().__init__(line, 'OrderedList', content)
-        match = re.match(r'(\s*)\d+\.\s+(.*)', content)
+    identifier = 'OrderedList'
+    code = 4
+    regex = r'(?P<ol_whitespace>\s*)\d+\.\s+(?P<ol_content>.*)$'
+    pattern = re.compile(regex)
 
-        whitespace = match.group(1)
-        whitespace_span = 0
-        for _ in whitespace:
-            whitespace_span += 4 if _ == '\t' else 1
+    def __init__(self, line: int, content: str, match: re.Match | None = None):
+        super().__init__(line, content)
+        match = match or OrderedList.pattern.match(content)
+        whitespace = match.group('ol_whitespace')
+        self.whitespace_span = len(whitespace) + 3 * whitespace.count('\t')
+        self.main_content = match.group('ol_content')
 
-        self.whitespace_span = whitespace_span
-        self.main_content = match.group(2)
+    @classmethod
+    def from_match(cls, index: int, match: re.Match) -> 'OrderedList':
+        return cls(index, match.string, match)
 
 
 class Eof(Sentence):
+    __slots__ = ()
+
+    identifier = 'EOF'
+    code = 5
+    regex = r'\x00$'
+
     def __init__(self, line):
-        super().__init__(line, 'EOF', '\\0')
+        super().__init__(line, '\\0')
+
+    @classmethod
+    def from_match(cls, index: int, match: re.Match) -> 'Eof':
+        return cls(index)
 
 
 class Picture(Sentence):
-    path_to_pic: str
+    """
+    A picture line. Its parts are kept from the match of the lexer.
+    """
+
+    __slots__ = ('alt_text', 'path_to_pic')
+
     alt_text: str
+    path_to_pic: str
+
+    identifier = 'Picture'
+    code = 6
+    # a picture is identified by r'!\[(.*)]\((.+)\)', while alt text and path are recorded
+    # with the looser r'!\[(.*)]\((.*)\)', hence the lookahead.
+    regex = r'(?=!\[(?P<alt_text>.*)]\((?P<path_to_pic>.*)\))!\[.*]\(.+\)'
+    pattern = re.compile(regex)
+
+    def __init__(self, line, content, match: re.Match | None = None):
+        super().__init__(line, content)
+        match = match or Picture.pattern.match(content)
+        self.alt_text = match.group('alt_text')
+        self.path_to_pic = match.group('path_to_pic')
+
+    @classmethod
+    def from_match(cls, index: int, match: re.Match) -> 'Picture':
+        return cls(index, match.string, match)
+
+
+class Include(Sentence):
+    """
+    A line including another markdown file, e.g. '!include chapters/intro.md', whose path
+    is relative to the directory of the including file. The path is kept from the match
+    of the lexer.
+    """
+
+    __slots__ = ('path',)
+
+    path: str
+
+    identifier = 'Include'
+    code = 7
+    regex = r'!include\s+(?P<include_path>\S.*?)\s*$'
+    pattern = re.compile(regex)
+
+    def __init__(self, line, content, match: re.Match | None = None):
+        super().__init__(line, content)
+        self.path = (match or Include.pattern.match(content)).group('include_path')
 
-    def __init__(self, line, content):
-        super().__init__(line, 'Picture', content)
-        match = re.match('!\[(.*)]\((.*)\)', content)
-        self.alt_text = match.group(1)
-        self.path_to_pic = match.group(2)
+    @classmethod
+    def from_match(cls, index: int, match: re.Match) -> 'Include':
+        return cls(index, match.string, match)
 
 
-BUILTIN_SENTENCES = ['Title', 'Text', 'EmptySentence', 'UnorderedList', 'OrderedList', 'EOF', 'Picture']
+# in the order of their codes
+BUILTIN_SENTENCES = ['Title', 'Text', 'EmptySentence', 'UnorderedList', 'OrderedList', 'EOF', 'Picture', 'Include']
 BUILTIN_SENTENCES_MAP = {
     'Title': Title,
     'Text': Text,
     'EmptySentence': EmptySentence,
     'UnorderedList': UnorderedList,
     'OrderedList': OrderedList,
-    'EOF': Eof
+    'EOF': Eof,
+    'Include': Include
 }
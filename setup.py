@@ -21,7 +21,7 @@ setuptools.setup(
     author="TrickEye",
     author_email="TrickEye@buaa.edu.cn",
     description="A md-to-LaTeX converter",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks", "benchmarks.*"]),
     entry_points={
         'console_scripts': ['m2l = md2latex_converter.__main__:main', ]
     },
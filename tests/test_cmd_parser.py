@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from md2latex_converter.core.cmd_parser import _parse_command
+
+
+@pytest.fixture
+def in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_existing_file_with_wildcards_is_a_file_name(in_tmp_path):
+    (in_tmp_path / 'notes[1].md').write_text('# Notes\n\nhi\n', encoding='utf-8')
+    cmd = _parse_command(['m2l', 'notes[1].md'])
+    assert cmd.batch_jobs is None and cmd.input_filename == 'notes[1].md'
+
+    cmd.handler()
+    assert os.path.isfile(in_tmp_path / 'notes[1].tex')
+
+
+def test_pattern_matching_nothing_fails(in_tmp_path):
+    (in_tmp_path / 'a.md').write_text('a\n', encoding='utf-8')
+    with pytest.raises(AssertionError, match='no file matches'):
+        _parse_command(['m2l', 'b*.md'])
+    with pytest.raises(AssertionError, match='no file matches'):
+        _parse_command(['m2l', 'a.md', 'b*.md'])
+
+
+def test_directory_without_markdown_fails(in_tmp_path):
+    os.mkdir(in_tmp_path / 'empty')
+    with pytest.raises(AssertionError, match='no markdown file found'):
+        _parse_command(['m2l', 'empty'])
+
+
+def test_patterns_and_directories_expand(in_tmp_path):
+    os.mkdir(in_tmp_path / 'docs')
+    for _ in ['a.md', 'b.md', 'docs/c.md']:
+        (in_tmp_path / _).write_text('x\n', encoding='utf-8')
+    cmd = _parse_command(['m2l', '*.md', 'docs', 'a.md'])
+    assert [_[0] for _ in cmd.batch_jobs] == ['a.md', 'b.md', os.path.join('docs', 'c.md')]
+
+
+def test_serve_on_a_port_needs_allow_tcp():
+    with pytest.raises(AssertionError, match='--allow-tcp'):
+        _parse_command(['m2l', 'serve', '--port', '8765'])
+    assert _parse_command(['m2l', 'serve', '--port', '8765', '--allow-tcp']).port == 8765
+    with pytest.raises(AssertionError, match='--allow-tcp is for'):
+        _parse_command(['m2l', 'serve', '--allow-tcp'])
@@ -0,0 +1,42 @@
+import os
+import pickle
+
+from md2latex_converter.converter import Converter
+from md2latex_converter.core import ext_bundle
+from md2latex_converter.data_structures.runtime_maps import Registry
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTS)
+SENT_EXT = os.path.join(ROOT, 'sentence_extensions.json')
+BLK_EXT = os.path.join(ROOT, 'block_extensions.json')
+MARKDOWN = '# Title\n\n---\n\n$$\nE = mc^2\n$$\n'
+
+
+def test_conversions_only_read_bundles(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    converter = Converter.from_files(SENT_EXT, BLK_EXT)
+    assert not os.path.exists(tmp_path / 'm2l')
+
+    with Registry().activate():
+        filename = ext_bundle.compile_files(SENT_EXT, BLK_EXT)
+    assert os.listdir(tmp_path / 'm2l') == [os.path.basename(filename)]
+    with Registry().activate():
+        assert ext_bundle.register_files(SENT_EXT, BLK_EXT)
+
+    bundled = Converter.from_files(SENT_EXT, BLK_EXT)
+    assert bundled.convert(MARKDOWN, record_command=False) == converter.convert(MARKDOWN, record_command=False)
+    assert pickle.loads(pickle.dumps(bundled)).convert(MARKDOWN, record_command=False) == \
+        converter.convert(MARKDOWN, record_command=False)
+
+
+def test_bundle_of_changed_files_is_not_used(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    sent_ext = tmp_path / 'sent_ext.json'
+    sent_ext.write_text('[{"Line": "---"}]', encoding='utf-8')
+    with Registry().activate():
+        ext_bundle.compile_files(str(sent_ext), '')
+
+    sent_ext.write_text('[{"Star": "\\\\*\\\\*\\\\*"}]', encoding='utf-8')
+    with Registry().activate() as registry:
+        assert not ext_bundle.register_files(str(sent_ext), '')
+        assert list(registry.name_sentence_map) == ['Star']
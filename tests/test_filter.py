@@ -0,0 +1,52 @@
+import io
+import json
+import os
+import sqlite3
+
+from md2latex_converter.core.filter_handler import filter_handler_generator
+from md2latex_converter.core.render_cache import RenderCache
+
+
+def _rows(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with sqlite3.connect(path) as connection:
+        tables = connection.execute("SELECT name FROM sqlite_master WHERE name = 'blocks'").fetchall()
+        return connection.execute('SELECT COUNT(*) FROM blocks').fetchone()[0] if tables else 0
+
+
+def test_json_records():
+    source = io.BytesIO(b'{"id": 1, "markdown": "# A\\n\\nx\\n"}\n\n{"id": 2}\n')
+    target = io.BytesIO()
+    filter_handler_generator(lambda: None, record_command=False, source=source, target=target)()
+    first, second = [json.loads(_) for _ in target.getvalue().splitlines()]
+    assert first['id'] == 1 and '\\title{A}' in first['latex'] and first['error'] is None
+    assert second['latex'] is None and second['error'].startswith('AssertionError')
+
+
+def test_nul_records():
+    source = io.BytesIO(b'# A\n\nx\n\0# B\n\ny\n')
+    target = io.BytesIO()
+    filter_handler_generator(lambda: None, nul=True, record_command=False, source=source, target=target)()
+    first, second, rest = target.getvalue().split(b'\0')
+    assert b'\\title{A}' in first and b'\\title{B}' in second and rest == b''
+
+
+def test_render_cache_written_while_streaming(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    render_cache = RenderCache(path)
+    seen = []
+
+    def _records():
+        for index in range(600):
+            if index in [100, 300]:
+                seen.append((_rows(path), render_cache.pending_bytes))
+            yield json.dumps({'id': index, 'markdown': f'# T{index}\n\nline {index}\n'}).encode('utf-8') + b'\n'
+
+    target = io.BytesIO()
+    filter_handler_generator(lambda: None, render_cache, source=_records(), target=target)()
+    assert len(target.getvalue().splitlines()) == 600
+    # nothing is written before the first flush, and what was written is no longer kept
+    assert seen[0][0] == 0 and seen[0][1] > 0
+    assert seen[1][0] > 0 and seen[1][1] < seen[0][1] * 2
+    assert _rows(path) == 1200
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from md2latex_converter.converter import Converter
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+GOLDEN = os.path.join(TESTS, 'golden')
+ROOT = os.path.dirname(TESTS)
+
+# every *.md under golden/, with its LaTeX as converted by m2l before the rendering was reworked,
+# without the extensions (*.plain.tex) and with those of the repository (*.ext.tex), the header left out
+DOCUMENTS = sorted([_.removesuffix('.md') for _ in os.listdir(GOLDEN) if _.endswith('.md')])
+
+
+def _converted(converter: Converter, document: str) -> str:
+    with open(os.path.join(GOLDEN, document + '.md'), 'r', encoding='utf-8') as f:
+        latex = converter.convert(f.read(), record_command=False)
+    return latex.split('\n', 1)[1]
+
+
+def _expected(document: str, kind: str) -> str:
+    with open(os.path.join(GOLDEN, f'{document}.{kind}.tex'), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_without_extensions(document):
+    assert _converted(Converter(), document) == _expected(document, 'plain')
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_with_extensions(document):
+    converter = Converter.from_files(os.path.join(ROOT, 'sentence_extensions.json'),
+                                     os.path.join(ROOT, 'block_extensions.json'))
+    assert _converted(converter, document) == _expected(document, 'ext')
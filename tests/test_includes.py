@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from md2latex_converter.core import includes
+from md2latex_converter.core.includes import IncludeGraph, depfile
+from md2latex_converter.core.workflow import EOF_SENTINEL, convert_lines
+
+
+def _write(path, text: str) -> str:
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def _convert(filename: str, include_graph: IncludeGraph) -> str:
+    with open(filename, 'r', encoding='utf-8') as f:
+        lines = (f.read() + EOF_SENTINEL).split('\n')
+    return convert_lines(lines, record_command=False, include_graph=include_graph)
+
+
+def test_includes_are_spliced(tmp_path):
+    os.mkdir(tmp_path / 'parts')
+    _write(tmp_path / 'parts' / 'b.md', '## B\n\nfrom b\n\n!include c.md\n')
+    _write(tmp_path / 'parts' / 'c.md', 'from c\n')
+    a = _write(tmp_path / 'a.md', '# A\n\n!include parts/b.md\n\nfrom a\n')
+
+    graph = IncludeGraph(a)
+    latex = _convert(a, graph)
+    assert latex.index('from b') < latex.index('from c') < latex.index('from a')
+    assert graph.inputs == [str(tmp_path / 'parts' / 'b.md'), str(tmp_path / 'parts' / 'c.md')]
+
+
+def test_direct_cycle(tmp_path):
+    a = _write(tmp_path / 'a.md', 'from a\n\n!include a.md\n')
+    with pytest.raises(AssertionError) as e:
+        _convert(a, IncludeGraph(a))
+    assert str(e.value) == f'include cycle, {a} -> {a}'
+
+
+def test_indirect_cycle(tmp_path):
+    a = _write(tmp_path / 'a.md', 'from a\n\n!include b.md\n')
+    b = _write(tmp_path / 'b.md', 'from b\n\n!include a.md\n')
+    with pytest.raises(AssertionError) as e:
+        _convert(a, IncludeGraph(a))
+    assert str(e.value) == f'include cycle, {a} -> {b} -> {a}'
+
+
+def test_missing_include(tmp_path):
+    a = _write(tmp_path / 'a.md', 'from a\n\n!include b.md\n')
+    with pytest.raises(AssertionError) as e:
+        _convert(a, IncludeGraph(a))
+    assert str(e.value) == f'{tmp_path / "b.md"} not found, included in line 3 of {a}'
+
+
+def test_fragment_rendered_again_only_once_changed(tmp_path, monkeypatch):
+    rendered = []
+
+    def _render_fragment(filename, text, render_cache=None):
+        rendered.append(os.path.basename(filename))
+        return render_fragment(filename, text, render_cache)
+
+    render_fragment = includes.render_fragment
+    monkeypatch.setattr(includes, 'render_fragment', _render_fragment)
+    _write(tmp_path / 'b.md', 'from b\n')
+    _write(tmp_path / 'c.md', 'from c\n')
+    a = _write(tmp_path / 'a.md', '!include b.md\n\n!include c.md\n')
+
+    graph = IncludeGraph(a)
+    _convert(a, graph)
+    assert sorted(rendered) == ['b.md', 'c.md']
+    _convert(a, graph)
+    assert sorted(rendered) == ['b.md', 'c.md']
+
+    _write(tmp_path / 'c.md', 'from c, edited\n')
+    assert 'from c, edited' in _convert(a, graph)
+    assert sorted(rendered) == ['b.md', 'c.md', 'c.md']
+
+
+def test_depfile_escapes_make_characters():
+    assert depfile('out dir/a.tex', ['my notes/b.md', 'c#1.md', 'price$.md', 'd.md']) == \
+        'out\\ dir/a.tex: my\\ notes/b.md c\\#1.md price$$.md d.md\n'
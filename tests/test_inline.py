@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from md2latex_converter.core import inline
+
+# pieces the strings of the fuzzer are made of, delimiters, links and what looks like them
+PIECES = ['\n', '](', '_', '__', '*', '**', '`', '[', ']', '(', ')', 'a', 'b', ' ', '[t](u)', '[](x)', '![a](b)',
+          '\\', '_*', '**_', '中']
+
+
+def _strings(seed: int, count: int) -> list[str]:
+    rng = random.Random(seed)
+    # strings are drawn twice, so that the memos give back what they remembered
+    strings = [''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 14))) for _ in range(count)]
+    return strings + strings
+
+
+def _outcome(function, content: str) -> str:
+    try:
+        return function(content)
+    except Exception as e:
+        return type(e).__name__
+
+
+@pytest.fixture(autouse=True)
+def _default_memo():
+    yield
+    inline.configure_memo()
+    inline.clear_memo()
+
+
+@pytest.mark.parametrize('size', [inline.DEFAULT_MEMO_SIZE, 16, 0])
+def test_texify_is_render(size):
+    inline.configure_memo(size)
+    for _ in _strings(size, 20000):
+        assert _outcome(inline.texify, _) == _outcome(inline.render, _), repr(_)
+
+
+def test_texify_per_document_is_render():
+    inline.configure_memo(per_document=True)
+    strings = _strings(1, 20000)
+    for document in [strings[:100], strings[100:20000], strings[20000:]]:
+        with inline.document_memo():
+            for _ in document:
+                assert _outcome(inline.texify, _) == _outcome(inline.render, _), repr(_)
+
+
+def test_render():
+    # as m2l always rendered them, quirks included: either bold delimiter closes a bold text
+    assert inline.render('a __b__ _c_ `d` [e](f)') == 'a \\textbf{b} \\textit{c} \\texttt{d} \\href{f}{e}'
+    assert inline.render('**a__b** c_d') == '\\textbf{a}b** c_d'
+    assert inline.render('[x](y) and [z]') == '\\href{y}{x} and [z]'
+    assert inline.render('[a\n](b)') == '[a\n](b)'
+    with pytest.raises(IndexError):
+        # a line ending with a bold text closed by '__' always failed
+        inline.render('a __b__')
@@ -0,0 +1,136 @@
+import random
+
+import pytest
+
+from md2latex_converter.converter import Converter
+from md2latex_converter.core.inline import texify
+from md2latex_converter.data_structures.blocks import OLBlock, ULBlock
+from md2latex_converter.data_structures.sentences import OrderedList, Text, UnorderedList
+
+
+def _nested_by_index(listitems, emit_line, environment: str) -> None:
+    """
+    How lists of a single kind were always nested, by the index of the indent of each item
+    among the sorted indents of the list, kept to check `ListBlock.tree` against.
+    """
+    indent = 0
+    spans = sorted(set([_[0].whitespace_span for _ in listitems]))
+    hierarchies = [spans.index(_[0].whitespace_span) for _ in listitems]
+    emit_line(0, '\\begin{%s}' % environment)
+    current = [0]
+    for _ in range(len(listitems)):
+        text = texify(' '.join([listitems[_][0].main_content.strip(), *[k.content.strip() for k in listitems[_][1]]]))
+        if current[-1] == hierarchies[_]:
+            emit_line(indent + 1, '\\item ' + text)
+        elif current[-1] < hierarchies[_]:
+            emit_line(indent + 1, '\\begin{%s}' % environment)
+            indent += 1
+            emit_line(indent + 1, '\\item ' + text)
+            current.append(hierarchies[_])
+        else:
+            while current[-1] > hierarchies[_]:
+                current.pop()
+                emit_line(indent, '\\end{%s}' % environment)
+                indent -= 1
+            emit_line(indent + 1, '\\item ' + text)
+    while current[-1] > 0:
+        current.pop()
+        emit_line(indent, '\\end{%s}' % environment)
+        indent -= 1
+    emit_line(0, '\\end{%s}' % environment)
+
+
+def _body(markdown: str) -> list[str]:
+    lines = Converter().convert(markdown, record_command=False).split('\n')
+    return lines[lines.index('\t\\maketitle') + 1:lines.index('\\end{document}')]
+
+
+@pytest.mark.parametrize('sentence_type, block_type, environment', [
+    (UnorderedList, ULBlock, 'itemize'),
+    (OrderedList, OLBlock, 'enumerate'),
+])
+def test_single_kind_nested_by_index(sentence_type, block_type, environment):
+    rng = random.Random(environment)
+    for _ in range(3000):
+        spans = rng.sample(range(0, 12), rng.randint(1, 5))
+        listitems = []
+        for index in range(rng.randint(1, 12)):
+            marker = '-' if sentence_type is UnorderedList else f'{index}.'
+            line = ' ' * rng.choice(spans) + marker + ' w' + str(index) + rng.choice(['', ' **b**', ' a_b'])
+            listitems.append((sentence_type(index, line),
+                              [Text(index, rng.choice(['t', ' u_'])) for _ in range(rng.randint(0, 2))]))
+        expected, emitted = [], []
+        _nested_by_index(listitems, lambda *_: expected.append(_), environment)
+        block_type(listitems).emit(lambda *_: emitted.append(_))
+        assert emitted == expected
+
+
+def test_deeper_item_opens_one_environment():
+    # b is two levels deeper than a, yet in a single environment
+    assert _body('- a\n    - b\n  - c\n') == [
+        '\t\\begin{itemize}',
+        '\t\t\\item a',
+        '\t\t\\begin{itemize}',
+        '\t\t\t\\item b',
+        '\t\t\\end{itemize}',
+        '\t\t\\item c',
+        '\t\\end{itemize}',
+        '\t',
+    ]
+
+
+def test_shallower_item_stays_where_it_returns():
+    # c, between a and b, goes back in the environment of a, and d, as deep as c, is deeper than that one
+    assert _body('1. a\n    2. b\n  3. c\n  4. d\n') == [
+        '\t\\begin{enumerate}',
+        '\t\t\\item a',
+        '\t\t\\begin{enumerate}',
+        '\t\t\t\\item b',
+        '\t\t\\end{enumerate}',
+        '\t\t\\item c',
+        '\t\t\\begin{enumerate}',
+        '\t\t\t\\item d',
+        '\t\t\\end{enumerate}',
+        '\t\\end{enumerate}',
+        '\t',
+    ]
+
+
+def test_mixed_kinds_nest():
+    # used to fail with "missing EmptySentence", a list being of a single kind
+    assert _body('- a\n  1. b\n  2. c\n- d\n\n1. x\n  - y\n2. z\n') == [
+        '\t\\begin{itemize}',
+        '\t\t\\item a',
+        '\t\t\\begin{enumerate}',
+        '\t\t\t\\item b',
+        '\t\t\t\\item c',
+        '\t\t\\end{enumerate}',
+        '\t\t\\item d',
+        '\t\\end{itemize}',
+        '\t',
+        '\t\\begin{enumerate}',
+        '\t\t\\item x',
+        '\t\t\\begin{itemize}',
+        '\t\t\t\\item y',
+        '\t\t\\end{itemize}',
+        '\t\t\\item z',
+        '\t\\end{enumerate}',
+        '\t',
+    ]
+
+
+def test_mixed_kinds_side_by_side():
+    # an item of the other kind at the same level ends the environment, and starts its own
+    assert _body('- a\n- b\n1. c\n  - d\n') == [
+        '\t\\begin{itemize}',
+        '\t\t\\item a',
+        '\t\t\\item b',
+        '\t\\end{itemize}',
+        '\t\\begin{enumerate}',
+        '\t\t\\item c',
+        '\t\t\\begin{itemize}',
+        '\t\t\t\\item d',
+        '\t\t\\end{itemize}',
+        '\t\\end{enumerate}',
+        '\t',
+    ]
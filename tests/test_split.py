@@ -0,0 +1,31 @@
+import os
+
+from md2latex_converter.core.split_handler import section_names, sections_directory, split_handler_generator
+
+
+def test_section_names_keep_real_slugs():
+    names = section_names(['S1', 'S1', 'S1 2'])
+    assert names[0] == 's1' and names[2] == 's1-2'
+    assert names[1].startswith('s1-') and names[1] not in ['s1', 's1-2']
+    # a name depends on its section, not on where it is
+    assert section_names(['S1 2', 'S1', 'S1']) == [names[2], names[0], names[1]]
+
+
+def test_section_names_are_unique():
+    titles = ['Intro', 'intro', 'Intro', '介绍', '介绍', 'Intro 2', '']
+    names = section_names(titles)
+    assert len(set(names)) == len(titles)
+    assert names[:2] == ['intro', section_names(['Intro', 'intro'])[1]]
+
+
+def _split(tmp_path, markdown: str) -> list[str]:
+    output_filename = str(tmp_path / 'out.tex')
+    split_handler_generator(lambda: markdown + '\n\n', output_filename, record_command=False)()
+    return sorted(os.listdir(sections_directory(output_filename)))
+
+
+def test_adding_a_section_keeps_the_other_names(tmp_path):
+    before = _split(tmp_path, '# Doc\n\n## Intro\n\na\n\n## Usage\n\nb\n\n## Usage\n\nc\n')
+    after = _split(tmp_path, '# Doc\n\n## Setup\n\nd\n\n## Intro\n\na\n\n## Usage\n\nb\n\n## Usage\n\nc\n')
+    assert sorted(set(after) - set(before)) == ['setup.tex']
+    assert set(before) < set(after)